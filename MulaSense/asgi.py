@@ -2,6 +2,11 @@
 ASGI config for MulaSense project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Production runs it under gunicorn with uvicorn workers so the async AI and
+EcoCash views (``/api/ai/async/...``, ``/api/ecocash/async/...``) can wait on
+upstream calls without holding a worker thread:
+
+    gunicorn MulaSense.asgi:application -k uvicorn.workers.UvicornWorker
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -87,6 +87,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'MulaSense.wsgi.application'
+ASGI_APPLICATION = 'MulaSense.asgi.application'
 
 
 # Database
@@ -168,6 +169,7 @@ CORS_ALLOWED_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -187,10 +189,44 @@ CORS_ALLOWED_METHODS = [
 OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY', '')
 if not OPENROUTER_API_KEY:
     print("WARNING: OPENROUTER_API_KEY not set in environment variables")
+OPENROUTER_API_URL = os.environ.get('OPENROUTER_API_URL', 'https://openrouter.ai/api/v1/chat/completions')
+OPENROUTER_CONNECT_TIMEOUT = float(os.environ.get('OPENROUTER_CONNECT_TIMEOUT', '5'))
+OPENROUTER_READ_TIMEOUT = float(os.environ.get('OPENROUTER_READ_TIMEOUT', '60'))
+OPENROUTER_MAX_RETRIES = int(os.environ.get('OPENROUTER_MAX_RETRIES', '2'))
+OPENROUTER_POOL_SIZE = int(os.environ.get('OPENROUTER_POOL_SIZE', '20'))
 
 # EcoCash Configuration
 ECOCASH_API_KEY = os.getenv('ECOCASH_API_KEY', '')
 ECOCASH_SANDBOX = os.getenv('ECOCASH_SANDBOX', 'True')
+ECOCASH_BASE_URL = os.getenv('ECOCASH_BASE_URL', 'https://developers.ecocash.co.zw')
+ECOCASH_CA_BUNDLE = os.getenv('ECOCASH_CA_BUNDLE', '')
+ECOCASH_CONNECT_TIMEOUT = float(os.getenv('ECOCASH_CONNECT_TIMEOUT', '5'))
+ECOCASH_READ_TIMEOUT = float(os.getenv('ECOCASH_READ_TIMEOUT', '30'))
+ECOCASH_MAX_RETRIES = int(os.getenv('ECOCASH_MAX_RETRIES', '2'))
+ECOCASH_POOL_SIZE = int(os.getenv('ECOCASH_POOL_SIZE', '10'))
+
+# Callbacks must be signed with this secret (HMAC-SHA256 of the body in
+# X-EcoCash-Signature); unsigned callbacks are only accepted with DEBUG
+ECOCASH_CALLBACK_SECRET = os.getenv('ECOCASH_CALLBACK_SECRET', '')
+
+# Mock EcoCash simulator (ECOCASH_USE_MOCK=True): a named profile from
+# ecocash/mock_service.py plus optional per-field overrides
+ECOCASH_MOCK_PROFILE = os.getenv('ECOCASH_MOCK_PROFILE', 'default')
+ECOCASH_MOCK_LATENCY = os.getenv('ECOCASH_MOCK_LATENCY')  # e.g. "lognormal:0.8,0.5"
+ECOCASH_MOCK_FAILURE_RATE = os.getenv('ECOCASH_MOCK_FAILURE_RATE')
+ECOCASH_MOCK_FAILURE_MIX = os.getenv('ECOCASH_MOCK_FAILURE_MIX')  # e.g. "402:3,429:1,500:1"
+ECOCASH_MOCK_RATE_LIMIT = os.getenv('ECOCASH_MOCK_RATE_LIMIT')  # requests per second
+ECOCASH_MOCK_BURST = os.getenv('ECOCASH_MOCK_BURST')
+ECOCASH_MOCK_SEED = os.getenv('ECOCASH_MOCK_SEED')
+# Simulated payments remembered per process for status lookups
+ECOCASH_MOCK_MAX_TRANSACTIONS = int(os.getenv('ECOCASH_MOCK_MAX_TRANSACTIONS', '10000'))
+ECOCASH_MOCK_TRANSACTION_TTL = int(os.getenv('ECOCASH_MOCK_TRANSACTION_TTL', str(24 * 60 * 60)))
+
+# Stored responses for Idempotency-Key headers on payment/transfer POSTs
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(60 * 60 * 24)))
+
+# Seconds a process keeps resolved payment categories (accounting/categories.py)
+CATEGORY_CACHE_TIMEOUT = int(os.getenv('CATEGORY_CACHE_TIMEOUT', '300'))
 
 # REST Framework settings
 REST_FRAMEWORK = {
@@ -0,0 +1,133 @@
+"""
+Process-wide cache of ``Category`` rows used by payment-generated transactions.
+
+Completing an EcoCash payment or a transfer books an expense against a
+category; looking that category up on every completion costs one or two
+queries for rows that almost never change. ``CategoryRegistry`` keeps the
+resolved rows in memory, keyed by ``(name, category_type)`` (and, for the
+per-type fallback, by ``category_type``), and is cleared from
+``accounting.signals`` whenever a ``Category`` is saved or deleted. Entries also expire after
+``CATEGORY_CACHE_TIMEOUT`` seconds so other processes pick up changes made
+elsewhere (queryset ``update()``/``delete()`` bypass the signals too).
+
+``PAYMENT_SOURCE_CATEGORIES`` maps payment sources to the categories their
+transactions are booked under; missing categories are created on first use.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import Category
+
+CATEGORY_CACHE_TIMEOUT = getattr(settings, 'CATEGORY_CACHE_TIMEOUT', 300)
+
+# source: (name, category_type, icon, color)
+PAYMENT_SOURCE_CATEGORIES = {
+    'airtime': ('Airtime', 'expense', 'Smartphone', '#0EA5E9'),
+    'merchant': ('Merchant Payments', 'expense', 'Store', '#F97316'),
+    'bills': ('Bills & Utilities', 'expense', 'Receipt', '#EF4444'),
+    'send_money': ('Transfer', 'expense', 'ArrowRightLeft', '#2D358B'),
+    'transfer': ('Transfer', 'expense', 'ArrowRightLeft', '#2D358B'),
+    'manual': ('Other', 'expense', 'Wallet', '#9E9E9E'),
+}
+
+
+class CategoryRegistry:
+    def __init__(self, timeout=CATEGORY_CACHE_TIMEOUT):
+        self.timeout = timeout
+        self._by_key = {}
+        self._default_by_type = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, cache, key):
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def _store(self, cache, key, category):
+        if category is not None:
+            with self._lock:
+                cache[key] = (category, time.monotonic() + self.timeout)
+        return category
+
+    def get(self, name, category_type='expense'):
+        """Category with this name and type, or None"""
+        key = (name, category_type)
+        category = self._cached(self._by_key, key)
+        if category is None:
+            category = self._store(
+                self._by_key, key, Category.objects.filter(name=name, category_type=category_type).first()
+            )
+        return category
+
+    def get_or_create(self, name, category_type='expense', icon='', color='#000000'):
+        key = (name, category_type)
+        category = self._cached(self._by_key, key)
+        if category is not None:
+            return category
+        try:
+            with transaction.atomic():
+                category, created = Category.objects.get_or_create(
+                    name=name, category_type=category_type, defaults={'icon': icon, 'color': color}
+                )
+        except IntegrityError:
+            # Names are unique: a category of another type already has this one
+            return self.default(category_type)
+        if created:
+            # Cache a new row only once it commits, so a rollback can't leave it behind
+            transaction.on_commit(lambda: self._store(self._by_key, key, category))
+        else:
+            self._store(self._by_key, key, category)
+        return category
+
+    def default(self, category_type='expense'):
+        """First category of a type, the fallback for payments with no known source"""
+        category = self._cached(self._default_by_type, category_type)
+        if category is None:
+            category = self._store(
+                self._default_by_type, category_type,
+                Category.objects.filter(category_type=category_type).first()
+            )
+        return category
+
+    def for_source(self, source):
+        """Category to book a payment from ``source`` under"""
+        spec = PAYMENT_SOURCE_CATEGORIES.get(source)
+        if spec is None:
+            return self.default('expense')
+        name, category_type, icon, color = spec
+        return self.get_or_create(name, category_type, icon=icon, color=color)
+
+    def clear(self):
+        with self._lock:
+            self._by_key.clear()
+            self._default_by_type.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'cached': len(self._by_key) + len(self._default_by_type),
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_category_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CategoryRegistry()
+    return _registry
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .categories import get_category_registry
+from .models import Category
+
+
+@receiver([post_save, post_delete], sender=Category)
+def clear_category_registry(sender, instance, **kwargs):
+    """Drop cached categories so payments pick up the change"""
+    get_category_registry().clear()
@@ -1,3 +1,66 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .categories import CategoryRegistry, get_category_registry
+from .models import Category
+
+
+class CategoryRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = CategoryRegistry()
+
+    def test_lookups_are_cached(self):
+        Category.objects.create(name='Airtime', category_type='expense')
+        self.registry.get('Airtime')
+
+        with self.assertNumQueries(0):
+            category = self.registry.get('Airtime')
+
+        self.assertEqual(category.name, 'Airtime')
+        self.assertEqual(self.registry.stats()['hits'], 1)
+
+    def test_keyed_on_name_and_type(self):
+        Category.objects.create(name='Salary', category_type='income')
+
+        self.assertEqual(self.registry.get('Salary', 'income').category_type, 'income')
+        self.assertIsNone(self.registry.get('Salary', 'expense'))
+
+    def test_new_category_is_cached_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            created = self.registry.for_source('airtime')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.registry.for_source('airtime'), created)
+
+    def test_new_category_is_not_cached_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.registry.for_source('airtime')
+
+        self.assertEqual(self.registry.stats()['cached'], 0)
+
+    def test_name_taken_by_another_type_falls_back_to_default(self):
+        Category.objects.create(name='Transfer', category_type='income')
+        other = Category.objects.create(name='Other', category_type='expense')
+
+        self.assertEqual(self.registry.for_source('transfer'), other)
+
+    def test_entries_expire(self):
+        registry = CategoryRegistry(timeout=0)
+        Category.objects.create(name='Airtime', category_type='expense')
+        registry.get('Airtime')
+
+        with self.assertNumQueries(1):
+            registry.get('Airtime')
+
+    def test_saving_or_deleting_a_category_clears_the_shared_registry(self):
+        registry = get_category_registry()
+        self.addCleanup(registry.clear)
+        category = Category.objects.create(name='Airtime', category_type='expense')
+
+        registry.get('Airtime')
+        category.color = '#0EA5E9'
+        category.save()
+        self.assertEqual(registry.stats()['cached'], 0)
+
+        registry.get('Airtime')
+        category.delete()
+        self.assertEqual(registry.stats()['cached'], 0)
@@ -0,0 +1,289 @@
+"""
+Async AI endpoints for the ASGI deployment.
+
+Each handler awaits the OpenRouter call on the shared ``httpx`` pool
+instead of blocking a worker thread, so one ASGI worker can hold many
+in-flight LLM requests. Context building runs in a thread via
+``sync_to_async``; conversations are saved with the async ORM.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from users.authentication import async_login_required
+from .client import get_async_client, DEFAULT_MODEL
+from .context import get_user_financial_context, get_business_metrics
+from .models import Conversation, ConversationThread
+from .response_cache import get_response_cache, make_cache_key
+from .local_insights import build_local_insights, format_items
+from .precompute import get_fresh_precomputed_insight
+from .memory import get_thread, build_chat_messages, record_turn
+from .limiter import async_ai_rate_limited
+from .views import AI_LATENCY_BUDGET, local_fallback_reply, call_openrouter_ai, sse_event
+from .prompts import (
+    build_insights_prompt, build_recommendations_prompt,
+    build_business_prompt, business_metrics_summary
+)
+from .serializers import ChatMessageSerializer
+
+
+async def acall_openrouter_ai(prompt, model=DEFAULT_MODEL):
+    """Async counterpart of ``views.call_openrouter_ai``"""
+    return await get_async_client().acomplete(prompt, model=model)
+
+
+# In-flight LLM tasks by response-cache key (one event loop per worker)
+_inflight_tasks = {}
+
+
+async def agenerate_within_budget(builder, context, budget=None):
+    """
+    Async counterpart of ``views.generate_within_budget``
+    """
+    budget = AI_LATENCY_BUDGET if budget is None else budget
+    cache = get_response_cache()
+    key = make_cache_key(builder, context, DEFAULT_MODEL)
+    reply = await sync_to_async(cache.get)(key)
+    if reply is not None:
+        return reply, 'cache'
+
+    async def complete_and_store(prompt):
+        reply = await acall_openrouter_ai(prompt)
+        await sync_to_async(cache.set)(key, reply, template=builder.__name__, model=DEFAULT_MODEL)
+        return reply
+
+    task = _inflight_tasks.get(key)
+    if task is None:
+        task = asyncio.ensure_future(complete_and_store(builder(context)))
+        _inflight_tasks[key] = task
+        task.add_done_callback(lambda done: _inflight_tasks.pop(key, None))
+    else:
+        cache.record_coalesced()
+    try:
+        # shield() lets a slow call finish and fill the cache after we answer
+        return await asyncio.wait_for(asyncio.shield(task), timeout=budget), 'llm'
+    except asyncio.TimeoutError:
+        print(f"AI latency budget of {budget}s exceeded; answering locally")
+    except Exception as e:
+        print(f"AI call failed; answering locally: {str(e)}")
+    return None, 'local'
+
+
+def wants_fast_response(request):
+    return request.GET.get('fast', '').lower() in ('1', 'true', 'yes')
+
+
+def parse_json_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+@require_POST
+@async_login_required
+@async_ai_rate_limited
+async def chat_with_ai(request):
+    data = parse_json_body(request)
+    serializer = ChatMessageSerializer(data=data if isinstance(data, dict) else {})
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    message = serializer.validated_data['message']
+    try:
+        thread = await sync_to_async(get_thread)(
+            request.user, serializer.validated_data.get('thread_id'), serializer.validated_data['new_thread']
+        )
+    except ConversationThread.DoesNotExist:
+        return JsonResponse({'error': 'Thread not found'}, status=404)
+
+    try:
+        context = await sync_to_async(get_user_financial_context)(request.user)
+        # Summarizing overflowed turns is rare, so it runs on the sync client in a thread
+        messages = await sync_to_async(build_chat_messages)(
+            thread, context, message, summarize=call_openrouter_ai
+        )
+        ai_response = await get_async_client().achat(messages)
+
+        await sync_to_async(record_turn)(thread, message, ai_response)
+
+        return JsonResponse({
+            'message': message,
+            'response': ai_response,
+            'thread_id': thread.id
+        })
+
+    except Exception as e:
+        print(f"AI Chat Error: {str(e)}")
+        return JsonResponse({
+            'error': 'AI service unavailable',
+            'fallback_response': await sync_to_async(local_fallback_reply)(request.user)
+        }, status=503)
+
+
+@require_POST
+@async_login_required
+@async_ai_rate_limited
+async def chat_with_ai_stream(request):
+    """
+    Stream the AI reply as server-sent events.
+
+    Emits ``data: {"token": ...}`` events as the model produces text, then a
+    ``done`` event with the saved conversation and thread ids (or an
+    ``error`` event). Accepts the same thread fields as ``chat_with_ai``.
+    The async generator lets the ASGI server send each token as it arrives.
+    """
+    data = parse_json_body(request)
+    serializer = ChatMessageSerializer(data=data if isinstance(data, dict) else {})
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    message = serializer.validated_data['message']
+    try:
+        thread = await sync_to_async(get_thread)(
+            request.user, serializer.validated_data.get('thread_id'), serializer.validated_data['new_thread']
+        )
+    except ConversationThread.DoesNotExist:
+        return JsonResponse({'error': 'Thread not found'}, status=404)
+
+    context = await sync_to_async(get_user_financial_context)(request.user)
+    messages = await sync_to_async(build_chat_messages)(thread, context, message, summarize=call_openrouter_ai)
+
+    async def event_stream():
+        parts = []
+        try:
+            async for token in get_async_client().astream_chat(messages):
+                parts.append(token)
+                yield sse_event({'token': token})
+        except Exception as e:
+            print(f"AI Chat Stream Error: {str(e)}")
+            yield sse_event({'error': 'AI service unavailable', 'message': str(e)}, event='error')
+            return
+
+        conversation = await sync_to_async(record_turn)(thread, message, ''.join(parts))
+        yield sse_event({'conversation_id': conversation.id, 'thread_id': thread.id}, event='done')
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+@async_login_required
+@async_ai_rate_limited
+async def generate_financial_insights(request):
+    try:
+        local = (await sync_to_async(build_local_insights)(request.user))['insights']
+        if not wants_fast_response(request):
+            precomputed = await sync_to_async(get_fresh_precomputed_insight)(request.user)
+            if precomputed is not None:
+                return JsonResponse({
+                    'insights': precomputed.response,
+                    'source': 'precomputed',
+                    'cached': True,
+                    'local_insights': local,
+                    'generated_at': precomputed.created_at,
+                    'fresh_until': precomputed.fresh_until
+                })
+
+        insights, source = None, 'local'
+        if not wants_fast_response(request):
+            context = await sync_to_async(get_user_financial_context)(request.user)
+            insights, source = await agenerate_within_budget(build_insights_prompt, context)
+
+        if insights is None:
+            insights = format_items(local)
+        else:
+            await Conversation.objects.acreate(
+                user=request.user,
+                message="Generate financial insights",
+                response=insights,
+                conversation_type='insight'
+            )
+
+        return JsonResponse({
+            'insights': insights,
+            'source': source,
+            'cached': source == 'cache',
+            'local_insights': local,
+            'generated_at': timezone.now()
+        })
+
+    except Exception as e:
+        print(f"AI Insights Error: {str(e)}")
+        return JsonResponse({
+            'error': 'Unable to generate insights',
+            'message': str(e)
+        }, status=503)
+
+
+@require_GET
+@async_login_required
+@async_ai_rate_limited
+async def get_recommendations(request):
+    try:
+        local = (await sync_to_async(build_local_insights)(request.user))['recommendations']
+        recommendations, source = None, 'local'
+        if not wants_fast_response(request):
+            context = await sync_to_async(get_user_financial_context)(request.user)
+            recommendations, source = await agenerate_within_budget(build_recommendations_prompt, context)
+
+        if recommendations is None:
+            recommendations = format_items(local, numbered=True)
+        else:
+            await Conversation.objects.acreate(
+                user=request.user,
+                message="Generate recommendations",
+                response=recommendations,
+                conversation_type='recommendation'
+            )
+
+        return JsonResponse({
+            'recommendations': recommendations,
+            'source': source,
+            'cached': source == 'cache',
+            'local_recommendations': local,
+            'generated_at': timezone.now()
+        })
+
+    except Exception as e:
+        print(f"AI Recommendations Error: {str(e)}")
+        return JsonResponse({
+            'error': 'Unable to generate recommendations',
+            'message': str(e)
+        }, status=503)
+
+
+@require_POST
+@async_login_required
+@async_ai_rate_limited
+async def business_advisor(request):
+    """AI advisor specifically for SME business insights"""
+    try:
+        metrics = await sync_to_async(get_business_metrics)(request.user)
+        advice = await acall_openrouter_ai(build_business_prompt(metrics))
+
+        await Conversation.objects.acreate(
+            user=request.user,
+            message="Business performance analysis",
+            response=advice,
+            conversation_type='insight'
+        )
+
+        return JsonResponse({
+            'advice': advice,
+            'metrics': business_metrics_summary(metrics),
+            'generated_at': timezone.now()
+        })
+
+    except Exception as e:
+        print(f"AI Business Advisor Error: {str(e)}")
+        return JsonResponse({
+            'error': 'Unable to generate business advice',
+            'fallback': f'Error: {str(e)}'
+        }, status=503)
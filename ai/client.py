@@ -0,0 +1,454 @@
+"""
+OpenRouter HTTP client.
+
+A single process-wide ``requests.Session`` keeps TLS connections to
+OpenRouter alive between calls. Requests that fail with 429/5xx or a
+connection error are retried a bounded number of times with jittered
+exponential backoff, and a circuit breaker fails fast while the upstream
+is down. Latency and token usage are recorded per call.
+
+``AsyncOpenRouterClient`` offers the same behaviour on an ``httpx``
+connection pool for the ASGI views.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .encoding import count_message_tokens
+
+DEFAULT_MODEL = "meta-llama/llama-3.1-8b-instruct:free"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class OpenRouterError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(OpenRouterError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``reset_timeout`` seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class ClientMetrics:
+    """Thread-safe counters for upstream calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.successes = 0
+            self.failures = 0
+            self.retries = 0
+            self.rejected = 0
+            self.total_latency_ms = 0.0
+            self.max_latency_ms = 0.0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.estimated_prompt_tokens = 0
+            self.oversized_prompts = 0
+
+    def record_prompt(self, tokens, oversized=False):
+        with self._lock:
+            self.estimated_prompt_tokens += tokens
+            if oversized:
+                self.oversized_prompts += 1
+
+    def record_call(self, latency_ms, success, usage=None):
+        with self._lock:
+            self.calls += 1
+            if success:
+                self.successes += 1
+            else:
+                self.failures += 1
+            self.total_latency_ms += latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            if usage:
+                self.prompt_tokens += usage.get('prompt_tokens') or 0
+                self.completion_tokens += usage.get('completion_tokens') or 0
+
+    def record_usage(self, usage):
+        with self._lock:
+            self.prompt_tokens += usage.get('prompt_tokens') or 0
+            self.completion_tokens += usage.get('completion_tokens') or 0
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'successes': self.successes,
+                'failures': self.failures,
+                'retries': self.retries,
+                'rejected_by_circuit': self.rejected,
+                'avg_latency_ms': round(self.total_latency_ms / self.calls, 1) if self.calls else 0,
+                'max_latency_ms': round(self.max_latency_ms, 1),
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'estimated_prompt_tokens': self.estimated_prompt_tokens,
+                'oversized_prompts': self.oversized_prompts,
+            }
+
+
+class OpenRouterClient:
+    def __init__(self, api_key=None, api_url=None, timeout=None, max_retries=None,
+                 backoff_base=0.5, backoff_max=8.0, pool_size=None, breaker=None):
+        self.api_key = api_key if api_key is not None else (
+            os.environ.get('OPENROUTER_API_KEY') or getattr(settings, 'OPENROUTER_API_KEY', '')
+        )
+        self.api_url = api_url or getattr(settings, 'OPENROUTER_API_URL', 'https://openrouter.ai/api/v1/chat/completions')
+        self.timeout = timeout or (
+            getattr(settings, 'OPENROUTER_CONNECT_TIMEOUT', 5),
+            getattr(settings, 'OPENROUTER_READ_TIMEOUT', 60),
+        )
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'OPENROUTER_MAX_RETRIES', 2)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size or getattr(settings, 'OPENROUTER_POOL_SIZE', 20)
+        self.max_prompt_tokens = getattr(settings, 'AI_MAX_PROMPT_TOKENS', 4000)
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = ClientMetrics()
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers.update({
+                        "Content-Type": "application/json",
+                        "HTTP-Referer": "https://mulasense.onrender.com",
+                        "X-Title": "MulaSense Financial Advisor"
+                    })
+                    self._session = session
+        return self._session
+
+    def complete(self, prompt, model=DEFAULT_MODEL, **options):
+        """Send a single user prompt and return the reply text"""
+        return self.chat([{"role": "user", "content": prompt}], model=model, **options)
+
+    def chat(self, messages, model=DEFAULT_MODEL, **options):
+        """Send a list of chat messages and return the reply text"""
+        self.count_prompt(messages)
+        response = self.post({"model": model, "messages": messages, **options})
+        return response.json()["choices"][0]["message"]["content"]
+
+    def stream_chat(self, messages, model=DEFAULT_MODEL, **options):
+        """
+        Yield reply text fragments as OpenRouter streams them (SSE)
+        """
+        self.count_prompt(messages)
+        response = self.post({"model": model, "messages": messages, "stream": True, **options}, stream=True)
+        try:
+            # chunk_size=None hands over each chunk as soon as it arrives
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                done, content = self._parse_stream_line(line)
+                if done:
+                    break
+                if content:
+                    yield content
+        finally:
+            response.close()
+
+    def _parse_stream_line(self, line):
+        """Return (done, content) for one SSE line of a streamed completion"""
+        # Blank keep-alives and ": OPENROUTER PROCESSING" comments carry no data
+        if not line or not line.startswith('data:'):
+            return False, None
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return True, None
+        chunk = json.loads(data)
+        if chunk.get('usage'):
+            self.metrics.record_usage(chunk['usage'])
+        choices = chunk.get('choices') or [{}]
+        return False, (choices[0].get('delta') or {}).get('content')
+
+    def count_prompt(self, messages):
+        """
+        Count prompt tokens before sending and flag prompts over AI_MAX_PROMPT_TOKENS
+        """
+        tokens = count_message_tokens(messages)
+        oversized = tokens > self.max_prompt_tokens
+        if oversized:
+            print(f"OpenRouter prompt of ~{tokens} tokens exceeds the {self.max_prompt_tokens} token limit")
+        self.metrics.record_prompt(tokens, oversized)
+        return tokens
+
+    def post(self, payload, stream=False):
+        """
+        POST a completion request with retries, backoff and circuit breaking
+        """
+        if not self.api_key or self.api_key == 'your-api-key-here':
+            raise ValueError("OpenRouter API key not configured. Set OPENROUTER_API_KEY environment variable.")
+
+        if not self.breaker.allow():
+            self.metrics.record_rejected()
+            raise CircuitOpenError("OpenRouter circuit is open; skipping upstream call", status_code=503)
+
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                started = time.monotonic()
+                retry_after = None
+                try:
+                    response = self.session.post(
+                        self.api_url, headers=headers, json=payload, timeout=self.timeout, stream=stream
+                    )
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = OpenRouterError(f"OpenRouter request failed: {e}")
+                else:
+                    if response.status_code < 400:
+                        usage = None if stream else self._usage(response)
+                        self.metrics.record_call(self._elapsed_ms(started), True, usage)
+                        settled = True
+                        self.breaker.record_success()
+                        return response
+
+                    retry_after = response.headers.get('Retry-After')
+                    error = OpenRouterError(
+                        f"OpenRouter returned {response.status_code}: {response.text[:200]}",
+                        status_code=response.status_code
+                    )
+                    response.close()
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        # Client errors mean the upstream is healthy: don't trip the breaker
+                        self.metrics.record_call(self._elapsed_ms(started), False)
+                        settled = True
+                        self.breaker.record_success()
+                        raise error
+
+                self.metrics.record_call(self._elapsed_ms(started), False)
+                if attempt >= self.max_retries:
+                    settled = True
+                    self.breaker.record_failure()
+                    raise error
+
+                attempt += 1
+                self.metrics.record_retry()
+                time.sleep(self._backoff(attempt, retry_after))
+        finally:
+            # Any other exception still counts, so a half-open trial is never left in flight
+            if not settled:
+                self.breaker.record_failure()
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After when given"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _usage(response):
+        try:
+            return response.json().get('usage')
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _elapsed_ms(started):
+        return (time.monotonic() - started) * 1000
+
+
+class AsyncOpenRouterClient(OpenRouterClient):
+    """
+    Async variant for ASGI views: one shared ``httpx.AsyncClient`` pool per
+    worker, with the same retry, backoff, circuit-breaker and metrics rules.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_session = None
+
+    @property
+    def async_session(self):
+        if self._async_session is None:
+            connect_timeout, read_timeout = self.timeout
+            self._async_session = httpx.AsyncClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                headers=dict(self.session.headers),
+            )
+        return self._async_session
+
+    async def acomplete(self, prompt, model=DEFAULT_MODEL, **options):
+        return await self.achat([{"role": "user", "content": prompt}], model=model, **options)
+
+    async def achat(self, messages, model=DEFAULT_MODEL, **options):
+        self.count_prompt(messages)
+        response = await self.apost({"model": model, "messages": messages, **options})
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def astream_chat(self, messages, model=DEFAULT_MODEL, **options):
+        """
+        Async generator of reply text fragments, so ASGI responses stream
+        token by token instead of being buffered
+        """
+        self.count_prompt(messages)
+        response = await self.apost({"model": model, "messages": messages, "stream": True, **options}, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                done, content = self._parse_stream_line(line)
+                if done:
+                    break
+                if content:
+                    yield content
+        finally:
+            await response.aclose()
+
+    async def apost(self, payload, stream=False):
+        if not self.api_key or self.api_key == 'your-api-key-here':
+            raise ValueError("OpenRouter API key not configured. Set OPENROUTER_API_KEY environment variable.")
+
+        if not self.breaker.allow():
+            self.metrics.record_rejected()
+            raise CircuitOpenError("OpenRouter circuit is open; skipping upstream call", status_code=503)
+
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                started = time.monotonic()
+                retry_after = None
+                try:
+                    request = self.async_session.build_request('POST', self.api_url, headers=headers, json=payload)
+                    response = await self.async_session.send(request, stream=stream)
+                except httpx.TransportError as e:
+                    error = OpenRouterError(f"OpenRouter request failed: {e}")
+                else:
+                    if response.status_code < 400:
+                        usage = None if stream else self._usage(response)
+                        self.metrics.record_call(self._elapsed_ms(started), True, usage)
+                        settled = True
+                        self.breaker.record_success()
+                        return response
+
+                    if stream:
+                        await response.aread()
+                        await response.aclose()
+                    retry_after = response.headers.get('Retry-After')
+                    error = OpenRouterError(
+                        f"OpenRouter returned {response.status_code}: {response.text[:200]}",
+                        status_code=response.status_code
+                    )
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        self.metrics.record_call(self._elapsed_ms(started), False)
+                        settled = True
+                        self.breaker.record_success()
+                        raise error
+
+                self.metrics.record_call(self._elapsed_ms(started), False)
+                if attempt >= self.max_retries:
+                    settled = True
+                    self.breaker.record_failure()
+                    raise error
+
+                attempt += 1
+                self.metrics.record_retry()
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        finally:
+            if not settled:
+                self.breaker.record_failure()
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide shared client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenRouterClient()
+    return _client
+
+
+_async_client = None
+
+
+def get_async_client():
+    """Shared async client for the current worker's event loop"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenRouterClient()
+    return _async_client
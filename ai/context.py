@@ -0,0 +1,140 @@
+"""
+Versioned financial context snapshots for AI prompts.
+
+Building the context costs several aggregates and list queries. The
+snapshot is cached per user under their financial data version
+(``budget.versioning``), which is bumped by signals on every Transaction,
+BudgetCategory, Goal and GoalContribution write. Reading an up-to-date snapshot therefore costs a
+single version lookup.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+from datetime import timedelta
+from accounting.models import Transaction
+from budget.models import BudgetCategory, Goal
+from budget.forecasting import get_goal_forecasts
+from budget.versioning import get_data_version
+
+CONTEXT_CACHE_KEY = 'ai_context:{user_id}:{version}:{month}'
+CONTEXT_CACHE_TIMEOUT = getattr(settings, 'AI_CONTEXT_CACHE_TIMEOUT', 60 * 60)
+
+
+def get_user_financial_context(user):
+    """Get user's financial data for AI context, served from the snapshot cache"""
+    return get_versioned_financial_context(user)[0]
+
+
+def get_versioned_financial_context(user):
+    """
+    Return (context, version) so callers can key derived caches on the version
+    """
+    version = get_data_version(user.id)
+    key = CONTEXT_CACHE_KEY.format(
+        user_id=user.id, version=version, month=timezone.now().strftime('%Y-%m')
+    )
+    context = cache.get(key)
+    if context is None:
+        context = build_financial_context(user, version)
+        cache.set(key, context, CONTEXT_CACHE_TIMEOUT)
+    return context, version
+
+
+def build_financial_context(user, version=None):
+    """Build the user's financial context from scratch"""
+    current_month = timezone.now().replace(day=1)
+    
+    # Recent transactions
+    recent_transactions = Transaction.objects.filter(
+        user=user, status='completed'
+    ).select_related('category').order_by('-transaction_date')[:10]
+    
+    # Monthly summary
+    income = Transaction.objects.filter(
+        user=user, transaction_type='income',
+        transaction_date__gte=current_month, status='completed'
+    ).aggregate(Sum('amount'))['amount__sum'] or 0
+    
+    expenses = Transaction.objects.filter(
+        user=user, transaction_type='expense',
+        transaction_date__gte=current_month, status='completed'
+    ).aggregate(Sum('amount'))['amount__sum'] or 0
+    
+    # Budget categories
+    budget_categories = BudgetCategory.objects.filter(user=user, is_active=True)
+    
+    # Goals
+    active_goals = Goal.objects.filter(user=user, status='active')
+    goal_forecasts = get_goal_forecasts(user.id, version)
+    
+    return {
+        'monthly_income': float(income),
+        'monthly_expenses': float(expenses),
+        'balance': float(income - expenses),
+        'budget_categories': [{
+            'name': cat.name,
+            'budgeted': float(cat.budgeted_amount),
+            'spent': float(cat.spent_amount),
+            'percentage_used': float(cat.percentage_used)
+        } for cat in budget_categories],
+        'goals': [{
+            'name': goal.name,
+            'target': float(goal.target_amount),
+            'current': float(goal.current_amount),
+            'progress': float(goal.progress_percentage),
+            'forecast': goal_forecasts.get(goal.id, {}).get('status')
+        } for goal in active_goals],
+        'recent_transactions': [{
+            'description': t.description,
+            'amount': float(t.amount),
+            'type': t.transaction_type,
+            'category': t.category.name
+        } for t in recent_transactions]
+    }
+
+
+def get_business_metrics(user):
+    """Current vs previous month business performance for the advisor"""
+    current_month = timezone.now().replace(day=1)
+    
+    # Get business metrics
+    transactions = Transaction.objects.filter(
+        user=user,
+        transaction_date__gte=current_month,
+        status='completed'
+    )
+    
+    income = transactions.filter(transaction_type='income').aggregate(Sum('amount'))['amount__sum'] or 0
+    expenses = transactions.filter(transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
+    
+    # Category breakdown
+    income_by_cat = transactions.filter(transaction_type='income').values(
+        'category__name'
+    ).annotate(total=Sum('amount')).order_by('-total')[:5]
+    
+    expense_by_cat = transactions.filter(transaction_type='expense').values(
+        'category__name'
+    ).annotate(total=Sum('amount')).order_by('-total')[:5]
+    
+    # Previous month comparison
+    prev_month = current_month - timedelta(days=1)
+    prev_month_start = prev_month.replace(day=1)
+    prev_transactions = Transaction.objects.filter(
+        user=user,
+        transaction_date__gte=prev_month_start,
+        transaction_date__lt=current_month,
+        status='completed'
+    )
+    prev_income = prev_transactions.filter(transaction_type='income').aggregate(Sum('amount'))['amount__sum'] or 0
+    prev_expenses = prev_transactions.filter(transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
+    
+    return {
+        'income': income,
+        'expenses': expenses,
+        'profit': income - expenses,
+        'prev_income': prev_income,
+        'prev_expenses': prev_expenses,
+        'income_by_category': list(income_by_cat),
+        'expense_by_category': list(expense_by_cat),
+    }
@@ -0,0 +1,137 @@
+"""
+Compact prompt encoding for financial context.
+
+Renders the context as rounded, pipe-separated tables instead of Python
+reprs, which drops the quotes, repeated keys and long floats. Sections
+have a truncation priority: when the encoded text would exceed the token
+cap, rows are dropped from the least important section first and an
+"(+N more)" marker records what was left out.
+"""
+import math
+import re
+from decimal import Decimal
+
+from django.conf import settings
+
+CONTEXT_TOKEN_CAP = getattr(settings, 'AI_CONTEXT_TOKEN_CAP', 600)
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def count_tokens(text):
+    """
+    Estimate the tokens a BPE tokenizer produces for ``text``.
+
+    Words count one token per four letters, digit runs one per three
+    digits and each punctuation mark one token, which tracks OpenAI-style
+    tokenizers closely enough to budget prompts without shipping one.
+    """
+    total = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece[0].isalpha():
+            total += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        else:
+            total += 1
+    return total
+
+
+def count_message_tokens(messages):
+    """Tokens for a chat message list, including per-message overhead"""
+    return sum(count_tokens(message['content']) + 4 for message in messages)
+
+
+def fmt_number(value):
+    """Round to cents and drop trailing zeros (``12.50`` -> ``12.5``)"""
+    return f"{float(value or 0):.2f}".rstrip('0').rstrip('.')
+
+
+def fmt_cell(value):
+    if value is None:
+        return '-'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return fmt_number(value)
+    return str(value).replace('|', '/').replace('\n', ' ').strip()
+
+
+def encode_table(title, columns, rows):
+    lines = [f"{title} ({'|'.join(columns)}):"]
+    lines.extend('|'.join(fmt_cell(cell) for cell in row) for row in rows)
+    return lines
+
+
+def encode_sections(header, sections, max_tokens):
+    """
+    Join ``header`` lines and tabular ``sections`` under ``max_tokens``.
+
+    ``sections`` is a list of (title, columns, rows) in priority order,
+    most important first. Rows are trimmed from the end of the lowest
+    priority section that still has rows until the text fits.
+    """
+    kept = [list(rows) for _, _, rows in sections]
+    dropped = [0] * len(sections)
+
+    def render():
+        lines = list(header)
+        for index, (title, columns, _) in enumerate(sections):
+            if not kept[index] and not dropped[index]:
+                continue
+            lines.extend(encode_table(title, columns, kept[index]))
+            if dropped[index]:
+                lines.append(f"(+{dropped[index]} more)")
+        return "\n".join(lines)
+
+    text = render()
+    while count_tokens(text) > max_tokens:
+        victim = next((i for i in range(len(sections) - 1, -1, -1) if kept[i]), None)
+        if victim is None:
+            break
+        kept[victim].pop()
+        dropped[victim] += 1
+        text = render()
+    return text
+
+
+def encode_financial_context(context, max_tokens=None, transactions=5):
+    """
+    Tabular rendering of ``build_financial_context`` output
+
+    Priority when trimming: budgets, then goals, then recent transactions.
+    """
+    max_tokens = CONTEXT_TOKEN_CAP if max_tokens is None else max_tokens
+    income = context['monthly_income']
+    savings_rate = context['balance'] / income * 100 if income > 0 else 0
+
+    header = [
+        f"Month: income {fmt_number(income)} | expenses {fmt_number(context['monthly_expenses'])} | "
+        f"balance {fmt_number(context['balance'])} | savings rate {savings_rate:.1f}%"
+    ]
+    sections = [
+        ('Budgets', ['name', 'budgeted', 'spent', 'used%'], [
+            (c['name'], c['budgeted'], c['spent'], round(c['percentage_used'], 1))
+            for c in context['budget_categories']
+        ]),
+        ('Goals', ['name', 'target', 'saved', 'progress%', 'forecast'], [
+            (g['name'], g['target'], g['current'], round(g['progress'], 1), g.get('forecast'))
+            for g in context['goals']
+        ]),
+        ('Recent transactions', ['description', 'amount', 'type', 'category'], [
+            (t['description'], t['amount'], t['type'], t['category'])
+            for t in context['recent_transactions'][:transactions]
+        ]),
+    ]
+    return encode_sections(header, sections, max_tokens)
+
+
+def encode_business_metrics(metrics, max_tokens=None):
+    max_tokens = CONTEXT_TOKEN_CAP if max_tokens is None else max_tokens
+    sections = [
+        ('Top revenue sources', ['category', 'total'], [
+            (row['category__name'], row['total']) for row in metrics['income_by_category']
+        ]),
+        ('Top expense categories', ['category', 'total'], [
+            (row['category__name'], row['total']) for row in metrics['expense_by_category']
+        ]),
+    ]
+    return encode_sections([], sections, max_tokens)
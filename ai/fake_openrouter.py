@@ -0,0 +1,139 @@
+"""
+Local stand-in for the OpenRouter chat completions API.
+
+Serves ``POST /api/v1/chat/completions`` from a background thread so the
+client, retry and circuit-breaker paths can be exercised without network
+access or an API key. Point the app at it with
+``OPENROUTER_API_URL=http://127.0.0.1:<port>/api/v1/chat/completions``.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATH = '/api/v1/chat/completions'
+
+
+class FakeOpenRouterServer:
+    """
+    Args:
+        reply: content returned in every completion.
+        latency: seconds to wait before responding.
+        fail_first: number of initial requests answered with ``fail_status``.
+        fail_status: status code used for the injected failures.
+        stream_delay: seconds between tokens when ``stream`` is requested.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, reply='This is a test reply from the fake OpenRouter server.',
+                 latency=0.0, fail_first=0, fail_status=503, stream_delay=0.0):
+        self.reply = reply
+        self.latency = latency
+        self.stream_delay = stream_delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}{COMPLETIONS_PATH}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_failure(self, payload):
+        with self._lock:
+            self.requests.append(payload)
+            return len(self.requests) <= self.fail_first
+
+    def completion_body(self, payload):
+        prompt_tokens = sum(len(str(m.get('content', '')).split()) for m in payload.get('messages', []))
+        return {
+            'id': f'fake-{len(self.requests)}',
+            'object': 'chat.completion',
+            'model': payload.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.reply},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(self.reply.split()),
+                'total_tokens': prompt_tokens + len(self.reply.split())
+            }
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                if self.path != COMPLETIONS_PATH:
+                    return self._send_json(404, {'error': {'message': 'Not found'}})
+                if not self.headers.get('Authorization', '').startswith('Bearer '):
+                    return self._send_json(401, {'error': {'message': 'Missing API key'}})
+
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+
+                if server.latency:
+                    time.sleep(server.latency)
+                if server._next_failure(payload):
+                    return self._send_json(server.fail_status, {'error': {'message': 'Injected failure'}})
+
+                if payload.get('stream'):
+                    return self._send_stream(server.completion_body(payload))
+                self._send_json(200, server.completion_body(payload))
+
+            def _send_stream(self, body):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                self._write_chunk(': OPENROUTER PROCESSING\n\n')
+                for word in server.reply.split(' '):
+                    chunk = {'id': body['id'], 'choices': [{'index': 0, 'delta': {'content': word + ' '}}]}
+                    self._write_chunk(f'data: {json.dumps(chunk)}\n\n')
+                    if server.stream_delay:
+                        time.sleep(server.stream_delay)
+                final = {'id': body['id'], 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}], 'usage': body['usage']}
+                self._write_chunk(f'data: {json.dumps(final)}\n\ndata: [DONE]\n\n')
+                self.wfile.write(b'0\r\n\r\n')
+                self.wfile.flush()
+
+            def _write_chunk(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+                self.wfile.flush()
+
+            def _send_json(self, status_code, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,232 @@
+"""
+Per-user limits for the AI endpoints.
+
+Each user has a token bucket (burst of ``capacity`` requests refilled at
+``refill_per_minute``) and a cap on concurrent in-flight AI requests.
+Limiter state is reported in ``X-RateLimit-*`` / ``X-Concurrency-*``
+response headers, and rejected requests get a 429 with ``Retry-After``.
+Like the OpenRouter circuit breaker, state is kept per worker process.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+RATE_LIMIT_CAPACITY = getattr(settings, 'AI_RATE_LIMIT_CAPACITY', 10)
+RATE_LIMIT_REFILL_PER_MINUTE = getattr(settings, 'AI_RATE_LIMIT_REFILL_PER_MINUTE', 10)
+MAX_CONCURRENT_PER_USER = getattr(settings, 'AI_MAX_CONCURRENT_PER_USER', 2)
+
+
+@dataclass
+class LimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    concurrency_limit: int
+    active: int
+    retry_after: float = 0
+    reason: str = ''
+
+    def headers(self):
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(math.ceil(self.reset_after)),
+            'X-Concurrency-Limit': str(self.concurrency_limit),
+            'X-Concurrency-Active': str(self.active),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(max(math.ceil(self.retry_after), 1))
+        return headers
+
+
+class AIRateLimiter:
+    """
+    Thread-safe token buckets and concurrency counters keyed by user id.
+
+    A missing bucket means a full one, so buckets are dropped as soon as
+    they refill, and a periodic sweep drops those of users who went idle.
+    Memory therefore tracks recently active users, not every user seen.
+    """
+
+    def __init__(self, capacity=RATE_LIMIT_CAPACITY, refill_per_minute=RATE_LIMIT_REFILL_PER_MINUTE,
+                 max_concurrent=MAX_CONCURRENT_PER_USER):
+        self.capacity = capacity
+        self.refill_rate = refill_per_minute / 60.0
+        self.max_concurrent = max_concurrent
+        self._buckets = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        # A bucket untouched for this long has refilled completely
+        self.sweep_interval = capacity / self.refill_rate if self.refill_rate else 60
+        self._last_sweep = time.monotonic()
+
+    def acquire(self, user_id, cost=1):
+        """
+        Take ``cost`` tokens and a concurrency slot, or explain why not
+        """
+        with self._lock:
+            self._sweep()
+            tokens = self._refill(user_id)
+            active = self._active.get(user_id, 0)
+
+            if active >= self.max_concurrent:
+                return self._decision(False, tokens, active, retry_after=1, reason='concurrency')
+            if tokens < cost:
+                wait = (cost - tokens) / self.refill_rate if self.refill_rate else 60
+                return self._decision(False, tokens, active, retry_after=wait, reason='rate')
+
+            tokens -= cost
+            self._buckets[user_id] = (tokens, time.monotonic())
+            self._active[user_id] = active + 1
+            return self._decision(True, tokens, active + 1)
+
+    def release(self, user_id):
+        with self._lock:
+            active = self._active.get(user_id, 0) - 1
+            if active > 0:
+                self._active[user_id] = active
+            else:
+                self._active.pop(user_id, None)
+
+    def state(self, user_id):
+        with self._lock:
+            return self._decision(True, self._refill(user_id), self._active.get(user_id, 0))
+
+    def _refill(self, user_id):
+        # Caller holds the lock
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(user_id, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+        if tokens >= self.capacity:
+            self._buckets.pop(user_id, None)
+        else:
+            self._buckets[user_id] = (tokens, now)
+        return tokens
+
+    def _sweep(self):
+        # Caller holds the lock
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        idle = [
+            user_id for user_id, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.refill_rate >= self.capacity
+        ]
+        for user_id in idle:
+            del self._buckets[user_id]
+
+    def _decision(self, allowed, tokens, active, retry_after=0, reason=''):
+        missing = self.capacity - tokens
+        return LimitDecision(
+            allowed=allowed,
+            limit=self.capacity,
+            remaining=int(tokens),
+            reset_after=missing / self.refill_rate if self.refill_rate else 0,
+            concurrency_limit=self.max_concurrent,
+            active=active,
+            retry_after=retry_after,
+            reason=reason,
+        )
+
+
+_limiter = AIRateLimiter()
+
+
+def get_limiter():
+    return _limiter
+
+
+def rejection_body(decision):
+    if decision.reason == 'concurrency':
+        message = f'Too many AI requests in progress (limit {decision.concurrency_limit}). Please wait for one to finish.'
+    else:
+        message = 'AI request limit reached. Please try again shortly.'
+    return {'error': message, 'retry_after': max(math.ceil(decision.retry_after), 1)}
+
+
+def apply_headers(response, decision):
+    for header, value in decision.headers().items():
+        response[header] = value
+    return response
+
+
+def release_after_stream(response, user_id):
+    """Hold the concurrency slot until a streaming response is fully sent"""
+    content = response.streaming_content
+
+    def stream():
+        try:
+            yield from content
+        finally:
+            _limiter.release(user_id)
+
+    async def astream():
+        try:
+            async for part in content:
+                yield part
+        finally:
+            _limiter.release(user_id)
+
+    response.streaming_content = astream() if response.is_async else stream()
+    return response
+
+
+def ai_rate_limited(view_func):
+    """
+    Apply the per-user AI limits to a DRF function view (below ``@api_view``)
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        user_id = request.user.id
+        decision = _limiter.acquire(user_id)
+        if not decision.allowed:
+            return apply_headers(
+                Response(rejection_body(decision), status=status.HTTP_429_TOO_MANY_REQUESTS), decision
+            )
+
+        streaming = False
+        try:
+            response = view_func(request, *args, **kwargs)
+            streaming = getattr(response, 'streaming', False)
+            if streaming:
+                release_after_stream(response, user_id)
+            return apply_headers(response, decision)
+        finally:
+            if not streaming:
+                _limiter.release(user_id)
+
+    return wrapper
+
+
+def async_ai_rate_limited(view_func):
+    """
+    Async counterpart of ``ai_rate_limited`` (below ``async_login_required``)
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user_id = request.user.id
+        decision = _limiter.acquire(user_id)
+        if not decision.allowed:
+            return apply_headers(JsonResponse(rejection_body(decision), status=429), decision)
+
+        streaming = False
+        try:
+            response = await view_func(request, *args, **kwargs)
+            streaming = getattr(response, 'streaming', False)
+            if streaming:
+                release_after_stream(response, user_id)
+            return apply_headers(response, decision)
+        finally:
+            if not streaming:
+                _limiter.release(user_id)
+
+    return wrapper
@@ -0,0 +1,248 @@
+"""
+Deterministic local insight engine.
+
+Computes spending anomalies, month-over-month category changes, budget
+overruns and goal pace straight from the user's data in a handful of
+queries. The AI views return these instantly alongside the LLM reply and
+fall back to them when OpenRouter fails or exceeds its latency budget.
+"""
+import statistics
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from accounting.models import Transaction
+from budget.models import BudgetCategory, Goal
+from budget.forecasting import get_goal_forecasts, AT_RISK, OFF_TRACK
+
+HIGH = 'high'
+MEDIUM = 'medium'
+LOW = 'low'
+
+# A transaction this many standard deviations above the user's 90-day mean is unusual
+ANOMALY_STD_MULTIPLIER = 2
+ANOMALY_MIN_SAMPLES = 5
+# Category spend at least this multiple of its recent monthly average is flagged
+CATEGORY_SPIKE_RATIO = 1.5
+BUDGET_WARNING_PERCENT = 80
+TARGET_SAVINGS_RATE = 20
+
+SEVERITY_ORDER = {HIGH: 0, MEDIUM: 1, LOW: 2}
+
+
+def build_local_insights(user, now=None):
+    """
+    Return {'insights': [...], 'recommendations': [...]} for a user
+
+    Each item is a dict with ``kind``, ``severity``, ``title`` and ``detail``,
+    most severe first.
+    """
+    now = now or timezone.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    insights = []
+    recommendations = []
+    for finder in (_spending_anomalies, _category_changes, _budget_overruns, _goal_pace, _savings_rate):
+        found, advice = finder(user, now, month_start)
+        insights.extend(found)
+        recommendations.extend(advice)
+
+    insights.sort(key=lambda item: SEVERITY_ORDER[item['severity']])
+    recommendations.sort(key=lambda item: SEVERITY_ORDER[item['severity']])
+    return {'insights': insights, 'recommendations': recommendations}
+
+
+def format_items(items, numbered=False):
+    """Render items as the same bullet/numbered text the LLM endpoints return"""
+    if not items:
+        return "- Not enough activity yet to spot trends. Keep recording your transactions."
+    lines = []
+    for index, item in enumerate(items, start=1):
+        prefix = f"{index}." if numbered else "-"
+        lines.append(f"{prefix} {item['title']}: {item['detail']}")
+    return "\n".join(lines)
+
+
+def _item(kind, severity, title, detail):
+    return {'kind': kind, 'severity': severity, 'title': title, 'detail': detail}
+
+
+def _money(value):
+    return f"${Decimal(value).quantize(Decimal('0.01')):,}"
+
+
+def _spending_anomalies(user, now, month_start):
+    rows = list(
+        Transaction.objects.filter(
+            user=user, transaction_type='expense', status='completed',
+            transaction_date__gte=now - timedelta(days=90)
+        ).values_list('description', 'amount', 'transaction_date')
+    )
+    if len(rows) < ANOMALY_MIN_SAMPLES:
+        return [], []
+
+    amounts = [float(amount) for _, amount, _ in rows]
+    threshold = statistics.fmean(amounts) + ANOMALY_STD_MULTIPLIER * statistics.pstdev(amounts)
+
+    insights = [
+        _item('anomaly', MEDIUM, 'Unusual expense',
+              f"{description} ({_money(amount)}) is well above your typical spend of "
+              f"{_money(statistics.fmean(amounts))}")
+        for description, amount, when in rows
+        if when >= month_start and float(amount) > threshold
+    ]
+    return insights[:3], []
+
+
+def _category_changes(user, now, month_start):
+    history_start = (month_start - timedelta(days=1)).replace(day=1)
+    history_start = (history_start - timedelta(days=1)).replace(day=1)
+    history_start = (history_start - timedelta(days=1)).replace(day=1)
+
+    rows = Transaction.objects.filter(
+        user=user, transaction_type='expense', status='completed',
+        transaction_date__gte=history_start
+    ).annotate(month=TruncMonth('transaction_date')).values('category__name', 'month').annotate(
+        total=Sum('amount')
+    )
+
+    current = {}
+    previous = {}
+    for row in rows:
+        name = row['category__name']
+        if row['month'].date() >= month_start.date():
+            current[name] = row['total']
+        else:
+            previous.setdefault(name, []).append(row['total'])
+
+    changes = []
+    for name, spent in current.items():
+        history = previous.get(name)
+        if not history:
+            continue
+        average = sum(history) / 3
+        changes.append((spent - average, name, spent, average))
+
+    if not changes:
+        return [], []
+
+    changes.sort(reverse=True)
+    insights = []
+    recommendations = []
+    delta, name, spent, average = changes[0]
+    if delta > 0:
+        spike = average > 0 and spent >= average * Decimal(str(CATEGORY_SPIKE_RATIO))
+        insights.append(_item(
+            'category_change', MEDIUM if spike else LOW, f'{name} spending up',
+            f"{_money(spent)} this month vs a {_money(average)} monthly average ({_money(delta)} more)"
+        ))
+        if spike:
+            recommendations.append(_item(
+                'category_change', MEDIUM, f'Review {name} spending',
+                f"Bring {name} back to about {_money(average)} to save {_money(delta)} this month"
+            ))
+
+    delta, name, spent, average = changes[-1]
+    if delta < 0:
+        insights.append(_item(
+            'category_change', LOW, f'{name} spending down',
+            f"{_money(spent)} this month vs a {_money(average)} monthly average ({_money(-delta)} less)"
+        ))
+    return insights, recommendations
+
+
+def _budget_overruns(user, now, month_start):
+    insights = []
+    recommendations = []
+    budgets = BudgetCategory.objects.filter(user=user, is_active=True).values_list(
+        'name', 'budgeted_amount', 'spent_amount'
+    )
+    for name, budgeted, spent in budgets:
+        if budgeted <= 0:
+            continue
+        percent = spent / budgeted * 100
+        if spent > budgeted:
+            insights.append(_item(
+                'budget', HIGH, f'{name} over budget',
+                f"Spent {_money(spent)} of {_money(budgeted)} ({percent:.0f}%)"
+            ))
+            recommendations.append(_item(
+                'budget', HIGH, f'Pause {name} spending',
+                f"Cut {_money(spent - budgeted)} elsewhere or raise the {name} budget to stay balanced"
+            ))
+        elif percent >= BUDGET_WARNING_PERCENT:
+            insights.append(_item(
+                'budget', MEDIUM, f'{name} budget nearly used',
+                f"{percent:.0f}% used, {_money(budgeted - spent)} left"
+            ))
+    return insights, recommendations
+
+
+def _goal_pace(user, now, month_start):
+    goals = list(
+        Goal.objects.filter(user=user, status='active').values_list(
+            'id', 'name', 'required_monthly_contribution'
+        )
+    )
+    if not goals:
+        return [], []
+
+    forecasts = get_goal_forecasts(user.id)
+    insights = []
+    recommendations = []
+    for goal_id, name, required in goals:
+        forecast = forecasts.get(goal_id)
+        if not forecast:
+            continue
+        status = forecast['status']
+        if status == OFF_TRACK:
+            insights.append(_item(
+                'goal', HIGH, f'{name} off track',
+                f"At the current pace you reach {forecast['projected_progress']}% of the target by the deadline"
+            ))
+        elif status == AT_RISK:
+            insights.append(_item(
+                'goal', MEDIUM, f'{name} at risk',
+                f"Projected to reach {forecast['projected_progress']}% of the target by the deadline"
+            ))
+        else:
+            insights.append(_item('goal', LOW, f'{name} on track', 'Keep up your current contributions'))
+
+        if status in (OFF_TRACK, AT_RISK) and required:
+            recommendations.append(_item(
+                'goal', HIGH if status == OFF_TRACK else MEDIUM, f'Boost {name} contributions',
+                f"Save {_money(required)} a month (currently about "
+                f"{_money(forecast['monthly_velocity'])}) to hit the target on time"
+            ))
+    return insights, recommendations
+
+
+def _savings_rate(user, now, month_start):
+    totals = dict(
+        Transaction.objects.filter(
+            user=user, status='completed', transaction_date__gte=month_start,
+            transaction_type__in=['income', 'expense']
+        ).values_list('transaction_type').annotate(total=Sum('amount'))
+    )
+    income = totals.get('income') or Decimal('0')
+    expenses = totals.get('expense') or Decimal('0')
+    if income <= 0:
+        return [], []
+
+    rate = (income - expenses) / income * 100
+    if rate < 0:
+        insight = _item('savings', HIGH, 'Spending exceeds income',
+                        f"Expenses are {_money(expenses - income)} above income this month")
+    elif rate < TARGET_SAVINGS_RATE:
+        insight = _item('savings', MEDIUM, 'Low savings rate', f"You are saving {rate:.0f}% of income this month")
+    else:
+        return [_item('savings', LOW, 'Healthy savings rate', f"You are saving {rate:.0f}% of income this month")], []
+
+    target = income * TARGET_SAVINGS_RATE / 100
+    advice = _item('savings', insight['severity'], 'Raise your savings rate',
+                   f"Aim to keep {_money(target)} ({TARGET_SAVINGS_RATE}% of income) by trimming "
+                   f"{_money(max(expenses - (income - target), Decimal('0')))} of expenses")
+    return [insight], [advice]
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from ai.precompute import (
+    precompute_insights, PRECOMPUTE_WORKERS, PRECOMPUTE_RATE, PRECOMPUTE_MAX_AGE, ACTIVE_USER_DAYS,
+    get_active_user_ids
+)
+
+
+class Command(BaseCommand):
+    help = 'Precompute AI financial insights for active users (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=PRECOMPUTE_WORKERS, help='Concurrent LLM calls')
+        parser.add_argument('--rate', type=float, default=PRECOMPUTE_RATE, help='Max LLM calls per second')
+        parser.add_argument('--max-age', type=int, default=PRECOMPUTE_MAX_AGE,
+                            help='Seconds a precomputed insight stays fresh')
+        parser.add_argument('--active-days', type=int, default=ACTIVE_USER_DAYS,
+                            help='Only users active within this many days')
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Limit to these user ids')
+        parser.add_argument('--force', action='store_true', help='Regenerate even if a fresh insight exists')
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids'] or get_active_user_ids(options['active_days'])
+        started = time.monotonic()
+
+        summary = precompute_insights(
+            user_ids=user_ids,
+            workers=options['workers'],
+            rate=options['rate'],
+            max_age=options['max_age'],
+            force=options['force'],
+            log=lambda line: self.stderr.write(line)
+        )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Insights for {summary['users']} users: {summary['created']} created, "
+            f"{summary['skipped']} still fresh, {summary['failed']} failed in {elapsed:.1f}s; "
+            f"pruned {summary['pruned']} cached responses"
+        ))
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from ai.fake_openrouter import FakeOpenRouterServer
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake OpenRouter API for development and load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each reply')
+        parser.add_argument('--fail-first', type=int, default=0, help='Fail this many initial requests')
+        parser.add_argument('--fail-status', type=int, default=503)
+
+    def handle(self, *args, **options):
+        server = FakeOpenRouterServer(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            fail_first=options['fail_first'],
+            fail_status=options['fail_status']
+        ).start()
+
+        self.stdout.write(self.style.SUCCESS(f'Fake OpenRouter listening on {server.url}'))
+        self.stdout.write('Set OPENROUTER_API_URL to this address and press Ctrl+C to stop.')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,111 @@
+"""
+Conversation memory for multi-turn chat.
+
+Recent turns of a thread are replayed into the prompt newest first until
+the history token budget is spent. Older turns are folded into a running
+summary stored on the ConversationThread, so each turn is summarized once
+and prompt size stays bounded however long the thread grows.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from .encoding import count_tokens
+from .models import Conversation, ConversationThread
+from .prompts import build_chat_system_prompt, build_summary_prompt
+
+HISTORY_TOKEN_BUDGET = getattr(settings, 'AI_HISTORY_TOKEN_BUDGET', 1200)
+SUMMARY_TOKEN_BUDGET = getattr(settings, 'AI_SUMMARY_TOKEN_BUDGET', 300)
+# Unsummarized turns fetched per request; anything older is already over budget
+MAX_HISTORY_TURNS = 50
+CHARS_PER_TOKEN = 4
+
+
+def get_thread(user, thread_id=None, new=False):
+    """
+    The requested thread, a fresh one, or the user's most recent thread
+    """
+    if thread_id:
+        return ConversationThread.objects.get(pk=thread_id, user=user)
+    if not new:
+        thread = ConversationThread.objects.filter(user=user).first()
+        if thread is not None:
+            return thread
+    return ConversationThread.objects.create(user=user)
+
+
+def build_chat_messages(thread, context, message, summarize):
+    """
+    Chat messages for ``message``: system context, thread summary, the
+    recent turns that fit HISTORY_TOKEN_BUDGET, then the new question.
+
+    ``summarize(prompt)`` is called only when turns overflow the budget.
+    """
+    turns = list(
+        thread.turns.filter(id__gt=thread.summarized_through)
+        .order_by('-id')
+        .values_list('id', 'message', 'response')[:MAX_HISTORY_TURNS]
+    )
+
+    kept = []
+    used = 0
+    for turn in turns:
+        cost = count_tokens(turn[1]) + count_tokens(turn[2])
+        if used + cost > HISTORY_TOKEN_BUDGET:
+            break
+        kept.append(turn)
+        used += cost
+
+    overflow = turns[len(kept):]
+    if overflow:
+        fold_into_summary(thread, list(reversed(overflow)), summarize)
+
+    messages = [{"role": "system", "content": build_chat_system_prompt(context)}]
+    if thread.summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation: {thread.summary}"})
+    for _, question, answer in reversed(kept):
+        messages.append({"role": "user", "content": question})
+        messages.append({"role": "assistant", "content": answer})
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+def fold_into_summary(thread, turns, summarize):
+    """
+    Merge ``turns`` (oldest first) into the thread's cached summary
+    """
+    transcript = "\n".join(f"User: {question}\nAdvisor: {answer}" for _, question, answer in turns)
+    max_chars = SUMMARY_TOKEN_BUDGET * CHARS_PER_TOKEN
+    try:
+        summary = summarize(build_summary_prompt(
+            thread.summary, transcript, max_words=SUMMARY_TOKEN_BUDGET * 3 // 4
+        )).strip()
+    except Exception as e:
+        print(f"AI Summary Error: {str(e)}")
+        # Keep the most recent part of the history verbatim instead
+        summary = f"{thread.summary}\n{transcript}".strip()
+    summary = summary[-max_chars:]
+
+    thread.summary = summary
+    thread.summary_tokens = count_tokens(summary)
+    thread.summarized_through = turns[-1][0]
+    ConversationThread.objects.filter(pk=thread.pk).update(
+        summary=thread.summary,
+        summary_tokens=thread.summary_tokens,
+        summarized_through=thread.summarized_through
+    )
+
+
+def record_turn(thread, message, response):
+    """Save a chat turn on the thread and bump the thread's activity time"""
+    conversation = Conversation.objects.create(
+        user_id=thread.user_id,
+        thread=thread,
+        message=message,
+        response=response,
+        conversation_type='chat'
+    )
+    changes = {'updated_at': timezone.now()}
+    if not thread.title:
+        changes['title'] = message[:100]
+    ConversationThread.objects.filter(pk=thread.pk).update(**changes)
+    return conversation
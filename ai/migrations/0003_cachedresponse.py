@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0002_financialdataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('template', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=100)),
+                ('response', models.TextField()),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'ai_response_cache',
+                'indexes': [models.Index(fields=['last_used_at'], name='ai_response_last_us_0bacfa_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0004_conversation_precompute'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationThread',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=100)),
+                ('summary', models.TextField(blank=True)),
+                ('summary_tokens', models.PositiveIntegerField(default=0)),
+                ('summarized_through', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_threads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'ai_conversation_threads',
+                'ordering': ['-updated_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='thread',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='turns', to='ai.conversationthread'),
+        ),
+    ]
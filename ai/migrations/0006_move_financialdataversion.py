@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_conversationthread'),
+    ]
+
+    # The model moved to budget; its table stays and is adopted there
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.DeleteModel(name='FinancialDataVersion'),
+            ],
+            database_operations=[],
+        ),
+    ]
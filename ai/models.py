@@ -1,8 +1,30 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+class ConversationThread(models.Model):
+    """
+    A multi-turn chat. Turns that no longer fit the prompt's history budget
+    are folded into ``summary``; ``summarized_through`` is the id of the
+    last Conversation included in it.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_threads')
+    title = models.CharField(max_length=100, blank=True)
+    summary = models.TextField(blank=True)
+    summary_tokens = models.PositiveIntegerField(default=0)
+    summarized_through = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'ai_conversation_threads'
+        ordering = ['-updated_at']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.title or 'Chat'}"
+
 class Conversation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_conversations')
+    thread = models.ForeignKey(ConversationThread, on_delete=models.CASCADE, related_name='turns', null=True, blank=True)
     message = models.TextField()
     response = models.TextField()
     conversation_type = models.CharField(max_length=20, choices=[
@@ -12,9 +34,41 @@ class Conversation(models.Model):
     ], default='chat')
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Set on insights precomputed by the nightly batch job
+    is_precomputed = models.BooleanField(default=False)
+    data_version = models.PositiveBigIntegerField(null=True, blank=True)
+    fresh_until = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         db_table = 'ai_conversations'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'conversation_type', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.conversation_type} - {self.created_at}"
+
+class CachedResponse(models.Model):
+    """
+    Stored LLM reply keyed by a hash of (prompt template, normalized
+    financial context, model). Shared by all workers; pruned least
+    recently used first.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    template = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)
+    response = models.TextField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'ai_response_cache'
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.template} - {self.key[:12]}"
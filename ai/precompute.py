@@ -0,0 +1,148 @@
+"""
+Nightly precomputation of AI insights.
+
+Active users' insights are generated ahead of time by a bounded thread
+pool whose LLM calls are paced by a shared rate limiter. Each result is
+stored as a ``Conversation`` of type ``insight`` tagged with the data
+version it was built from and a ``fresh_until`` timestamp. The insights
+endpoint serves it for the rest of the day it was built, until it expires
+or the user has made more than ``AI_PRECOMPUTE_MAX_DRIFT`` writes since
+(a single new transaction rarely changes the advice).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from budget.versioning import get_data_version
+
+from .client import DEFAULT_MODEL, get_client
+from .context import get_versioned_financial_context
+from .models import Conversation
+from .prompts import build_insights_prompt
+from .response_cache import get_response_cache
+
+PRECOMPUTE_WORKERS = getattr(settings, 'AI_PRECOMPUTE_WORKERS', 4)
+PRECOMPUTE_RATE = getattr(settings, 'AI_PRECOMPUTE_RATE', 2.0)
+PRECOMPUTE_MAX_AGE = getattr(settings, 'AI_PRECOMPUTE_MAX_AGE', 60 * 60 * 24)
+ACTIVE_USER_DAYS = getattr(settings, 'AI_PRECOMPUTE_ACTIVE_DAYS', 30)
+# Data version bumps an insight survives before it is rebuilt
+PRECOMPUTE_MAX_DRIFT = getattr(settings, 'AI_PRECOMPUTE_MAX_DRIFT', 10)
+
+
+class RateLimiter:
+    """
+    Spaces calls at least ``1 / rate`` seconds apart across all threads
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def get_active_user_ids(days=ACTIVE_USER_DAYS):
+    """Users who logged in or recorded a transaction within ``days``"""
+    since = timezone.now() - timedelta(days=days)
+    return list(
+        User.objects.filter(is_active=True)
+        .filter(Q(last_login__gte=since) | Q(transactions__created_at__gte=since))
+        .distinct()
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+
+def get_fresh_precomputed_insight(user, max_drift=PRECOMPUTE_MAX_DRIFT):
+    """
+    Latest precomputed insight built today from close to the user's current
+    data (at most ``max_drift`` data version bumps behind), or None
+    """
+    now = timezone.now()
+    insight = Conversation.objects.filter(
+        user=user, conversation_type='insight', is_precomputed=True,
+        fresh_until__gt=now
+    ).first()
+    if insight is None or insight.data_version is None:
+        return None
+    if timezone.localdate(insight.created_at) != timezone.localdate(now):
+        return None
+    if not 0 <= get_data_version(user.id) - insight.data_version <= max_drift:
+        return None
+    return insight
+
+
+def precompute_user_insight(user, limiter=None, max_age=PRECOMPUTE_MAX_AGE, force=False):
+    """
+    Generate and store one user's insight. Returns 'created' or 'skipped'.
+    """
+    if not force and get_fresh_precomputed_insight(user) is not None:
+        return 'skipped'
+
+    context, version = get_versioned_financial_context(user)
+
+    def complete(prompt):
+        if limiter is not None:
+            limiter.wait()
+        return get_client().complete(prompt, model=DEFAULT_MODEL)
+
+    insights, _ = get_response_cache().get_or_generate(build_insights_prompt, context, DEFAULT_MODEL, complete)
+    Conversation.objects.create(
+        user=user,
+        message="Generate financial insights",
+        response=insights,
+        conversation_type='insight',
+        is_precomputed=True,
+        data_version=version,
+        fresh_until=timezone.now() + timedelta(seconds=max_age)
+    )
+    return 'created'
+
+
+def precompute_insights(user_ids=None, workers=PRECOMPUTE_WORKERS, rate=PRECOMPUTE_RATE,
+                        max_age=PRECOMPUTE_MAX_AGE, force=False, log=None):
+    """
+    Precompute insights for ``user_ids`` (default: active users)
+
+    Returns a summary dict with created/skipped/failed counts and the
+    number of response cache rows pruned afterwards.
+    """
+    if user_ids is None:
+        user_ids = get_active_user_ids()
+    limiter = RateLimiter(rate)
+    summary = {'users': len(user_ids), 'created': 0, 'skipped': 0, 'failed': 0}
+
+    def job(user_id):
+        close_old_connections()
+        try:
+            user = User.objects.get(pk=user_id)
+            return precompute_user_insight(user, limiter=limiter, max_age=max_age, force=force)
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-precompute') as pool:
+        futures = {pool.submit(job, user_id): user_id for user_id in user_ids}
+        for future in as_completed(futures):
+            try:
+                summary[future.result()] += 1
+            except Exception as e:
+                summary['failed'] += 1
+                if log:
+                    log(f"User {futures[future]}: {e}")
+
+    summary['pruned'] = get_response_cache().prune()
+    return summary
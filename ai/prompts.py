@@ -0,0 +1,104 @@
+"""
+Prompt templates for the AI advisor endpoints.
+
+Shared by the sync DRF views, the streaming endpoint and the async views
+so every path sends the same prompt for the same data. Financial data is
+rendered by ``encoding`` as compact tables under a token cap.
+"""
+from .encoding import encode_financial_context, encode_business_metrics, fmt_number
+
+
+def build_chat_system_prompt(context):
+    """System message for multi-turn chat; the question arrives as a user turn"""
+    return f"""
+You are MulaSense AI, a financial advisor assistant. Here's the user's financial context (amounts in $):
+
+{encode_financial_context(context)}
+
+Provide helpful, personalized financial advice based on their data. Keep responses concise and actionable.
+Use the earlier conversation to answer follow-up questions.
+"""
+
+
+def build_summary_prompt(previous_summary, transcript, max_words):
+    return f"""
+Summarize this conversation between a user and their financial advisor in at most {max_words} words.
+Keep facts, figures, decisions and open questions the advisor will need later.
+
+Earlier summary: {previous_summary or 'None'}
+
+New turns:
+{transcript}
+"""
+
+
+def build_insights_prompt(context):
+    return f"""
+Analyze this user's financial data (amounts in $) and provide 3-5 key insights:
+
+{encode_financial_context(context, transactions=0)}
+
+Provide insights about:
+1. Spending patterns
+2. Budget performance
+3. Goal progress
+4. Areas for improvement
+
+Format as bullet points, be specific and actionable.
+"""
+
+
+def build_recommendations_prompt(context):
+    return f"""
+Based on this financial data (amounts in $), provide 3-5 specific recommendations:
+
+{encode_financial_context(context, transactions=0)}
+
+Provide actionable recommendations for:
+1. Budget optimization
+2. Expense reduction
+3. Savings improvement
+4. Goal achievement
+
+Format as numbered list with specific amounts/percentages where possible.
+"""
+
+
+def build_business_prompt(metrics):
+    income = metrics['income']
+    profit = metrics['profit']
+    return f"""
+You are a Business Advisor AI for SMEs. Analyze this business data and provide insights:
+
+Current Month Performance:
+- Revenue: ${fmt_number(income)}
+- Expenses: ${fmt_number(metrics['expenses'])}
+- Net Profit: ${fmt_number(profit)}
+- Profit Margin: {(profit/income*100) if income > 0 else 0:.1f}%
+
+Previous Month:
+- Revenue: ${fmt_number(metrics['prev_income'])}
+- Expenses: ${fmt_number(metrics['prev_expenses'])}
+
+{encode_business_metrics(metrics)}
+
+Provide:
+1. Business health assessment
+2. Cash flow insights
+3. Cost optimization suggestions
+4. Growth opportunities
+5. Risk alerts (if any)
+
+Be specific with numbers and actionable recommendations.
+"""
+
+
+def business_metrics_summary(metrics):
+    income = metrics['income']
+    profit = metrics['profit']
+    return {
+        'revenue': float(income),
+        'expenses': float(metrics['expenses']),
+        'profit': float(profit),
+        'profit_margin': (profit/income*100) if income > 0 else 0
+    }
@@ -0,0 +1,208 @@
+"""
+Response cache for repeated AI insights and recommendations.
+
+Replies are keyed by a hash of the prompt template, the normalized
+financial context and the model, so the same numbers always map to the
+same key regardless of dict ordering or float noise. A bounded in-process
+LRU serves repeats in microseconds; the ``CachedResponse`` table shares
+entries between workers and survives restarts. Both tiers expire entries
+after a TTL and evict least recently used entries past their size limit.
+The table is pruned every ``AI_RESPONSE_CACHE_PRUNE_EVERY`` writes per
+process and by the nightly precompute job, not on every write, so it may
+briefly run over its limit.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CachedResponse
+
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'AI_RESPONSE_CACHE_TIMEOUT', 60 * 60 * 6)
+RESPONSE_CACHE_MAX_ENTRIES = getattr(settings, 'AI_RESPONSE_CACHE_MAX_ENTRIES', 1000)
+RESPONSE_CACHE_DB_MAX_ENTRIES = getattr(settings, 'AI_RESPONSE_CACHE_DB_MAX_ENTRIES', 10000)
+RESPONSE_CACHE_PRUNE_EVERY = getattr(settings, 'AI_RESPONSE_CACHE_PRUNE_EVERY', 100)
+
+
+def normalize_context(value):
+    """
+    Canonical form of a context: floats rounded to cents, strings trimmed
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize_context(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_context(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def template_fingerprint(builder):
+    """
+    Hash of a prompt builder's code and literals, so editing a template
+    invalidates its cached replies
+    """
+    code = builder.__code__
+    digest = hashlib.sha256(code.co_code)
+    digest.update(repr(code.co_consts).encode())
+    return digest.hexdigest()[:16]
+
+
+def make_cache_key(builder, context, model):
+    payload = json.dumps({
+        'template': builder.__name__,
+        'fingerprint': template_fingerprint(builder),
+        'context': normalize_context(context),
+        'model': model,
+    }, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier LRU + TTL cache of LLM replies with hit/miss counters
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, timeout=RESPONSE_CACHE_TIMEOUT,
+                 db_max_entries=RESPONSE_CACHE_DB_MAX_ENTRIES, prune_every=RESPONSE_CACHE_PRUNE_EVERY):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.db_max_entries = db_max_entries
+        self.prune_every = prune_every
+        self._sets_since_prune = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.local_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def record_coalesced(self):
+        """Count a request that joined an identical in-flight LLM call"""
+        with self._lock:
+            self.coalesced += 1
+
+    def get(self, key):
+        now = timezone.now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.local_hits += 1
+                    return response
+                del self._entries[key]
+
+        row = CachedResponse.objects.filter(key=key, expires_at__gt=now).values_list(
+            'response', 'expires_at'
+        ).first()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        CachedResponse.objects.filter(key=key).update(hit_count=F('hit_count') + 1, last_used_at=now)
+        response, expires_at = row
+        with self._lock:
+            self.db_hits += 1
+            self._store_local(key, response, expires_at)
+        return response
+
+    def set(self, key, response, template='', model=''):
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=self.timeout)
+        with self._lock:
+            self._store_local(key, response, expires_at)
+            self._sets_since_prune += 1
+            due = self._sets_since_prune >= self.prune_every
+            if due:
+                self._sets_since_prune = 0
+
+        CachedResponse.objects.update_or_create(
+            key=key,
+            defaults={
+                'template': template,
+                'model': model,
+                'response': response,
+                'last_used_at': now,
+                'expires_at': expires_at,
+            }
+        )
+        if due:
+            self.prune(now)
+
+    def get_or_generate(self, builder, context, model, generate):
+        """
+        Return (response, cached). ``generate(prompt)`` is only called on a miss.
+        """
+        key = make_cache_key(builder, context, model)
+        response = self.get(key)
+        if response is not None:
+            return response, True
+
+        response = generate(builder(context))
+        self.set(key, response, template=builder.__name__, model=model)
+        return response, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        CachedResponse.objects.all().delete()
+
+    def stats(self):
+        with self._lock:
+            hits = self.local_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': hits,
+                'local_hits': self.local_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0,
+            }
+
+    def _store_local(self, key, response, expires_at):
+        # Caller holds the lock
+        self._entries[key] = (response, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def prune(self, now=None):
+        """
+        Delete expired rows, then the least recently used past the size
+        limit. Returns the number of rows deleted.
+        """
+        now = now or timezone.now()
+        deleted, _ = CachedResponse.objects.filter(expires_at__lte=now).delete()
+        excess = CachedResponse.objects.count() - self.db_max_entries
+        if excess > 0:
+            stale_ids = list(
+                CachedResponse.objects.order_by('last_used_at').values_list('id', flat=True)[:excess]
+            )
+            deleted += CachedResponse.objects.filter(id__in=stale_ids).delete()[0]
+        return deleted
+
+
+_response_cache = ResponseCache()
+
+
+def get_response_cache():
+    return _response_cache
@@ -1,12 +1,20 @@
 from rest_framework import serializers
-from .models import Conversation
+from .models import Conversation, ConversationThread
 
 class ChatMessageSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=1000)
     response = serializers.CharField(read_only=True)
+    thread_id = serializers.IntegerField(required=False)
+    new_thread = serializers.BooleanField(required=False, default=False)
 
 class ConversationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Conversation
-        fields = ['id', 'message', 'response', 'conversation_type', 'created_at']
-        read_only_fields = ['created_at']
\ No newline at end of file
+        fields = ['id', 'thread', 'message', 'response', 'conversation_type', 'created_at']
+        read_only_fields = ['created_at']
+
+class ConversationThreadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ConversationThread
+        fields = ['id', 'title', 'summary', 'created_at', 'updated_at']
+        read_only_fields = fields
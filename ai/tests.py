@@ -1,3 +1,242 @@
-from django.test import TestCase
+import asyncio
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from budget.versioning import bump_data_version, get_data_version
+
+from .client import AsyncOpenRouterClient, CircuitBreaker, CircuitOpenError, OpenRouterClient, OpenRouterError
+from .fake_openrouter import FakeOpenRouterServer
+from .limiter import AIRateLimiter
+from .models import CachedResponse, Conversation
+from .precompute import get_fresh_precomputed_insight
+from .response_cache import ResponseCache
+
+MESSAGES = [{"role": "user", "content": "How much did I spend on food?"}]
+
+
+class OpenRouterClientTests(SimpleTestCase):
+    def start_server(self, **options):
+        server = FakeOpenRouterServer(**options).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def make_client(self, server, client_class=OpenRouterClient, **options):
+        options.setdefault('max_retries', 2)
+        return client_class(api_key='test-key', api_url=server.url, backoff_base=0, **options)
+
+    def test_retries_transient_failures(self):
+        server = self.start_server(fail_first=2)
+        client = self.make_client(server)
+
+        self.assertEqual(client.chat(MESSAGES), server.reply)
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(client.metrics.snapshot()['retries'], 2)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_gives_up_after_max_retries(self):
+        server = self.start_server(fail_first=10)
+        client = self.make_client(server)
+
+        with self.assertRaises(OpenRouterError) as ctx:
+            client.chat(MESSAGES)
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        server = self.start_server(fail_first=1, fail_status=400)
+        client = self.make_client(server)
+
+        with self.assertRaises(OpenRouterError) as ctx:
+            client.chat(MESSAGES)
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_open_circuit_rejects_without_calling_upstream(self):
+        server = self.start_server(fail_first=10)
+        client = self.make_client(server, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+        with self.assertRaises(OpenRouterError):
+            client.chat(MESSAGES)
+        with self.assertRaises(CircuitOpenError):
+            client.chat(MESSAGES)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(client.metrics.snapshot()['rejected_by_circuit'], 1)
+
+    def test_half_open_trial_closes_circuit_on_success(self):
+        server = self.start_server(fail_first=1)
+        client = self.make_client(server, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+
+        with self.assertRaises(OpenRouterError):
+            client.chat(MESSAGES)
+        self.assertEqual(client.breaker.state, 'half_open')
+        self.assertEqual(client.chat(MESSAGES), server.reply)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_unexpected_error_releases_half_open_trial(self):
+        server = self.start_server(fail_first=1)
+        client = self.make_client(server, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+        with self.assertRaises(OpenRouterError):
+            client.chat(MESSAGES)
+
+        with mock.patch.object(client.session, 'post', side_effect=requests.exceptions.InvalidHeader('bad header')):
+            with self.assertRaises(requests.RequestException):
+                client.chat(MESSAGES)
+
+        # The failed trial must not leave the breaker rejecting every later call
+        self.assertEqual(client.chat(MESSAGES), server.reply)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_stream_chat_yields_tokens(self):
+        server = self.start_server(reply='You spent 40 dollars')
+        client = self.make_client(server)
+
+        chunks = list(client.stream_chat(MESSAGES))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks).strip(), server.reply)
+        self.assertTrue(server.requests[0]['stream'])
+        self.assertEqual(client.metrics.snapshot()['completion_tokens'], 4)
+
+    def test_async_client_retries(self):
+        server = self.start_server(fail_first=1)
+        client = self.make_client(server, client_class=AsyncOpenRouterClient)
+
+        async def chat():
+            try:
+                return await client.achat(MESSAGES)
+            finally:
+                await client.async_session.aclose()
+
+        self.assertEqual(asyncio.run(chat()), server.reply)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_async_stream_chat_yields_tokens(self):
+        server = self.start_server(reply='You spent 40 dollars')
+        client = self.make_client(server, client_class=AsyncOpenRouterClient)
+
+        async def collect():
+            try:
+                return [chunk async for chunk in client.astream_chat(MESSAGES)]
+            finally:
+                await client.async_session.aclose()
+
+        chunks = asyncio.run(collect())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks).strip(), server.reply)
+
+
+class AIRateLimiterTests(SimpleTestCase):
+    def test_full_buckets_are_evicted(self):
+        limiter = AIRateLimiter(capacity=2, refill_per_minute=60000)
+        for user_id in range(50):
+            limiter.acquire(user_id)
+            limiter.release(user_id)
+        self.assertEqual(len(limiter._buckets), 50)
+
+        time.sleep(limiter.sweep_interval * 2)
+        limiter.acquire('active')
+
+        # Only the user that just spent a token keeps a bucket
+        self.assertEqual(list(limiter._buckets), ['active'])
+        self.assertEqual(limiter.state(0).remaining, 2)
+
+
+class ChatStreamViewTests(TestCase):
+    def setUp(self):
+        self.server = FakeOpenRouterServer(reply='Save more on food').start()
+        self.addCleanup(self.server.stop)
+        self.user = User.objects.create_user(username='streamer', password='secret')
+        self.token = Token.objects.create(user=self.user)
+
+    async def test_stream_is_async_and_sends_tokens(self):
+        client = AsyncOpenRouterClient(api_key='test-key', api_url=self.server.url, backoff_base=0)
+        with mock.patch('ai.async_views.get_async_client', return_value=client):
+            response = await self.async_client.post(
+                '/api/ai/chat/stream/', {'message': 'Where can I save?'}, content_type='application/json',
+                headers={'Authorization': f'Token {self.token.key}'}
+            )
+            self.assertEqual(response.status_code, 200)
+            # An async iterator is what lets the ASGI handler flush each event as it is produced
+            self.assertTrue(response.is_async)
+            body = ''.join([part.decode() async for part in response.streaming_content])
+        await client.async_session.aclose()
+
+        self.assertIn('"token": "Save ', body)
+        self.assertIn('event: done', body)
+
+
+class ConversationHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='historian', password='secret')
+        self.client.force_login(self.user)
+
+    def test_rejects_non_integer_thread_id(self):
+        response = self.client.get('/api/ai/conversations/', {'thread_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filters_by_thread_id(self):
+        response = self.client.get('/api/ai/conversations/', {'thread_id': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['conversations'], [])
+
+
+class PrecomputedInsightFreshnessTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='insightful', password='secret')
+        bump_data_version(self.user.id)
+
+    def store_insight(self, **fields):
+        return Conversation.objects.create(
+            user=self.user, message='Generate financial insights', response='Spend less on food',
+            conversation_type='insight', is_precomputed=True, data_version=get_data_version(self.user.id),
+            fresh_until=timezone.now() + timezone.timedelta(hours=12), **fields
+        )
+
+    def test_survives_a_few_writes(self):
+        insight = self.store_insight()
+        for _ in range(3):
+            bump_data_version(self.user.id)
+
+        self.assertEqual(get_fresh_precomputed_insight(self.user, max_drift=3), insight)
+
+    def test_too_many_writes_make_it_stale(self):
+        self.store_insight()
+        for _ in range(4):
+            bump_data_version(self.user.id)
+
+        self.assertIsNone(get_fresh_precomputed_insight(self.user, max_drift=3))
+
+    def test_built_on_an_earlier_day_is_stale(self):
+        insight = self.store_insight()
+        Conversation.objects.filter(pk=insight.pk).update(created_at=timezone.now() - timezone.timedelta(days=1))
+
+        self.assertIsNone(get_fresh_precomputed_insight(self.user))
+
+
+class ResponseCachePruneTests(TestCase):
+    def test_table_is_pruned_every_n_sets(self):
+        cache = ResponseCache(db_max_entries=2, prune_every=3)
+
+        with mock.patch.object(cache, 'prune', wraps=cache.prune) as prune:
+            for i in range(7):
+                cache.set(f'key-{i}', 'reply')
+
+        self.assertEqual(prune.call_count, 2)
+        # Six rows pruned down to two, plus the write since
+        self.assertEqual(CachedResponse.objects.count(), 3)
+
+    def test_prune_drops_expired_then_least_recently_used(self):
+        cache = ResponseCache(db_max_entries=2, prune_every=1000)
+        for i in range(4):
+            cache.set(f'key-{i}', 'reply')
+        CachedResponse.objects.filter(key='key-3').update(expires_at=timezone.now())
+
+        self.assertEqual(cache.prune(), 2)
+        self.assertEqual(set(CachedResponse.objects.values_list('key', flat=True)), {'key-1', 'key-2'})
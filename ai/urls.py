@@ -1,10 +1,13 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     # Chatbot
     path('chat/', views.chat_with_ai, name='ai-chat'),
+    # Streams natively under ASGI, so it is only served by the async view
+    path('chat/stream/', async_views.chat_with_ai_stream, name='ai-chat-stream'),
     path('conversations/', views.conversation_history, name='conversation-history'),
+    path('threads/', views.conversation_threads, name='conversation-threads'),
     
     # Financial Insights
     path('insights/', views.generate_financial_insights, name='financial-insights'),
@@ -14,4 +17,14 @@ urlpatterns = [
     
     # Business Advisor
     path('business-advisor/', views.business_advisor, name='business-advisor'),
+    
+    # Async (ASGI) variants
+    path('async/chat/', async_views.chat_with_ai, name='ai-chat-async'),
+    path('async/chat/stream/', async_views.chat_with_ai_stream, name='ai-chat-stream-async'),
+    path('async/insights/', async_views.generate_financial_insights, name='financial-insights-async'),
+    path('async/recommendations/', async_views.get_recommendations, name='ai-recommendations-async'),
+    path('async/business-advisor/', async_views.business_advisor, name='business-advisor-async'),
+    
+    # Monitoring
+    path('metrics/', views.client_metrics, name='ai-client-metrics'),
 ]
\ No newline at end of file
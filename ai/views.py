@@ -1,131 +1,141 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum
-from django.utils import timezone
-from datetime import timedelta
-import requests
 from django.conf import settings
-from .models import Conversation
-from .serializers import ChatMessageSerializer, ConversationSerializer
-from accounting.models import Transaction
-from budget.models import BudgetCategory, Goal
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import json
+import threading
+from users.permissions import IsAdminUser
+from .client import get_client, DEFAULT_MODEL
+from .models import Conversation, ConversationThread
+from .serializers import ChatMessageSerializer, ConversationSerializer, ConversationThreadSerializer
+from .context import get_user_financial_context, get_business_metrics
+from .response_cache import get_response_cache, make_cache_key
+from .local_insights import build_local_insights, format_items
+from .precompute import get_fresh_precomputed_insight
+from .memory import get_thread, build_chat_messages, record_turn
+from .limiter import ai_rate_limited, get_limiter
+from .prompts import (
+    build_insights_prompt, build_recommendations_prompt,
+    build_business_prompt, business_metrics_summary
+)
 
-# OpenRouter API Configuration
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
-import os
-OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY') or getattr(settings, 'OPENROUTER_API_KEY', '')
+def call_openrouter_ai(prompt, model=DEFAULT_MODEL):
+    """Call OpenRouter AI API through the shared pooled client"""
+    return get_client().complete(prompt, model=model)
 
-def call_openrouter_ai(prompt, model="meta-llama/llama-3.1-8b-instruct:free"):
-    """Call OpenRouter AI API"""
-    if not OPENROUTER_API_KEY or OPENROUTER_API_KEY == 'your-api-key-here':
-        raise ValueError("OpenRouter API key not configured. Set OPENROUTER_API_KEY environment variable.")
-    
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://mulasense.onrender.com",
-        "X-Title": "MulaSense Financial Advisor"
-    }
-    data = {
-        "model": model,
-        "messages": [{"role": "user", "content": prompt}]
-    }
-    response = requests.post(OPENROUTER_API_URL, headers=headers, json=data, timeout=30)
-    response.raise_for_status()
-    return response.json()["choices"][0]["message"]["content"]
+# Seconds an insight/recommendation request waits for the LLM before
+# answering from the local engine. The call keeps running and its reply
+# lands in the response cache for the next request.
+AI_LATENCY_BUDGET = getattr(settings, 'AI_LATENCY_BUDGET', 8)
 
-def get_user_financial_context(user):
-    """Get user's financial data for AI context"""
-    current_month = timezone.now().replace(day=1)
-    
-    # Recent transactions
-    recent_transactions = Transaction.objects.filter(
-        user=user, status='completed'
-    ).order_by('-transaction_date')[:10]
-    
-    # Monthly summary
-    income = Transaction.objects.filter(
-        user=user, transaction_type='income',
-        transaction_date__gte=current_month, status='completed'
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    expenses = Transaction.objects.filter(
-        user=user, transaction_type='expense',
-        transaction_date__gte=current_month, status='completed'
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    # Budget categories
-    budget_categories = BudgetCategory.objects.filter(user=user, is_active=True)
+_llm_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'OPENROUTER_POOL_SIZE', 20), thread_name_prefix='ai-llm'
+)
+
+# In-flight LLM calls by response-cache key, so identical concurrent
+# requests share one upstream call
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _forget_inflight(key, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+def generate_within_budget(builder, context, budget=None):
+    """
+    Return (reply, source) where source is 'cache' or 'llm', or (None, 'local')
+    when the LLM fails or does not answer within ``budget`` seconds.
+    Concurrent requests for the same prompt wait on a single upstream call.
+    """
+    budget = AI_LATENCY_BUDGET if budget is None else budget
+    cache = get_response_cache()
+    key = make_cache_key(builder, context, DEFAULT_MODEL)
+    reply = cache.get(key)
+    if reply is not None:
+        return reply, 'cache'
     
-    # Goals
-    active_goals = Goal.objects.filter(user=user, status='active')
+    def complete_and_store(prompt):
+        reply = call_openrouter_ai(prompt)
+        cache.set(key, reply, template=builder.__name__, model=DEFAULT_MODEL)
+        return reply
     
-    return {
-        'monthly_income': float(income),
-        'monthly_expenses': float(expenses),
-        'balance': float(income - expenses),
-        'budget_categories': [{
-            'name': cat.name,
-            'budgeted': float(cat.budgeted_amount),
-            'spent': float(cat.spent_amount),
-            'percentage_used': cat.percentage_used
-        } for cat in budget_categories],
-        'goals': [{
-            'name': goal.name,
-            'target': float(goal.target_amount),
-            'current': float(goal.current_amount),
-            'progress': goal.progress_percentage
-        } for goal in active_goals],
-        'recent_transactions': [{
-            'description': t.description,
-            'amount': float(t.amount),
-            'type': t.transaction_type,
-            'category': t.category.name
-        } for t in recent_transactions]
-    }
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = _llm_executor.submit(complete_and_store, builder(context))
+            _inflight[key] = future
+            future.add_done_callback(lambda done: _forget_inflight(key, done))
+        else:
+            cache.record_coalesced()
+    try:
+        return future.result(timeout=budget), 'llm'
+    except FutureTimeoutError:
+        print(f"AI latency budget of {budget}s exceeded; answering locally")
+    except Exception as e:
+        print(f"AI call failed; answering locally: {str(e)}")
+    return None, 'local'
+
+def local_fallback_reply(user):
+    """Chat fallback text built from the local insight engine"""
+    try:
+        local = build_local_insights(user)
+    except Exception:
+        return "I'm currently unable to process your request. Please try again shortly."
+    return (
+        "I can't reach the AI advisor right now, but here is what your numbers show:\n"
+        + format_items(local['insights'][:3])
+        + "\n\nSuggested next steps:\n"
+        + format_items(local['recommendations'][:3], numbered=True)
+    )
+
+def wants_fast_response(request):
+    return request.query_params.get('fast', '').lower() in ('1', 'true', 'yes')
+
+def sse_event(data, event=None):
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
 @api_view(['POST'])
+@ai_rate_limited
 def chat_with_ai(request):
+    """
+    Multi-turn chat. Continues ``thread_id`` (default: the latest thread) or
+    starts a new thread when ``new_thread`` is true.
+    """
     serializer = ChatMessageSerializer(data=request.data)
     if serializer.is_valid():
         message = serializer.validated_data['message']
         
+        try:
+            thread = get_thread(
+                request.user,
+                serializer.validated_data.get('thread_id'),
+                serializer.validated_data['new_thread']
+            )
+        except ConversationThread.DoesNotExist:
+            return Response({'error': 'Thread not found'}, status=status.HTTP_404_NOT_FOUND)
+        
         try:
             # Get user financial context
             context = get_user_financial_context(request.user)
             
-            # Create prompt with context
-            prompt = f"""
-You are MulaSense AI, a financial advisor assistant. Here's the user's financial context:
-
-Monthly Income: ${context['monthly_income']}
-Monthly Expenses: ${context['monthly_expenses']}
-Current Balance: ${context['balance']}
-
-Budget Categories: {context['budget_categories']}
-Goals: {context['goals']}
-Recent Transactions: {context['recent_transactions'][:5]}
-
-User Question: {message}
-
-Provide helpful, personalized financial advice based on their data. Keep responses concise and actionable.
-"""
+            # Context, thread memory and the new question
+            messages = build_chat_messages(thread, context, message, summarize=call_openrouter_ai)
             
             # Generate AI response
-            ai_response = call_openrouter_ai(prompt)
+            ai_response = get_client().chat(messages)
             
             # Save conversation
-            Conversation.objects.create(
-                user=request.user,
-                message=message,
-                response=ai_response,
-                conversation_type='chat'
-            )
+            record_turn(thread, message, ai_response)
             
             return Response({
                 'message': message,
-                'response': ai_response
+                'response': ai_response,
+                'thread_id': thread.id
             })
             
         except Exception as e:
@@ -134,46 +144,57 @@ Provide helpful, personalized financial advice based on their data. Keep respons
             traceback.print_exc()
             return Response({
                 'error': 'AI service unavailable',
-                'fallback_response': f'I\'m currently unable to process your request. Error: {str(e)}'
+                'fallback_response': local_fallback_reply(request.user)
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
+@ai_rate_limited
 def generate_financial_insights(request):
+    """
+    Financial insights from the LLM, with locally computed insights included
+    
+    Serves the nightly precomputed insight while it is fresh and the user's
+    data has not changed. ``?fast=true`` answers from the local engine only.
+    The local insights are also the reply when the LLM fails or exceeds
+    AI_LATENCY_BUDGET.
+    """
     try:
-        context = get_user_financial_context(request.user)
+        local = build_local_insights(request.user)['insights']
+        if not wants_fast_response(request):
+            precomputed = get_fresh_precomputed_insight(request.user)
+            if precomputed is not None:
+                return Response({
+                    'insights': precomputed.response,
+                    'source': 'precomputed',
+                    'cached': True,
+                    'local_insights': local,
+                    'generated_at': precomputed.created_at,
+                    'fresh_until': precomputed.fresh_until
+                })
         
-        prompt = f"""
-Analyze this user's financial data and provide 3-5 key insights:
-
-Monthly Income: ${context['monthly_income']}
-Monthly Expenses: ${context['monthly_expenses']}
-Balance: ${context['balance']}
-Budget Categories: {context['budget_categories']}
-Goals: {context['goals']}
-
-Provide insights about:
-1. Spending patterns
-2. Budget performance
-3. Goal progress
-4. Areas for improvement
-
-Format as bullet points, be specific and actionable.
-"""
-        
-        insights = call_openrouter_ai(prompt)
+        insights, source = None, 'local'
+        if not wants_fast_response(request):
+            context = get_user_financial_context(request.user)
+            insights, source = generate_within_budget(build_insights_prompt, context)
         
-        # Save as conversation
-        Conversation.objects.create(
-            user=request.user,
-            message="Generate financial insights",
-            response=insights,
-            conversation_type='insight'
-        )
+        if insights is None:
+            insights = format_items(local)
+        else:
+            # Save as conversation
+            Conversation.objects.create(
+                user=request.user,
+                message="Generate financial insights",
+                response=insights,
+                conversation_type='insight'
+            )
         
         return Response({
             'insights': insights,
+            'source': source,
+            'cached': source == 'cache',
+            'local_insights': local,
             'generated_at': timezone.now()
         })
         
@@ -185,41 +206,34 @@ Format as bullet points, be specific and actionable.
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 @api_view(['GET'])
+@ai_rate_limited
 def get_recommendations(request):
+    """
+    Recommendations from the LLM, falling back to the local engine like insights
+    """
     try:
-        context = get_user_financial_context(request.user)
-        
-        prompt = f"""
-Based on this financial data, provide 3-5 specific recommendations:
-
-Income: ${context['monthly_income']}
-Expenses: ${context['monthly_expenses']}
-Savings Rate: {((context['balance']/context['monthly_income'])*100) if context['monthly_income'] > 0 else 0:.1f}%
-
-Budget Performance: {context['budget_categories']}
-Goals: {context['goals']}
-
-Provide actionable recommendations for:
-1. Budget optimization
-2. Expense reduction
-3. Savings improvement
-4. Goal achievement
-
-Format as numbered list with specific amounts/percentages where possible.
-"""
-        
-        recommendations = call_openrouter_ai(prompt)
+        local = build_local_insights(request.user)['recommendations']
+        recommendations, source = None, 'local'
+        if not wants_fast_response(request):
+            context = get_user_financial_context(request.user)
+            recommendations, source = generate_within_budget(build_recommendations_prompt, context)
         
-        # Save as conversation
-        Conversation.objects.create(
-            user=request.user,
-            message="Generate recommendations",
-            response=recommendations,
-            conversation_type='recommendation'
-        )
+        if recommendations is None:
+            recommendations = format_items(local, numbered=True)
+        else:
+            # Save as conversation
+            Conversation.objects.create(
+                user=request.user,
+                message="Generate recommendations",
+                response=recommendations,
+                conversation_type='recommendation'
+            )
         
         return Response({
             'recommendations': recommendations,
+            'source': source,
+            'cached': source == 'cache',
+            'local_recommendations': local,
             'generated_at': timezone.now()
         })
         
@@ -232,74 +246,38 @@ Format as numbered list with specific amounts/percentages where possible.
 
 @api_view(['GET'])
 def conversation_history(request):
-    conversations = Conversation.objects.filter(user=request.user)[:20]
-    serializer = ConversationSerializer(conversations, many=True)
+    """
+    Recent conversations, optionally for one ``thread_id``; ``limit`` up to 100
+    """
+    conversations = Conversation.objects.filter(user=request.user)
+    thread_id = request.query_params.get('thread_id')
+    if thread_id:
+        try:
+            thread_id = int(thread_id)
+        except ValueError:
+            return Response({'error': 'thread_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        conversations = conversations.filter(thread_id=thread_id)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    serializer = ConversationSerializer(conversations[:limit], many=True)
     return Response({'conversations': serializer.data})
 
+@api_view(['GET'])
+def conversation_threads(request):
+    threads = ConversationThread.objects.filter(user=request.user)[:20]
+    serializer = ConversationThreadSerializer(threads, many=True)
+    return Response({'threads': serializer.data})
+
 @api_view(['POST'])
+@ai_rate_limited
 def business_advisor(request):
     """AI advisor specifically for SME business insights"""
     try:
         user = request.user
-        current_month = timezone.now().replace(day=1)
-        
-        # Get business metrics
-        transactions = Transaction.objects.filter(
-            user=user,
-            transaction_date__gte=current_month,
-            status='completed'
-        )
-        
-        income = transactions.filter(transaction_type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-        expenses = transactions.filter(transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        profit = income - expenses
-        
-        # Category breakdown
-        income_by_cat = transactions.filter(transaction_type='income').values(
-            'category__name'
-        ).annotate(total=Sum('amount')).order_by('-total')[:5]
-        
-        expense_by_cat = transactions.filter(transaction_type='expense').values(
-            'category__name'
-        ).annotate(total=Sum('amount')).order_by('-total')[:5]
-        
-        # Previous month comparison
-        prev_month = current_month - timedelta(days=1)
-        prev_month_start = prev_month.replace(day=1)
-        prev_transactions = Transaction.objects.filter(
-            user=user,
-            transaction_date__gte=prev_month_start,
-            transaction_date__lt=current_month,
-            status='completed'
-        )
-        prev_income = prev_transactions.filter(transaction_type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-        prev_expenses = prev_transactions.filter(transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        prompt = f"""
-You are a Business Advisor AI for SMEs. Analyze this business data and provide insights:
-
-Current Month Performance:
-- Revenue: ${float(income):,.2f}
-- Expenses: ${float(expenses):,.2f}
-- Net Profit: ${float(profit):,.2f}
-- Profit Margin: {(profit/income*100) if income > 0 else 0:.1f}%
-
-Previous Month:
-- Revenue: ${float(prev_income):,.2f}
-- Expenses: ${float(prev_expenses):,.2f}
-
-Top Revenue Sources: {list(income_by_cat)}
-Top Expense Categories: {list(expense_by_cat)}
-
-Provide:
-1. Business health assessment
-2. Cash flow insights
-3. Cost optimization suggestions
-4. Growth opportunities
-5. Risk alerts (if any)
-
-Be specific with numbers and actionable recommendations.
-"""
+        metrics = get_business_metrics(user)
+        prompt = build_business_prompt(metrics)
         
         advice = call_openrouter_ai(prompt)
         
@@ -313,12 +291,7 @@ Be specific with numbers and actionable recommendations.
         
         return Response({
             'advice': advice,
-            'metrics': {
-                'revenue': float(income),
-                'expenses': float(expenses),
-                'profit': float(profit),
-                'profit_margin': (profit/income*100) if income > 0 else 0
-            },
+            'metrics': business_metrics_summary(metrics),
             'generated_at': timezone.now()
         })
         
@@ -328,3 +301,20 @@ Be specific with numbers and actionable recommendations.
             'error': 'Unable to generate business advice',
             'fallback': f'Error: {str(e)}'
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def client_metrics(request):
+    """Upstream call metrics for the shared OpenRouter client, response cache and limiter"""
+    client = get_client()
+    limiter = get_limiter()
+    return Response({
+        'circuit_state': client.breaker.state,
+        'metrics': client.metrics.snapshot(),
+        'response_cache': get_response_cache().stats(),
+        'rate_limit': {
+            'capacity': limiter.capacity,
+            'refill_per_minute': round(limiter.refill_rate * 60, 2),
+            'max_concurrent_per_user': limiter.max_concurrent
+        }
+    })
@@ -0,0 +1,122 @@
+from decimal import Decimal
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from .models import BudgetCategory, BudgetAlert
+
+ALERT_THRESHOLDS = [threshold for threshold, _ in BudgetAlert.THRESHOLD_CHOICES]
+
+
+class BudgetAlertEngine:
+    """
+    Incremental budget threshold evaluation
+
+    Each completed expense is added to the matching active budget category
+    (same name as the transaction's category, period covering the
+    transaction date). Only thresholds crossed by that single expense are
+    checked, and each crossing is written once per category. Edits,
+    cancellations and deletions are applied as the difference between the
+    expense's old and new snapshot, so ``spent_amount`` follows the ledger.
+
+    A reversal only touches categories that existed when the old version of
+    the expense was saved (a budget created afterwards never counted it) and
+    never takes ``spent_amount`` below zero.
+    """
+
+    @staticmethod
+    def snapshot(transaction):
+        """
+        What an expense counts against budgets: (user_id, category name, date,
+        amount), or None if it doesn't count (not a completed expense)
+        """
+        if transaction is None or transaction.category_id is None:
+            return None
+        return BudgetAlertEngine._snapshot(
+            transaction.user_id, transaction.transaction_type, transaction.status,
+            transaction.category.name, transaction.transaction_date, transaction.amount
+        )
+
+    @staticmethod
+    def stored_snapshot(transaction_id):
+        """
+        (snapshot, updated_at) of the stored row, read as one narrow query, or
+        (None, None) if there is no such row
+        """
+        from accounting.models import Transaction
+
+        row = Transaction.objects.filter(pk=transaction_id).values_list(
+            'user_id', 'transaction_type', 'status', 'category__name', 'transaction_date', 'amount', 'updated_at'
+        ).first()
+        if row is None:
+            return None, None
+        return BudgetAlertEngine._snapshot(*row[:6]), row[6]
+
+    @staticmethod
+    def _snapshot(user_id, transaction_type, status, category_name, transaction_date, amount):
+        if transaction_type != 'expense' or status != 'completed' or category_name is None:
+            return None
+        return (user_id, category_name.lower(), transaction_date.date(), amount)
+
+    def record_expense(self, transaction):
+        return self.apply_change(None, self.snapshot(transaction), transaction)
+
+    def reverse_expense(self, transaction):
+        return self.apply_change(self.snapshot(transaction), None, transaction, applied_at=transaction.updated_at)
+
+    def apply_change(self, old, new, transaction, applied_at=None):
+        """
+        Move an expense's budget impact from snapshot ``old`` (saved at
+        ``applied_at``) to ``new``; returns the alerts raised by the new amount
+        """
+        if old == new:
+            return []
+
+        with db_transaction.atomic():
+            if old is not None:
+                self._adjust(old, -old[3], created_by=applied_at)
+            if new is None:
+                return []
+            return self._adjust(new, new[3], transaction)
+
+    def _adjust(self, snapshot, amount, transaction=None, created_by=None):
+        user_id, category_name, expense_date, _ = snapshot
+        alerts = []
+
+        categories = BudgetCategory.objects.select_for_update().filter(
+            user_id=user_id,
+            is_active=True,
+            name__iexact=category_name,
+            start_date__lte=expense_date,
+            end_date__gte=expense_date
+        )
+        if created_by is not None:
+            categories = categories.filter(created_at__lte=created_by)
+
+        for category in categories:
+            before = category.percentage_used
+            BudgetCategory.objects.filter(pk=category.pk).update(
+                spent_amount=Greatest(F('spent_amount') + amount, Decimal('0'))
+            )
+            category.spent_amount = max(category.spent_amount + amount, Decimal('0'))
+            after = category.percentage_used
+            if amount <= 0:
+                continue
+
+            alerts.extend(
+                BudgetAlert(
+                    user_id=user_id,
+                    budget_category=category,
+                    threshold=threshold,
+                    percentage_used=Decimal(after).quantize(Decimal('0.01')),
+                    spent_amount=category.spent_amount,
+                    budgeted_amount=category.budgeted_amount,
+                    transaction=transaction
+                )
+                for threshold in ALERT_THRESHOLDS
+                if before < threshold <= after
+            )
+
+        if alerts:
+            BudgetAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+
+        return alerts
@@ -0,0 +1,119 @@
+"""
+Amortization engine for Kashagi loans.
+
+Single-loan schedules are computed in Decimal so that persisted rows
+reconcile to the cent. The grid helpers use NumPy to price many
+(amount, duration) combinations in one pass for what-if quotes.
+"""
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+import numpy as np
+
+from core.dates import add_months
+
+CENT = Decimal('0.01')
+
+
+def to_cents(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def monthly_rate(annual_rate):
+    """Convert an annual percentage rate (e.g. 5.0) to a monthly fraction"""
+    return Decimal(str(annual_rate)) / Decimal('100') / Decimal('12')
+
+
+def monthly_payment(principal, annual_rate, months):
+    """Level monthly payment for a fully amortizing loan"""
+    if months <= 0:
+        raise ValueError('Loan duration must be at least one month')
+
+    principal = Decimal(str(principal))
+    rate = monthly_rate(annual_rate)
+    if rate == 0:
+        return to_cents(principal / months)
+
+    growth = (1 + rate) ** months
+    return to_cents(principal * rate * growth / (growth - 1))
+
+
+def build_schedule(principal, annual_rate, months, start_date=None):
+    """
+    Generate the full repayment schedule.
+
+    Returns one dict per period with the payment split into interest and
+    principal and the balance left afterwards. The final period absorbs
+    rounding drift so the balance always closes at exactly zero.
+    """
+    principal = to_cents(Decimal(str(principal)))
+    rate = monthly_rate(annual_rate)
+    payment = monthly_payment(principal, annual_rate, months)
+    start_date = start_date or date.today()
+
+    schedule = []
+    balance = principal
+    for period in range(1, months + 1):
+        interest = to_cents(balance * rate)
+        if period == months:
+            principal_part = balance
+        else:
+            principal_part = min(payment - interest, balance)
+        balance -= principal_part
+
+        schedule.append({
+            'period': period,
+            'due_date': add_months(start_date, period),
+            'payment_amount': principal_part + interest,
+            'principal_amount': principal_part,
+            'interest_amount': interest,
+            'balance_after': balance,
+        })
+
+    return schedule
+
+
+@lru_cache(maxsize=4096)
+def annuity_factor(annual_rate, months):
+    """
+    Payment per unit of principal, cached by (rate, months).
+
+    Only a handful of tier rates and durations exist, so the table stays
+    small and quote requests almost never recompute a factor.
+    """
+    rate = float(annual_rate) / 100 / 12
+    if rate == 0:
+        return 1.0 / months
+
+    growth = (1 + rate) ** months
+    return rate * growth / (growth - 1)
+
+
+def annuity_factors(durations, annual_rate):
+    """Vector of payment-per-unit-principal factors for each duration"""
+    return np.array([annuity_factor(annual_rate, int(months)) for months in durations], dtype=float)
+
+
+def quote_grid(amounts, durations, annual_rate):
+    """
+    Price every (amount, duration) pair at once.
+
+    Rows follow ``amounts`` and columns follow ``durations``. Returns
+    monthly payment, total repayable and total interest matrices rounded
+    to cents. Raises OverflowError if any cell is not finite.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    durations = np.asarray(durations, dtype=float)
+
+    payments = np.outer(amounts, annuity_factors(durations, annual_rate))
+    totals = payments * durations
+    if not np.isfinite(totals).all():
+        # JSON can't carry inf/nan; callers bound their inputs, this is the backstop
+        raise OverflowError('Quote is out of range')
+
+    return {
+        'monthly_payment': np.round(payments, 2),
+        'total_repayable': np.round(totals, 2),
+        'total_interest': np.round(totals - amounts[:, None], 2),
+    }
@@ -0,0 +1,128 @@
+"""
+Goal progress forecasting.
+
+Fits a contribution velocity (amount per day) for every active goal of a
+user in one vectorised pass over their GoalContribution history, projects
+each goal to its target date and classifies it as on track, at risk or
+off track. Results are cached per user under their financial data version
+(bumped on every goal and contribution write, see ``budget.versioning``), so a contribution made in
+any process invalidates the forecasts in all of them.
+"""
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Goal, GoalContribution
+from .versioning import bump_data_version, get_data_version
+
+ON_TRACK = 'on_track'
+AT_RISK = 'at_risk'
+OFF_TRACK = 'off_track'
+
+# Projected share of the target reached by the target date
+AT_RISK_RATIO = 0.8
+
+CACHE_KEY = 'goal_forecast:{user_id}:{version}:{day}'
+CACHE_TIMEOUT = getattr(settings, 'GOAL_FORECAST_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def invalidate_goal_forecast(user_id):
+    bump_data_version(user_id)
+
+
+def get_goal_forecasts(user_id, version=None):
+    """
+    Forecasts for the user's active goals keyed by goal id, served from cache
+    """
+    if version is None:
+        version = get_data_version(user_id)
+    key = CACHE_KEY.format(user_id=user_id, version=version, day=date.today().isoformat())
+    forecasts = cache.get(key)
+    if forecasts is None:
+        forecasts = forecast_user_goals(user_id)
+        cache.set(key, forecasts, CACHE_TIMEOUT)
+    return forecasts
+
+
+def forecast_user_goals(user_id, today=None):
+    today = today or date.today()
+
+    goals = list(
+        Goal.objects.filter(user_id=user_id, status='active')
+        .order_by('id')
+        .values_list('id', 'target_amount', 'current_amount', 'target_date', 'created_at')
+    )
+    if not goals:
+        return {}
+
+    goal_ids = np.array([g[0] for g in goals])
+    target = np.array([float(g[1]) for g in goals])
+    current = np.array([float(g[2]) for g in goals])
+    days_left = np.array([(g[3] - today).days for g in goals], dtype=float)
+    created = [g[4].date() for g in goals]
+    age_days = np.array([max((today - c).days, 1) for c in created], dtype=float)
+
+    history = list(
+        GoalContribution.objects.filter(goal_id__in=goal_ids.tolist())
+        .order_by('goal_id', 'contribution_date')
+        .values_list('goal_id', 'amount', 'contribution_date')
+    )
+    velocity = _fit_velocity(goal_ids, created, age_days, current, history)
+
+    projected = current + velocity * np.maximum(days_left, 0)
+    ratio = np.divide(projected, target, out=np.ones_like(target), where=target > 0)
+
+    status = np.where(ratio >= 1, ON_TRACK, np.where(ratio >= AT_RISK_RATIO, AT_RISK, OFF_TRACK))
+    status = np.where(current >= target, ON_TRACK, status)
+    status = np.where((days_left < 0) & (current < target), OFF_TRACK, status)
+
+    return {
+        int(goal_ids[i]): {
+            'status': str(status[i]),
+            'daily_velocity': round(float(velocity[i]), 2),
+            'monthly_velocity': round(float(velocity[i]) * 30.44, 2),
+            'projected_amount': round(float(projected[i]), 2),
+            'projected_progress': round(min(float(ratio[i]), 10.0) * 100, 1),
+        }
+        for i in range(len(goals))
+    }
+
+
+def _fit_velocity(goal_ids, created, age_days, current, history):
+    """
+    Least-squares slope of cumulative contributions against goal age.
+
+    Per-goal sums are accumulated with ``np.bincount`` so the whole fit is
+    a handful of array operations regardless of how many goals there are.
+    Goals with fewer than two contributions fall back to their average
+    pace since creation.
+    """
+    fallback = current / age_days
+    if not history:
+        return fallback
+
+    idx = np.searchsorted(goal_ids, [row[0] for row in history])
+    amounts = np.array([float(row[1]) for row in history])
+    x = np.array([
+        (row[2].date() - created[i]).days for row, i in zip(history, idx)
+    ], dtype=float)
+
+    # Cumulative amount within each goal (rows are sorted by goal, then date)
+    size = len(goal_ids)
+    totals = np.bincount(idx, weights=amounts, minlength=size)
+    offsets = np.concatenate(([0.0], np.cumsum(totals)[:-1]))
+    y = np.cumsum(amounts) - offsets[idx]
+
+    n = np.bincount(idx, minlength=size).astype(float)
+    sx = np.bincount(idx, weights=x, minlength=size)
+    sy = np.bincount(idx, weights=y, minlength=size)
+    sxx = np.bincount(idx, weights=x * x, minlength=size)
+    sxy = np.bincount(idx, weights=x * y, minlength=size)
+
+    denom = n * sxx - sx * sx
+    fitted = (n >= 2) & (denom > 0)
+    slope = np.divide(n * sxy - sx * sy, denom, out=np.zeros(size), where=fitted)
+
+    return np.where(fitted, np.maximum(slope, 0), fallback)
@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import F
+from .models import Goal, GoalContribution
+from .forecasting import invalidate_goal_forecast
+
+AVERAGE_DAYS_PER_MONTH = Decimal('30.44')
+
+
+class GoalLedgerService:
+    """
+    Goal contribution ledger
+
+    Every change to a contribution is applied to ``Goal.current_amount``
+    as an atomic F() delta, so concurrent contributions never lose updates
+    and edits or deletions are reversed. Pace projections are refreshed in
+    the same transaction and stored on the goal.
+    """
+
+    def add_contribution(self, goal, amount, notes=''):
+        amount = Decimal(str(amount))
+        if amount <= 0:
+            raise ValueError('Contribution amount must be greater than 0')
+
+        with transaction.atomic():
+            contribution = GoalContribution.objects.create(goal=goal, amount=amount, notes=notes)
+            self._apply_delta(goal.pk, amount)
+
+        return contribution
+
+    def update_contribution(self, contribution, **changes):
+        """
+        Apply edits to a contribution, moving the amount between goals if needed.
+        Returns the updated contribution, or None if it was deleted meanwhile
+        """
+        with transaction.atomic():
+            # Deltas come from the locked row, not the caller's (possibly stale) copy
+            contribution = GoalContribution.objects.select_for_update().filter(pk=contribution.pk).first()
+            if contribution is None:
+                return None
+            old_goal_id = contribution.goal_id
+            old_amount = contribution.amount
+
+            for field, value in changes.items():
+                setattr(contribution, field, value)
+            contribution.save()
+
+            if contribution.goal_id != old_goal_id:
+                self._apply_delta(old_goal_id, -old_amount)
+                self._apply_delta(contribution.goal_id, contribution.amount)
+            elif contribution.amount != old_amount:
+                self._apply_delta(old_goal_id, contribution.amount - old_amount)
+
+        return contribution
+
+    def delete_contribution(self, contribution):
+        """
+        Delete a contribution and reverse its amount; returns False if it was already gone
+        """
+        with transaction.atomic():
+            contribution = GoalContribution.objects.select_for_update().filter(pk=contribution.pk).first()
+            if contribution is None:
+                return False
+            goal_id = contribution.goal_id
+            amount = contribution.amount
+            contribution.delete()
+            self._apply_delta(goal_id, -amount)
+        return True
+
+    def _apply_delta(self, goal_id, delta):
+        Goal.objects.filter(pk=goal_id).update(current_amount=F('current_amount') + delta)
+        self.refresh_projections(goal_id)
+
+    def refresh_projections(self, goal_id):
+        """
+        Recalculate and store the pace projections for a goal
+        """
+        goal = Goal.objects.filter(pk=goal_id).only(
+            'user', 'target_amount', 'current_amount', 'target_date', 'created_at'
+        ).first()
+        if goal is None:
+            return None
+
+        user_id = goal.user_id
+        transaction.on_commit(lambda: invalidate_goal_forecast(user_id))
+
+        required, projected = calculate_projections(goal)
+        Goal.objects.filter(pk=goal_id).update(
+            required_monthly_contribution=required,
+            projected_completion_date=projected
+        )
+        return required, projected
+
+
+def calculate_projections(goal, today=None):
+    """
+    Return (required_monthly_contribution, projected_completion_date)
+
+    The required contribution spreads what is left evenly over the months
+    until the target date. The projected completion date extrapolates the
+    average daily pace since the goal was created.
+    """
+    today = today or date.today()
+    remaining = max(goal.target_amount - goal.current_amount, Decimal('0.00'))
+
+    if remaining == 0:
+        return Decimal('0.00'), today
+
+    days_left = (goal.target_date - today).days
+    months_left = max(Decimal(days_left) / AVERAGE_DAYS_PER_MONTH, Decimal('1'))
+    required = (remaining / months_left).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    days_active = max((today - goal.created_at.date()).days, 1)
+    daily_pace = goal.current_amount / days_active
+    if daily_pace <= 0:
+        return required, None
+
+    days_to_finish = int((remaining / daily_pace).to_integral_value(rounding=ROUND_HALF_UP))
+    try:
+        projected = today + timedelta(days=days_to_finish)
+    except OverflowError:
+        projected = None
+
+    return required, projected
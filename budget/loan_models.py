@@ -34,6 +34,8 @@ class LoanApplication(models.Model):
     interest_rate = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('5.00'))
     duration_months = models.IntegerField(default=12)
     monthly_payment = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    outstanding_balance = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    total_repaid = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     health_score_at_application = models.IntegerField()
     application_date = models.DateTimeField(auto_now_add=True)
@@ -47,6 +49,29 @@ class LoanApplication(models.Model):
     def __str__(self):
         return f"{self.user.username} - ${self.amount_requested} - {self.status}"
 
+class LoanScheduleEntry(models.Model):
+    loan = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='schedule')
+    period = models.PositiveIntegerField()
+    due_date = models.DateField()
+    payment_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    principal_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    interest_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    is_paid = models.BooleanField(default=False)
+    
+    class Meta:
+        db_table = 'loan_schedule_entries'
+        ordering = ['period']
+        unique_together = ['loan', 'period']
+    
+    @property
+    def amount_due(self):
+        return self.payment_amount - self.amount_paid
+    
+    def __str__(self):
+        return f"Loan {self.loan_id} - Period {self.period}"
+
 class LoanRepayment(models.Model):
     loan = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='repayments')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -0,0 +1,150 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from .amortization import build_schedule, to_cents
+from .loan_models import LoanApplication, LoanScheduleEntry, LoanRepayment
+
+# Minimum health score -> annual interest rate (%) for approved loans
+LOAN_RATE_TIERS = [
+    (80, Decimal('3.5')),
+    (60, Decimal('5.0')),
+    (40, Decimal('7.5')),
+]
+REJECTED_RATE = Decimal('10.0')
+
+# Upper bounds for applications and quotes; beyond them the schedule and
+# the float quote grid stop being meaningful (or finite)
+LOAN_MAX_AMOUNT = Decimal(str(getattr(settings, 'LOAN_MAX_AMOUNT', 1000000)))
+LOAN_MAX_DURATION_MONTHS = getattr(settings, 'LOAN_MAX_DURATION_MONTHS', 360)
+
+
+def get_loan_terms(score):
+    """
+    Return (approved, interest_rate) for a financial health score
+    """
+    for min_score, rate in LOAN_RATE_TIERS:
+        if score >= min_score:
+            return True, rate
+    return False, REJECTED_RATE
+
+
+class LoanService:
+    """
+    Kashagi loan ledger
+
+    Persists the amortization schedule for a loan, allocates repayments
+    against it (interest first, oldest period first) and keeps the loan's
+    outstanding balance current so it never has to be re-derived.
+    """
+
+    def generate_schedule(self, loan, start_date=None):
+        """
+        (Re)build and persist the schedule for an approved loan
+        """
+        principal = loan.amount_approved or loan.amount_requested
+        rows = build_schedule(principal, loan.interest_rate, loan.duration_months, start_date)
+
+        with transaction.atomic():
+            loan.schedule.all().delete()
+            LoanScheduleEntry.objects.bulk_create([
+                LoanScheduleEntry(loan=loan, **row) for row in rows
+            ])
+            loan.monthly_payment = rows[0]['payment_amount']
+            loan.outstanding_balance = to_cents(principal)
+            loan.total_repaid = Decimal('0.00')
+            loan.save(update_fields=['monthly_payment', 'outstanding_balance', 'total_repaid'])
+
+        return rows
+
+    def ensure_schedule(self, loan):
+        """
+        Build the schedule of a loan approved before schedules were stored,
+        replaying any repayments already recorded against it (caller holds
+        the loan's row lock)
+        """
+        if loan.schedule.exists():
+            return
+        start_date = loan.approval_date.date() if loan.approval_date else None
+        self.generate_schedule(loan, start_date)
+
+        repaid = loan.repayments.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        if repaid > 0:
+            entries = list(loan.schedule.order_by('period'))
+            touched, principal_paid, _ = self._allocate(entries, repaid)
+            LoanScheduleEntry.objects.bulk_update(touched, ['amount_paid', 'is_paid'])
+            LoanApplication.objects.filter(pk=loan.pk).update(
+                outstanding_balance=F('outstanding_balance') - principal_paid,
+                total_repaid=repaid
+            )
+
+    @staticmethod
+    def _allocate(entries, amount):
+        """
+        Spread ``amount`` over ``entries`` oldest first, interest before
+        principal; returns (touched entries, principal paid, interest paid)
+        """
+        remaining = amount
+        principal_paid = Decimal('0.00')
+        interest_paid = Decimal('0.00')
+        touched = []
+        for entry in entries:
+            if remaining <= 0:
+                break
+            applied = min(remaining, entry.amount_due)
+            interest_due = max(entry.interest_amount - entry.amount_paid, Decimal('0.00'))
+            to_interest = min(applied, interest_due)
+
+            interest_paid += to_interest
+            principal_paid += applied - to_interest
+            entry.amount_paid += applied
+            entry.is_paid = entry.amount_paid >= entry.payment_amount
+            touched.append(entry)
+            remaining -= applied
+        return touched, principal_paid, interest_paid
+
+    def record_repayment(self, loan, amount):
+        """
+        Apply a repayment to the oldest unpaid schedule entries
+        """
+        amount = to_cents(Decimal(str(amount)))
+        if amount <= 0:
+            raise ValueError('Repayment amount must be greater than 0')
+
+        with transaction.atomic():
+            loan = LoanApplication.objects.select_for_update().get(pk=loan.pk)
+            if loan.status not in ('approved', 'disbursed'):
+                raise ValueError(f'Cannot record repayments on a {loan.status} loan')
+            self.ensure_schedule(loan)
+
+            entries = list(loan.schedule.filter(is_paid=False).order_by('period'))
+            total_due = sum((entry.amount_due for entry in entries), Decimal('0.00'))
+            if amount > total_due:
+                raise ValueError(f'Repayment exceeds the amount still owed ({total_due})')
+
+            touched, principal_paid, interest_paid = self._allocate(entries, amount)
+            LoanScheduleEntry.objects.bulk_update(touched, ['amount_paid', 'is_paid'])
+            repayment = LoanRepayment.objects.create(
+                loan=loan,
+                amount=amount,
+                principal_amount=principal_paid,
+                interest_amount=interest_paid
+            )
+
+            LoanApplication.objects.filter(pk=loan.pk).update(
+                outstanding_balance=F('outstanding_balance') - principal_paid,
+                total_repaid=F('total_repaid') + amount
+            )
+            if amount == total_due:
+                LoanApplication.objects.filter(pk=loan.pk).update(status='repaid')
+
+        return repayment
+
+    @staticmethod
+    def get_outstanding_balance(loan):
+        """
+        Outstanding principal as maintained by the ledger
+        """
+        if loan.outstanding_balance is not None:
+            return loan.outstanding_balance
+        return loan.amount_approved or Decimal('0.00')
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:26
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0002_financialhealthscore_loanapplication_loanrepayment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='outstanding_balance',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='total_repaid',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='LoanScheduleEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveIntegerField()),
+                ('due_date', models.DateField()),
+                ('payment_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('principal_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('interest_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('is_paid', models.BooleanField(default=False)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='budget.loanapplication')),
+            ],
+            options={
+                'db_table': 'loan_schedule_entries',
+                'ordering': ['period'],
+                'unique_together': {('loan', 'period')},
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:27
+
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+AVERAGE_DAYS_PER_MONTH = Decimal('30.44')
+
+
+def calculate_projections(goal, today):
+    # Frozen copy of budget.goal_services.calculate_projections as of this migration
+    remaining = max(goal.target_amount - goal.current_amount, Decimal('0.00'))
+
+    if remaining == 0:
+        return Decimal('0.00'), today
+
+    days_left = (goal.target_date - today).days
+    months_left = max(Decimal(days_left) / AVERAGE_DAYS_PER_MONTH, Decimal('1'))
+    required = (remaining / months_left).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    days_active = max((today - goal.created_at.date()).days, 1)
+    daily_pace = goal.current_amount / days_active
+    if daily_pace <= 0:
+        return required, None
+
+    days_to_finish = int((remaining / daily_pace).to_integral_value(rounding=ROUND_HALF_UP))
+    try:
+        projected = today + timedelta(days=days_to_finish)
+    except OverflowError:
+        projected = None
+
+    return required, projected
+
+
+def backfill_projections(apps, schema_editor):
+    Goal = apps.get_model('budget', 'Goal')
+    today = date.today()
+    for goal in Goal.objects.all().iterator():
+        required, projected = calculate_projections(goal, today)
+        Goal.objects.filter(pk=goal.pk).update(
+            required_monthly_contribution=required,
+            projected_completion_date=projected
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0003_loanapplication_outstanding_balance_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='projected_completion_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='goal',
+            name='required_monthly_contribution',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(backfill_projections, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_alter_category_category_type'),
+        ('budget', '0004_goal_projected_completion_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold', models.PositiveSmallIntegerField(choices=[(50, '50% used'), (80, '80% used'), (100, 'Over budget')])),
+                ('percentage_used', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('spent_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('budgeted_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('budget_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='budget.budgetcategory')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='budget_alerts', to='accounting.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'budget_alerts',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'is_read', '-created_at'], name='budget_aler_user_id_a88280_idx')],
+                'unique_together': {('budget_category', 'threshold')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0006_move_financialdataversion'),
+        ('budget', '0005_budgetalert'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Takes over the table the ai app created (ai 0002)
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='FinancialDataVersion',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('version', models.PositiveBigIntegerField(default=0)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='financial_data_version', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'ai_financial_data_versions',
+                    },
+                ),
+            ],
+            database_operations=[],
+        ),
+    ]
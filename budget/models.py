@@ -49,6 +49,34 @@ class BudgetCategory(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.name} ({self.start_date})"
 
+class BudgetAlert(models.Model):
+    THRESHOLD_CHOICES = [
+        (50, '50% used'),
+        (80, '80% used'),
+        (100, 'Over budget'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_alerts')
+    budget_category = models.ForeignKey(BudgetCategory, on_delete=models.CASCADE, related_name='alerts')
+    threshold = models.PositiveSmallIntegerField(choices=THRESHOLD_CHOICES)
+    percentage_used = models.DecimalField(max_digits=7, decimal_places=2)
+    spent_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    budgeted_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    transaction = models.ForeignKey('accounting.Transaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='budget_alerts')
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'budget_alerts'
+        ordering = ['-created_at']
+        unique_together = ['budget_category', 'threshold']
+        indexes = [
+            models.Index(fields=['user', 'is_read', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.budget_category.name} - {self.threshold}%"
+
 class Goal(models.Model):
     GOAL_TYPES = [
         ('savings', 'Savings'),
@@ -86,6 +114,8 @@ class Goal(models.Model):
         default=1,
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
+    required_monthly_contribution = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    projected_completion_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -129,4 +159,21 @@ class GoalContribution(models.Model):
         ordering = ['-contribution_date']
     
     def __str__(self):
-        return f"{self.goal.name} - ${self.amount}"
\ No newline at end of file
+        return f"{self.goal.name} - ${self.amount}"
+
+class FinancialDataVersion(models.Model):
+    """
+    Per-user counter bumped whenever budget, goal or transaction data changes.
+    Derived caches (goal forecasts, the AI context) are keyed by it, so a
+    bump invalidates them.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='financial_data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        # Created by the ai app, which used to own the counter
+        db_table = 'ai_financial_data_versions'
+    
+    def __str__(self):
+        return f"{self.user.username} - v{self.version}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import BudgetCategory, Goal, GoalContribution
+from .models import BudgetCategory, BudgetAlert, Goal, GoalContribution
 
 class BudgetCategorySerializer(serializers.ModelSerializer):
     remaining_amount = serializers.ReadOnlyField()
@@ -21,8 +21,19 @@ class GoalSerializer(serializers.ModelSerializer):
         model = Goal
         fields = ['id', 'name', 'description', 'goal_type', 'target_amount', 'current_amount',
                  'progress_percentage', 'remaining_amount', 'target_date', 'days_remaining',
+                 'required_monthly_contribution', 'projected_completion_date',
                  'status', 'priority', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        # current_amount only moves through GoalLedgerService's F() deltas
+        read_only_fields = ['current_amount', 'required_monthly_contribution', 'projected_completion_date',
+                           'created_at', 'updated_at']
+    
+    def update(self, instance, validated_data):
+        # Write only the edited columns, so the instance's stale current_amount
+        # never overwrites a contribution committed since it was read
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
 
 class GoalContributionSerializer(serializers.ModelSerializer):
     goal_name = serializers.CharField(source='goal.name', read_only=True)
@@ -30,4 +41,15 @@ class GoalContributionSerializer(serializers.ModelSerializer):
     class Meta:
         model = GoalContribution
         fields = ['id', 'goal', 'goal_name', 'amount', 'contribution_date', 'notes']
-        read_only_fields = ['contribution_date']
\ No newline at end of file
+        read_only_fields = ['contribution_date']
+
+class BudgetAlertSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='budget_category.name', read_only=True)
+    threshold_display = serializers.CharField(source='get_threshold_display', read_only=True)
+    
+    class Meta:
+        model = BudgetAlert
+        fields = ['id', 'budget_category', 'category_name', 'threshold', 'threshold_display',
+                 'percentage_used', 'spent_amount', 'budgeted_amount', 'transaction',
+                 'is_read', 'created_at']
+        read_only_fields = fields
\ No newline at end of file
@@ -0,0 +1,46 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from accounting.models import Transaction
+from .alerts import BudgetAlertEngine
+from .models import BudgetCategory, Goal, GoalContribution
+from .versioning import bump_data_version
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_budget_snapshot(sender, instance, **kwargs):
+    """Keep what the stored row counted against budgets, to diff after the save"""
+    snapshot, saved_at = None, None
+    if instance.pk is not None:
+        snapshot, saved_at = BudgetAlertEngine.stored_snapshot(instance.pk)
+    instance._budget_snapshot = snapshot
+    instance._budget_saved_at = saved_at
+
+
+@receiver(post_save, sender=Transaction)
+def evaluate_budget_alerts(sender, instance, created, **kwargs):
+    """Apply new, edited, completed and cancelled expenses to the budget alert engine"""
+    old = getattr(instance, '_budget_snapshot', None)
+    saved_at = getattr(instance, '_budget_saved_at', None)
+    BudgetAlertEngine().apply_change(old, BudgetAlertEngine.snapshot(instance), instance, applied_at=saved_at)
+    instance._budget_snapshot = BudgetAlertEngine.snapshot(instance)
+    instance._budget_saved_at = instance.updated_at
+
+
+@receiver(post_delete, sender=Transaction)
+def reverse_budget_spending(sender, instance, **kwargs):
+    BudgetAlertEngine().reverse_expense(instance)
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=BudgetCategory)
+@receiver([post_save, post_delete], sender=Goal)
+def bump_owner_data_version(sender, instance, **kwargs):
+    """Invalidate the owner's cached forecasts and AI context"""
+    bump_data_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=GoalContribution)
+def bump_contribution_data_version(sender, instance, **kwargs):
+    user_id = Goal.objects.filter(pk=instance.goal_id).values_list('user_id', flat=True).first()
+    if user_id:
+        bump_data_version(user_id)
@@ -0,0 +1,201 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounting.models import Category, Transaction
+
+from .alerts import BudgetAlertEngine
+from .amortization import quote_grid
+from .goal_services import GoalLedgerService
+from .models import BudgetCategory, Goal
+from .serializers import GoalSerializer
+from .loan_models import FinancialHealthScore, LoanApplication, LoanRepayment
+from .loan_services import LOAN_MAX_DURATION_MONTHS, LoanService
+
+
+class QuoteGridTests(SimpleTestCase):
+    def test_non_finite_cells_raise(self):
+        with self.assertRaises(OverflowError):
+            quote_grid([1.7e308], [360], 5.0)
+
+    def test_overflowing_duration_raises(self):
+        with self.assertRaises(ArithmeticError):
+            quote_grid([100], [10000000], 5.0)
+
+
+class LoanQuoteViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='borrower', password='secret')
+        self.client.force_login(self.user)
+
+    def quote(self, **params):
+        return self.client.get('/api/budget/loan/quote/', params)
+
+    def test_default_grid(self):
+        response = self.quote(amounts='100,200', durations='6,12')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['monthly_payment']), 2)
+
+    def test_huge_duration_is_rejected(self):
+        response = self.quote(amounts='100', durations='10000000')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(LOAN_MAX_DURATION_MONTHS), response.json()['error'])
+
+    def test_huge_amount_is_rejected(self):
+        response = self.quote(amounts='1e307', durations='12')
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_numeric_duration_is_rejected(self):
+        self.assertEqual(self.quote(durations='x').status_code, 400)
+
+
+class LoanApplicationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='applicant', password='secret')
+        FinancialHealthScore.objects.create(user=self.user, score=85)
+        self.client.force_login(self.user)
+
+    def apply(self, **data):
+        return self.client.post('/api/budget/loan/apply/', data, content_type='application/json')
+
+    def test_approved_loan_gets_its_schedule(self):
+        response = self.apply(amount='1200', duration_months=12)
+
+        self.assertEqual(response.status_code, 200)
+        loan = LoanApplication.objects.get(pk=response.json()['loan_id'])
+        self.assertEqual(loan.status, 'approved')
+        self.assertEqual(loan.schedule.count(), 12)
+
+    def test_invalid_terms_are_rejected(self):
+        for data in (
+            {'amount': 'abc'},
+            {'amount': '-50'},
+            {'amount': '0'},
+            {'amount': '100', 'duration_months': 'x'},
+            {'amount': '100', 'duration_months': 0},
+            {'amount': '100', 'duration_months': 10000000},
+        ):
+            with self.subTest(data):
+                self.assertEqual(self.apply(**data).status_code, 400)
+        self.assertFalse(LoanApplication.objects.exists())
+
+    def test_failed_schedule_leaves_no_loan(self):
+        with mock.patch.object(LoanService, 'generate_schedule', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.apply(amount='1200', duration_months=12)
+        self.assertFalse(LoanApplication.objects.exists())
+
+
+class LegacyLoanRepaymentTests(TestCase):
+    def test_schedule_is_built_on_first_repayment(self):
+        user = User.objects.create_user(username='legacy', password='secret')
+        loan = LoanApplication.objects.create(
+            user=user, amount_requested=Decimal('1200'), amount_approved=Decimal('1200'),
+            interest_rate=Decimal('5.00'), duration_months=12, status='approved',
+            health_score_at_application=70, approval_date=timezone.now()
+        )
+        LoanRepayment.objects.create(
+            loan=loan, amount=Decimal('100.00'), principal_amount=Decimal('95.00'), interest_amount=Decimal('5.00')
+        )
+
+        LoanService().record_repayment(loan, '50')
+
+        loan.refresh_from_db()
+        self.assertEqual(loan.schedule.count(), 12)
+        self.assertEqual(loan.total_repaid, Decimal('150.00'))
+        self.assertLess(loan.outstanding_balance, Decimal('1200'))
+        self.assertEqual(sum(entry.amount_paid for entry in loan.schedule.all()), Decimal('150.00'))
+
+
+class GoalUpdateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='saver', password='secret')
+        self.goal = Goal.objects.create(
+            user=self.user, name='Laptop', target_amount=Decimal('1000'),
+            target_date=timezone.now().date() + timezone.timedelta(days=180)
+        )
+        self.client.force_login(self.user)
+
+    def patch(self, data):
+        return self.client.patch(f'/api/budget/goals/{self.goal.pk}/', data, content_type='application/json')
+
+    def test_edit_does_not_overwrite_concurrent_contribution(self):
+        validate = GoalSerializer.validate
+
+        def contribute_meanwhile(serializer, attrs):
+            # Lands after the view loaded the goal and before it saves the edit
+            GoalLedgerService().add_contribution(self.goal, Decimal('150'))
+            return validate(serializer, attrs)
+
+        with mock.patch.object(GoalSerializer, 'validate', contribute_meanwhile):
+            response = self.patch({'name': 'New laptop'})
+
+        self.assertEqual(response.status_code, 200)
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.name, 'New laptop')
+        self.assertEqual(self.goal.current_amount, Decimal('150'))
+
+    def test_current_amount_is_read_only(self):
+        self.patch({'current_amount': '999'})
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal('0'))
+
+
+class BudgetSpendingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='spender', password='secret')
+        self.food = Category.objects.create(name='Food', category_type='expense')
+        self.today = timezone.now().date()
+
+    def make_budget(self):
+        return BudgetCategory.objects.create(
+            user=self.user, name='Food', budgeted_amount=Decimal('200'),
+            start_date=self.today.replace(day=1), end_date=self.today + timezone.timedelta(days=31)
+        )
+
+    def spend(self, amount):
+        return Transaction.objects.create(
+            user=self.user, category=self.food, description='Groceries', amount=Decimal(amount),
+            transaction_type='expense', transaction_date=timezone.now()
+        )
+
+    def spent(self, budget):
+        budget.refresh_from_db()
+        return budget.spent_amount
+
+    def test_expense_counts_and_cancellation_reverses_it(self):
+        budget = self.make_budget()
+        expense = self.spend('50')
+        self.assertEqual(self.spent(budget), Decimal('50'))
+
+        expense.status = 'cancelled'
+        expense.save()
+        self.assertEqual(self.spent(budget), Decimal('0'))
+
+    def test_removing_an_expense_older_than_the_budget_leaves_it_alone(self):
+        older = self.spend('50')
+        budget = self.make_budget()
+        self.spend('30')
+
+        older.delete()
+        self.assertEqual(self.spent(budget), Decimal('30'))
+
+    def test_reversal_never_goes_below_zero(self):
+        budget = self.make_budget()
+        expense = self.spend('50')
+        BudgetCategory.objects.filter(pk=budget.pk).update(spent_amount=Decimal('10'))
+
+        expense.delete()
+        self.assertEqual(self.spent(budget), Decimal('0'))
+
+    def test_stored_snapshot_is_one_query(self):
+        expense = self.spend('50')
+
+        with self.assertNumQueries(1):
+            snapshot, saved_at = BudgetAlertEngine.stored_snapshot(expense.pk)
+
+        self.assertEqual(snapshot, (self.user.id, 'food', expense.transaction_date.date(), Decimal('50.00')))
+        self.assertEqual(saved_at, expense.updated_at)
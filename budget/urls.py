@@ -9,6 +9,10 @@ urlpatterns = [
     path('categories/', views.BudgetCategoryListCreateView.as_view(), name='budget-category-list-create'),
     path('categories/<int:pk>/', views.BudgetCategoryDetailView.as_view(), name='budget-category-detail'),
     
+    # Budget Alerts
+    path('alerts/', views.budget_alerts, name='budget-alerts'),
+    path('alerts/read/', views.mark_budget_alerts_read, name='budget-alerts-read'),
+    
     # Goals
     path('goals/', views.GoalListCreateView.as_view(), name='goal-list-create'),
     path('goals/<int:pk>/', views.GoalDetailView.as_view(), name='goal-detail'),
@@ -22,9 +26,13 @@ urlpatterns = [
     path('analytics/overview/', views.budget_overview, name='budget-overview'),
     path('analytics/categories/', views.category_analytics, name='category-analytics'),
     path('analytics/goals/', views.goal_analytics, name='goal-analytics'),
+    path('analytics/goals/forecast/', views.goal_forecast, name='goal-forecast'),
     
     # Kashagi (Loan)
     path('loan/health-score/', views.calculate_financial_health_score, name='financial-health-score'),
     path('loan/apply/', views.apply_for_loan, name='apply-loan'),
+    path('loan/quote/', views.loan_quote, name='loan-quote'),
     path('loan/applications/', views.get_loan_applications, name='loan-applications'),
+    path('loan/<int:loan_id>/schedule/', views.loan_schedule, name='loan-schedule'),
+    path('loan/<int:loan_id>/repay/', views.record_loan_repayment, name='loan-repayment'),
 ]
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""
+Per-user financial data version.
+
+Every Transaction, BudgetCategory, Goal and GoalContribution write bumps
+the owner's FinancialDataVersion (see ``budget.signals``). Caches derived
+from that data (goal forecasts here, the AI context snapshot in ``ai``)
+include the version in their keys, so one bump invalidates all of them in
+every process.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import FinancialDataVersion
+
+
+def get_data_version(user_id):
+    version = FinancialDataVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_data_version(user_id):
+    if FinancialDataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            FinancialDataVersion.objects.create(user_id=user_id, version=1)
+    except IntegrityError:
+        FinancialDataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
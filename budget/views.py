@@ -2,11 +2,18 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Avg, Count
-from decimal import Decimal
-from .models import BudgetCategory, Goal, GoalContribution
+from rest_framework.exceptions import NotFound, PermissionDenied
+from django.db import transaction
+from django.db.models import Sum, Avg, Count, F
+import math
+from decimal import Decimal, InvalidOperation
+from .models import BudgetCategory, BudgetAlert, Goal, GoalContribution
 from .loan_models import FinancialHealthScore, LoanApplication, LoanRepayment
-from .serializers import BudgetCategorySerializer, GoalSerializer, GoalContributionSerializer
+from .amortization import monthly_payment as amortized_payment, quote_grid
+from .loan_services import LoanService, get_loan_terms, LOAN_MAX_AMOUNT, LOAN_MAX_DURATION_MONTHS
+from .goal_services import GoalLedgerService
+from .forecasting import get_goal_forecasts, invalidate_goal_forecast
+from .serializers import BudgetCategorySerializer, BudgetAlertSerializer, GoalSerializer, GoalContributionSerializer
 from .permissions import IsBudgetOwner, IsGoalOwner, IsGoalContributionOwner
 
 # Budget Category CRUD Views
@@ -40,7 +47,9 @@ class GoalListCreateView(generics.ListCreateAPIView):
         return Goal.objects.filter(user=self.request.user)
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        goal = serializer.save(user=self.request.user)
+        GoalLedgerService().refresh_projections(goal.pk)
+        goal.refresh_from_db()
 
 class GoalDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = GoalSerializer
@@ -48,6 +57,15 @@ class GoalDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         return Goal.objects.filter(user=self.request.user)
+    
+    def perform_update(self, serializer):
+        goal = serializer.save()
+        GoalLedgerService().refresh_projections(goal.pk)
+        goal.refresh_from_db()
+    
+    def perform_destroy(self, instance):
+        instance.delete()
+        invalidate_goal_forecast(self.request.user.id)
 
 # Goal Contribution CRUD Views
 class GoalContributionListCreateView(generics.ListCreateAPIView):
@@ -58,11 +76,15 @@ class GoalContributionListCreateView(generics.ListCreateAPIView):
         return GoalContribution.objects.filter(goal__user=self.request.user)
     
     def perform_create(self, serializer):
-        contribution = serializer.save()
-        # Update goal's current amount
-        goal = contribution.goal
-        goal.current_amount += contribution.amount
-        goal.save()
+        data = serializer.validated_data
+        if data['goal'].user_id != self.request.user.id:
+            raise PermissionDenied('You can only contribute to your own goals')
+        
+        serializer.instance = GoalLedgerService().add_contribution(
+            goal=data['goal'],
+            amount=data['amount'],
+            notes=data.get('notes', '')
+        )
 
 class GoalContributionDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = GoalContributionSerializer
@@ -70,6 +92,20 @@ class GoalContributionDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         return GoalContribution.objects.filter(goal__user=self.request.user)
+    
+    def perform_update(self, serializer):
+        goal = serializer.validated_data.get('goal')
+        if goal is not None and goal.user_id != self.request.user.id:
+            raise PermissionDenied('You can only contribute to your own goals')
+        
+        contribution = GoalLedgerService().update_contribution(serializer.instance, **serializer.validated_data)
+        if contribution is None:
+            raise NotFound('Contribution not found')
+        serializer.instance = contribution
+    
+    def perform_destroy(self, instance):
+        if not GoalLedgerService().delete_contribution(instance):
+            raise NotFound('Contribution not found')
 
 # Goal Contribution Tracking
 @api_view(['POST'])
@@ -80,15 +116,8 @@ def add_goal_contribution(request, goal_id):
         amount = Decimal(str(request.data.get('amount', 0)))
         notes = request.data.get('notes', '')
         
-        contribution = GoalContribution.objects.create(
-            goal=goal,
-            amount=amount,
-            notes=notes
-        )
-        
-        # Update goal current amount
-        goal.current_amount += amount
-        goal.save()
+        contribution = GoalLedgerService().add_contribution(goal, amount, notes)
+        goal.refresh_from_db(fields=['current_amount', 'target_amount'])
         
         return Response({
             'message': 'Contribution added successfully',
@@ -100,6 +129,42 @@ def add_goal_contribution(request, goal_id):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+# Budget Alerts
+ALERT_POLL_LIMIT = 20
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def budget_alerts(request):
+    """
+    Poll budget threshold alerts.
+    
+    Returns unread alerts by default (``?all=true`` for read ones too); pass
+    ``since`` with the last seen alert id to fetch only newer alerts.
+    """
+    alerts = BudgetAlert.objects.filter(user=request.user).select_related('budget_category')
+    if request.GET.get('all') != 'true':
+        alerts = alerts.filter(is_read=False)
+    if request.GET.get('since'):
+        try:
+            alerts = alerts.filter(id__gt=int(request.GET['since']))
+        except ValueError:
+            return Response({'error': 'since must be an alert id'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = BudgetAlertSerializer(alerts[:ALERT_POLL_LIMIT], many=True)
+    return Response({'alerts': serializer.data})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_budget_alerts_read(request):
+    """Mark the given alert ids (or all alerts when none are given) as read"""
+    alerts = BudgetAlert.objects.filter(user=request.user, is_read=False)
+    alert_ids = request.data.get('ids')
+    if alert_ids:
+        alerts = alerts.filter(id__in=alert_ids)
+    
+    updated = alerts.update(is_read=True)
+    return Response({'marked_read': updated})
+
 # Budget Analytics Endpoints
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -194,7 +259,7 @@ def calculate_financial_health_score(request):
     budgets = BudgetCategory.objects.filter(user=user, is_active=True)
     budget_adherence = 0
     if budgets.exists():
-        over_budget = budgets.filter(spent_amount__gt=models.F('budgeted_amount')).count()
+        over_budget = budgets.filter(spent_amount__gt=F('budgeted_amount')).count()
         budget_adherence = max(0, 20 - (over_budget * 5))
     
     # Debt ratio (10 points) - assume no debt for now
@@ -239,6 +304,41 @@ def calculate_financial_health_score(request):
         'rating': 'Excellent' if total_score >= 80 else 'Good' if total_score >= 60 else 'Fair' if total_score >= 40 else 'Poor'
     })
 
+def _get_health_score(request):
+    """Get the user's stored health score, calculating it on first use"""
+    try:
+        return FinancialHealthScore.objects.get(user=request.user)
+    except FinancialHealthScore.DoesNotExist:
+        calculate_financial_health_score(request._request)
+        return FinancialHealthScore.objects.get(user=request.user)
+
+def _parse_duration(value, name='duration_months'):
+    """Whole number of months between 1 and LOAN_MAX_DURATION_MONTHS"""
+    try:
+        months = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f'{name} must be a whole number of months')
+    if not 1 <= months <= LOAN_MAX_DURATION_MONTHS:
+        raise ValueError(f'{name} must be between 1 and {LOAN_MAX_DURATION_MONTHS} months')
+    return months
+
+def _parse_durations(value, default):
+    if not value:
+        return default
+    return [_parse_duration(item, 'durations') for item in value.split(',') if item.strip()]
+
+def _parse_amount(value, name='amount'):
+    """Positive, finite Decimal no larger than LOAN_MAX_AMOUNT"""
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f'{name} must be a number')
+    if not amount.is_finite() or not math.isfinite(float(amount)) or amount <= 0:
+        raise ValueError(f'{name} must be a finite number greater than 0')
+    if amount > LOAN_MAX_AMOUNT:
+        raise ValueError(f'{name} must be at most {LOAN_MAX_AMOUNT}')
+    return amount
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def apply_for_loan(request):
@@ -246,50 +346,40 @@ def apply_for_loan(request):
     from django.utils import timezone
     
     user = request.user
-    amount = Decimal(str(request.data.get('amount', 0)))
-    duration = int(request.data.get('duration_months', 12))
+    try:
+        amount = _parse_amount(request.data.get('amount'))
+        duration = _parse_duration(request.data.get('duration_months', 12))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     # Get or calculate health score
-    try:
-        health_score = FinancialHealthScore.objects.get(user=user)
-    except FinancialHealthScore.DoesNotExist:
-        # Calculate score first
-        score_response = calculate_financial_health_score(request)
-        health_score = FinancialHealthScore.objects.get(user=user)
+    health_score = _get_health_score(request)
     
     # Determine approval and interest rate
-    if health_score.score >= 80:
-        approved = True
-        interest_rate = Decimal('3.5')
-    elif health_score.score >= 60:
-        approved = True
-        interest_rate = Decimal('5.0')
-    elif health_score.score >= 40:
-        approved = True
-        interest_rate = Decimal('7.5')
-    else:
-        approved = False
-        interest_rate = Decimal('10.0')
+    approved, interest_rate = get_loan_terms(health_score.score)
     
     # Calculate monthly payment
     if approved:
-        monthly_rate = interest_rate / 100 / 12
-        monthly_payment = amount * (monthly_rate * (1 + monthly_rate) ** duration) / ((1 + monthly_rate) ** duration - 1)
+        monthly_payment = amortized_payment(amount, interest_rate, duration)
     else:
         monthly_payment = None
     
-    # Create loan application
-    loan = LoanApplication.objects.create(
-        user=user,
-        amount_requested=amount,
-        amount_approved=amount if approved else None,
-        interest_rate=interest_rate,
-        duration_months=duration,
-        monthly_payment=monthly_payment,
-        status='approved' if approved else 'rejected',
-        health_score_at_application=health_score.score,
-        approval_date=timezone.now() if approved else None
-    )
+    # Create loan application; an approved loan never exists without its schedule
+    with transaction.atomic():
+        loan = LoanApplication.objects.create(
+            user=user,
+            amount_requested=amount,
+            amount_approved=amount if approved else None,
+            interest_rate=interest_rate,
+            duration_months=duration,
+            monthly_payment=monthly_payment,
+            status='approved' if approved else 'rejected',
+            health_score_at_application=health_score.score,
+            approval_date=timezone.now() if approved else None
+        )
+        
+        if approved:
+            LoanService().generate_schedule(loan)
     
     return Response({
         'loan_id': loan.id,
@@ -302,6 +392,61 @@ def apply_for_loan(request):
         'health_score': health_score.score
     })
 
+QUOTE_DEFAULT_DURATIONS = [3, 6, 12, 18, 24]
+QUOTE_MAX_AMOUNTS = 50
+QUOTE_MAX_DURATIONS = 36
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def loan_quote(request):
+    """
+    Read-only payment grid at the user's current risk tier.
+    
+    Query params: ``amounts`` (comma separated) or ``amount_min``/``amount_max``/
+    ``amount_step``, and ``durations`` (comma separated months). Does not
+    create a loan application.
+    """
+    try:
+        if request.GET.get('amounts'):
+            amounts = [float(_parse_amount(a)) for a in request.GET['amounts'].split(',') if a.strip()]
+        else:
+            amount_min = _parse_amount(request.GET.get('amount_min', 100), 'amount_min')
+            amount_max = _parse_amount(request.GET.get('amount_max', 1000), 'amount_max')
+            amount_step = _parse_amount(request.GET.get('amount_step', 100), 'amount_step')
+            amounts = []
+            amount = amount_min
+            while amount <= amount_max and len(amounts) <= QUOTE_MAX_AMOUNTS:
+                amounts.append(float(round(amount, 2)))
+                amount += amount_step
+        durations = _parse_durations(request.GET.get('durations'), QUOTE_DEFAULT_DURATIONS)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not amounts or any(a <= 0 for a in amounts) or any(d <= 0 for d in durations):
+        return Response({'error': 'Amounts and durations must be greater than 0'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(amounts) > QUOTE_MAX_AMOUNTS or len(durations) > QUOTE_MAX_DURATIONS:
+        return Response({
+            'error': f'At most {QUOTE_MAX_AMOUNTS} amounts and {QUOTE_MAX_DURATIONS} durations per quote'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    health_score = _get_health_score(request)
+    approved, interest_rate = get_loan_terms(health_score.score)
+    try:
+        grid = quote_grid(amounts, durations, interest_rate)
+    except ArithmeticError:
+        return Response({'error': 'Quote is out of range'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'health_score': health_score.score,
+        'eligible': approved,
+        'interest_rate': float(interest_rate),
+        'amounts': amounts,
+        'durations': durations,
+        'monthly_payment': grid['monthly_payment'].tolist(),
+        'total_repayable': grid['total_repayable'].tolist(),
+        'total_interest': grid['total_interest'].tolist()
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_loan_applications(request):
@@ -317,6 +462,8 @@ def get_loan_applications(request):
             'interest_rate': float(loan.interest_rate),
             'duration_months': loan.duration_months,
             'monthly_payment': float(loan.monthly_payment) if loan.monthly_payment else None,
+            'outstanding_balance': float(loan.outstanding_balance) if loan.outstanding_balance is not None else None,
+            'total_repaid': float(loan.total_repaid),
             'status': loan.status,
             'application_date': loan.application_date,
             'health_score': loan.health_score_at_application
@@ -324,6 +471,71 @@ def get_loan_applications(request):
     
     return Response({'loans': loan_data})
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def loan_schedule(request, loan_id):
+    """Get the amortization schedule and repayment position for a loan"""
+    try:
+        loan = LoanApplication.objects.get(id=loan_id, user=request.user)
+    except LoanApplication.DoesNotExist:
+        return Response({'error': 'Loan not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'loan_id': loan.id,
+        'status': loan.status,
+        'monthly_payment': float(loan.monthly_payment) if loan.monthly_payment else None,
+        'outstanding_balance': float(LoanService.get_outstanding_balance(loan)),
+        'total_repaid': float(loan.total_repaid),
+        'schedule': [{
+            'period': entry.period,
+            'due_date': entry.due_date,
+            'payment_amount': float(entry.payment_amount),
+            'principal_amount': float(entry.principal_amount),
+            'interest_amount': float(entry.interest_amount),
+            'balance_after': float(entry.balance_after),
+            'amount_paid': float(entry.amount_paid),
+            'is_paid': entry.is_paid
+        } for entry in loan.schedule.all()]
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def record_loan_repayment(request, loan_id):
+    """Record a repayment against a loan's schedule"""
+    try:
+        loan = LoanApplication.objects.get(id=loan_id, user=request.user)
+        repayment = LoanService().record_repayment(loan, request.data.get('amount', 0))
+        loan.refresh_from_db()
+        
+        return Response({
+            'message': 'Repayment recorded successfully',
+            'repayment_id': repayment.id,
+            'principal_amount': float(repayment.principal_amount),
+            'interest_amount': float(repayment.interest_amount),
+            'outstanding_balance': float(loan.outstanding_balance),
+            'status': loan.status
+        }, status=status.HTTP_201_CREATED)
+    except LoanApplication.DoesNotExist:
+        return Response({'error': 'Loan not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def goal_forecast(request):
+    """Velocity-based on-track forecast for the user's active goals"""
+    forecasts = get_goal_forecasts(request.user.id)
+    goals = Goal.objects.filter(id__in=forecasts.keys()).values('id', 'name', 'target_amount', 'current_amount', 'target_date')
+    
+    return Response({'goals': [{
+        'id': goal['id'],
+        'name': goal['name'],
+        'target_amount': goal['target_amount'],
+        'current_amount': goal['current_amount'],
+        'target_date': goal['target_date'],
+        **forecasts[goal['id']]
+    } for goal in goals]})
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def goal_analytics(request):
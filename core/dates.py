@@ -0,0 +1,14 @@
+"""
+Calendar arithmetic shared by loan schedules and recurring payments.
+"""
+import calendar
+from datetime import date
+
+
+def add_months(start, months):
+    """Same day-of-month ``months`` later, clamped to the end of short months"""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
@@ -1,5 +1,6 @@
 import requests
 import random
+import httpx
 from decimal import Decimal
 from django.db.models import Sum
 from users.models import Bill
@@ -86,6 +87,9 @@ def generate_credit_analysis(user):
     }
 
 
+ECOCASH_MOCK_URL = "http://localhost:3001/transactions/amount"
+
+
 def trigger_payment(phone, amount):
     """
     Simulate EcoCash payment trigger for loan disbursement.
@@ -97,9 +101,27 @@ def trigger_payment(phone, amount):
     Returns:
         bool: True if payment initiated successfully
     """
-    ECOCASH_MOCK_URL = "http://localhost:3001/transactions/amount"
-    
-    payload = {
+    try:
+        response = requests.post(ECOCASH_MOCK_URL, json=_trigger_payment_payload(phone, amount), timeout=10)
+        return response.status_code == 200
+    except (requests.RequestException, ValueError):
+        return False
+
+
+async def atrigger_payment(phone, amount):
+    """
+    Async variant of ``trigger_payment`` for ASGI views.
+    """
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.post(ECOCASH_MOCK_URL, json=_trigger_payment_payload(phone, amount))
+        return response.status_code == 200
+    except (httpx.HTTPError, ValueError):
+        return False
+
+
+def _trigger_payment_payload(phone, amount):
+    return {
         "clientCorrelator": f"MULA-{random.randint(1000, 9999)}",
         "notifyUrl": "http://localhost:8000/webhook",
         "amount": {
@@ -110,9 +132,3 @@ def trigger_payment(phone, amount):
             "msisdn": phone
         }
     }
-    
-    try:
-        response = requests.post(ECOCASH_MOCK_URL, json=payload, timeout=10)
-        return response.status_code == 200
-    except (requests.RequestException, ValueError):
-        return False
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EcoCashPayment, AutomaticBillPayment
+from .models import EcoCashPayment, AutomaticBillPayment, IdempotencyKey, CallbackEvent
 
 
 @admin.register(EcoCashPayment)
@@ -15,4 +15,19 @@ class AutomaticBillPaymentAdmin(admin.ModelAdmin):
     list_display = ('bill_name', 'user', 'amount', 'currency', 'frequency', 'is_active', 'next_payment_date')
     list_filter = ('frequency', 'currency', 'is_active', 'created_at')
     search_fields = ('bill_name', 'recipient_msisdn', 'reason')
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'endpoint', 'response_status', 'created_at', 'expires_at')
+    list_filter = ('endpoint', 'response_status')
+    search_fields = ('key', 'user__username')
+    readonly_fields = ('request_hash', 'response_body', 'created_at')
+
+
+@admin.register(CallbackEvent)
+class CallbackEventAdmin(admin.ModelAdmin):
+    list_display = ('source_reference', 'reported_status', 'state', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('state', 'reported_status')
+    search_fields = ('source_reference', 'event_key', 'transaction_id')
+    readonly_fields = ('event_key', 'source_reference', 'reported_status', 'transaction_id', 'payload', 'received_at')
@@ -0,0 +1,138 @@
+"""
+Async EcoCash payment endpoints for the ASGI deployment.
+
+Payments are saved as pending and queued for the background dispatcher,
+so a slow EcoCash call never holds the event loop or a server worker.
+Like their DRF counterparts they honour ``Idempotency-Key``.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+
+from users.authentication import async_login_required
+from .idempotency import async_idempotent
+from .serializers import EcoCashPaymentSerializer
+from .services import EcoCashService
+
+
+def parse_json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def payment_response(payment):
+    data = await sync_to_async(lambda: EcoCashPaymentSerializer(payment).data)()
+    return JsonResponse(data, status=202)
+
+
+@require_POST
+@async_login_required
+@async_idempotent
+async def send_money(request):
+    """Send money to another EcoCash user"""
+    data = parse_json_body(request)
+    recipient_msisdn = data.get('recipient_msisdn')
+    amount = data.get('amount')
+    reason = data.get('reason', 'Money transfer')
+    currency = data.get('currency', 'USD')
+
+    if not recipient_msisdn or not amount:
+        return JsonResponse({'error': 'recipient_msisdn and amount are required'}, status=400)
+
+    try:
+        payment = await EcoCashService().asend_money(
+            user=request.user,
+            recipient_msisdn=recipient_msisdn,
+            amount=amount,
+            reason=reason,
+            currency=currency
+        )
+        return await payment_response(payment)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_POST
+@async_login_required
+@async_idempotent
+async def buy_airtime(request):
+    """Buy airtime using EcoCash"""
+    data = parse_json_body(request)
+    phone_number = data.get('phone_number')
+    amount = data.get('amount')
+    currency = data.get('currency', 'USD')
+
+    if not phone_number or not amount:
+        return JsonResponse({'error': 'phone_number and amount are required'}, status=400)
+
+    try:
+        payment = await EcoCashService().abuy_airtime(
+            user=request.user,
+            phone_number=phone_number,
+            amount=amount,
+            currency=currency
+        )
+        return await payment_response(payment)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_POST
+@async_login_required
+@async_idempotent
+async def pay_merchant(request):
+    """Pay merchant using EcoCash"""
+    data = parse_json_body(request)
+    merchant_code = data.get('merchant_code')
+    amount = data.get('amount')
+    reason = data.get('reason', 'Merchant payment')
+    currency = data.get('currency', 'USD')
+
+    if not merchant_code or not amount:
+        return JsonResponse({'error': 'merchant_code and amount are required'}, status=400)
+
+    try:
+        payment = await EcoCashService().apay_merchant(
+            user=request.user,
+            merchant_code=merchant_code,
+            amount=amount,
+            reason=reason,
+            currency=currency
+        )
+        return await payment_response(payment)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_POST
+@async_login_required
+@async_idempotent
+async def manual_payment(request):
+    """Handle manual EcoCash payment"""
+    data = parse_json_body(request)
+    customer_msisdn = data.get('customer_msisdn')
+    amount = data.get('amount')
+    reason = data.get('reason', 'Payment')
+    currency = data.get('currency', 'USD')
+
+    if not customer_msisdn or not amount:
+        return JsonResponse({'error': 'customer_msisdn and amount are required'}, status=400)
+
+    try:
+        service = EcoCashService()
+        payment = await service.acreate_payment_record(
+            user=request.user,
+            customer_msisdn=customer_msisdn,
+            amount=amount,
+            reason=reason,
+            currency=currency
+        )
+        payment = await sync_to_async(service.enqueue_payment)(payment)
+        return await payment_response(payment)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,176 @@
+"""
+Ingestion of EcoCash payment callbacks.
+
+The callback view only verifies the request and appends it to the
+``CallbackEvent`` inbox, then acknowledges; a provider retrying during an
+incident never waits on payment locks or expense booking. Events are
+deduplicated on ``event_key`` (the provider's event id, or a hash of the
+raw body when it sends none), so a retried callback is stored once and
+applied once.
+
+After the insert commits the dispatcher runs ``process_callbacks`` for the
+payment. It holds the payment's row lock and applies that payment's pending
+events in arrival order, so concurrent deliveries for one payment are
+serialized while different payments proceed in parallel. An event that
+raises stays pending (later events for the payment wait behind it) until
+it has failed ``CALLBACK_MAX_ATTEMPTS`` times. Events for a payment that
+isn't in the database (yet) also stay pending, each pass counting an
+attempt, so a callback that beats its payment's commit is applied by a
+later pass. ``process_ecocash_callbacks`` drains anything a worker never
+picked up and retries those.
+
+Requests must carry ``X-EcoCash-Signature``: the hex HMAC-SHA256 of the raw
+body keyed with ``ECOCASH_CALLBACK_SECRET``. Without a secret, callbacks are
+only accepted when ``DEBUG`` is on.
+"""
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import CallbackEvent, EcoCashPayment
+
+CALLBACK_SECRET = getattr(settings, 'ECOCASH_CALLBACK_SECRET', '')
+CALLBACK_MAX_ATTEMPTS = getattr(settings, 'ECOCASH_CALLBACK_MAX_ATTEMPTS', 5)
+SIGNATURE_HEADER = 'X-EcoCash-Signature'
+EVENT_ID_HEADER = 'X-EcoCash-Event-Id'
+
+
+def sign(body, secret=None):
+    secret = CALLBACK_SECRET if secret is None else secret
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature, secret=None):
+    """Check ``signature`` (optionally prefixed ``sha256=``) against the raw body"""
+    secret = CALLBACK_SECRET if secret is None else secret
+    if not secret:
+        return settings.DEBUG
+    signature = (signature or '').strip()
+    if signature.startswith('sha256='):
+        signature = signature[len('sha256='):]
+    return hmac.compare_digest(sign(body, secret), signature.lower())
+
+
+def event_key_for(body, payload, headers):
+    event_id = headers.get(EVENT_ID_HEADER) or payload.get('eventId') or payload.get('callbackId')
+    if event_id:
+        return f"id:{str(event_id)[:120]}"
+    return f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def record_callback(body, headers):
+    """
+    Append a verified callback to the inbox; returns (event, created).
+    Raises ValueError for a malformed body
+    """
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError:
+        raise ValueError('Invalid JSON')
+    if not isinstance(payload, dict):
+        raise ValueError('Invalid JSON')
+    try:
+        source_reference = uuid.UUID(str(payload.get('sourceReference')))
+    except ValueError:
+        raise ValueError('sourceReference is required')
+
+    key = event_key_for(body, payload, headers)
+    try:
+        with transaction.atomic():
+            event = CallbackEvent.objects.create(
+                event_key=key,
+                source_reference=source_reference,
+                reported_status=str(payload.get('status') or '')[:50],
+                transaction_id=str(payload.get('transactionId') or '')[:100],
+                payload=payload
+            )
+    except IntegrityError:
+        return CallbackEvent.objects.get(event_key=key), False
+
+    from .dispatcher import get_dispatcher
+    transaction.on_commit(lambda: get_dispatcher().submit_callbacks(source_reference))
+    return event, True
+
+
+def process_callbacks(source_reference, service=None):
+    """
+    Apply a payment's pending callbacks in arrival order; returns the number applied
+    """
+    from .services import EcoCashService
+
+    service = service or EcoCashService()
+    now = timezone.now()
+    applied = 0
+    with transaction.atomic():
+        payment = EcoCashPayment.objects.select_for_update().filter(source_reference=source_reference).first()
+        events = list(
+            CallbackEvent.objects.select_for_update()
+            .filter(source_reference=source_reference, state='pending')
+            .order_by('id')
+        )
+        if payment is None:
+            for event in events:
+                event.attempts += 1
+                event.error = 'Payment not found'
+                if event.attempts >= CALLBACK_MAX_ATTEMPTS:
+                    event.state = 'failed'
+            CallbackEvent.objects.bulk_update(events, ['state', 'attempts', 'error'])
+            return 0
+
+        done = []
+        for event in events:
+            try:
+                with transaction.atomic():
+                    payment = service.apply_status_update(
+                        payment, event.reported_status, event.transaction_id or None, event.payload
+                    )
+            except Exception as e:
+                event.attempts += 1
+                event.error = str(e)
+                if event.attempts >= CALLBACK_MAX_ATTEMPTS:
+                    event.state = 'failed'
+                    done.append(event)
+                    continue
+                # Keep the order: later events wait for this one to be retried
+                event.save(update_fields=['attempts', 'error'])
+                break
+            event.state = 'processed'
+            event.processed_at = now
+            done.append(event)
+            applied += 1
+        CallbackEvent.objects.bulk_update(done, ['state', 'attempts', 'error', 'processed_at'])
+    return applied
+
+
+def pending_references(limit=None):
+    """References with pending callbacks, oldest event first"""
+    references = (
+        CallbackEvent.objects.filter(state='pending')
+        .values('source_reference')
+        .annotate(first_id=Min('id'))
+        .order_by('first_id')
+        .values_list('source_reference', flat=True)
+    )
+    return list(references[:limit] if limit else references)
+
+
+def retry_failed_callbacks(source_reference=None):
+    """Put failed events back in the queue; returns the number requeued"""
+    failed = CallbackEvent.objects.filter(state='failed')
+    if source_reference:
+        failed = failed.filter(source_reference=source_reference)
+    return failed.update(state='pending', attempts=0)
+
+
+def purge_processed_callbacks(older_than_days, now=None):
+    """Delete processed events received more than ``older_than_days`` ago"""
+    cutoff = (now or timezone.now()) - timedelta(days=older_than_days)
+    deleted, _ = CallbackEvent.objects.filter(state='processed', received_at__lt=cutoff).delete()
+    return deleted
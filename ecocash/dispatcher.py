@@ -0,0 +1,129 @@
+"""
+Background execution of EcoCash payments.
+
+Views save a payment as ``pending`` and return; the dispatcher runs the
+upstream call on a bounded thread pool after the insert commits. The queue
+lives in process memory, so it holds at most ``ECOCASH_MAX_QUEUED`` payments
+(queued plus running); past that a payment is left ``pending`` rather than
+queued. Pending payments a worker never picks up (queue full, or the
+process restarted) are resubmitted by the ``poll_ecocash_payments`` cron.
+
+Callbacks are applied on a second pool, bounded the same way
+(``ECOCASH_MAX_QUEUED_CALLBACKS``); events that don't fit stay unprocessed
+for the ``process_ecocash_callbacks`` cron. A payment already queued there
+is not queued again, so a burst of callbacks for one payment costs a single
+``process_callbacks`` run.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+ECOCASH_WORKERS = getattr(settings, 'ECOCASH_WORKERS', 8)
+ECOCASH_CALLBACK_WORKERS = getattr(settings, 'ECOCASH_CALLBACK_WORKERS', 2)
+ECOCASH_MAX_QUEUED = getattr(settings, 'ECOCASH_MAX_QUEUED', 500)
+ECOCASH_MAX_QUEUED_CALLBACKS = getattr(settings, 'ECOCASH_MAX_QUEUED_CALLBACKS', 500)
+
+
+class PaymentDispatcher:
+    def __init__(self, workers=ECOCASH_WORKERS, callback_workers=ECOCASH_CALLBACK_WORKERS,
+                 max_queued=ECOCASH_MAX_QUEUED, max_queued_callbacks=ECOCASH_MAX_QUEUED_CALLBACKS):
+        self.workers = workers
+        self.callback_workers = callback_workers
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._callback_slots = threading.BoundedSemaphore(max_queued_callbacks)
+        self._executor = None
+        self._callback_executor = None
+        self._queued_callbacks = set()
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='ecocash-payment'
+                    )
+        return self._executor
+
+    @property
+    def callback_executor(self):
+        if self._callback_executor is None:
+            with self._lock:
+                if self._callback_executor is None:
+                    self._callback_executor = ThreadPoolExecutor(
+                        max_workers=self.callback_workers, thread_name_prefix='ecocash-callback'
+                    )
+        return self._callback_executor
+
+    def submit(self, payment_id):
+        """Queue a payment; returns None when the queue is full"""
+        future = self._submit_bounded(self.executor, self._slots, self._run, payment_id)
+        if future is None:
+            print(f"EcoCash dispatch queue full; payment {payment_id} left pending for the poller")
+        return future
+
+    def submit_callbacks(self, source_reference):
+        key = str(source_reference)
+        with self._lock:
+            if key in self._queued_callbacks:
+                return None
+            self._queued_callbacks.add(key)
+        future = self._submit_bounded(self.callback_executor, self._callback_slots, self._run_callbacks, key)
+        if future is None:
+            with self._lock:
+                self._queued_callbacks.discard(key)
+        return future
+
+    @staticmethod
+    def _submit_bounded(executor, slots, fn, arg):
+        # A slot is held from submission until the task finishes
+        if not slots.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                return fn(arg)
+            finally:
+                slots.release()
+
+        try:
+            return executor.submit(run)
+        except BaseException:
+            slots.release()
+            raise
+
+    @staticmethod
+    def _run(payment_id):
+        from .services import EcoCashService
+
+        close_old_connections()
+        try:
+            return EcoCashService().run_payment(payment_id)
+        except Exception as e:
+            print(f"EcoCash payment {payment_id} failed in worker: {str(e)}")
+        finally:
+            close_old_connections()
+
+    def _run_callbacks(self, source_reference):
+        from .callbacks import process_callbacks
+
+        # Unmark first so callbacks arriving while this runs queue another pass
+        with self._lock:
+            self._queued_callbacks.discard(source_reference)
+        close_old_connections()
+        try:
+            return process_callbacks(source_reference)
+        except Exception as e:
+            print(f"EcoCash callbacks for {source_reference} failed in worker: {str(e)}")
+        finally:
+            close_old_connections()
+
+
+_dispatcher = PaymentDispatcher()
+
+
+def get_dispatcher():
+    return _dispatcher
@@ -0,0 +1,211 @@
+"""
+Local HTTPS stand-in for the EcoCash C2B API.
+
+Serves the instant payment and status lookup endpoints from a background
+thread over TLS, so the pooled transport, retries and keep-alive can be
+exercised without network access. Unless ``cert_file``/``key_file`` are
+given, a throwaway self-signed ``localhost`` certificate is generated with
+the ``openssl`` CLI when the server is created and deleted on ``stop()``;
+no key material lives in the repository. Point the app at it with
+``ECOCASH_BASE_URL=https://127.0.0.1:<port>``,
+``ECOCASH_CA_BUNDLE=<FakeEcoCashServer.ca_file>`` and
+``ECOCASH_USE_MOCK=False``.
+
+Pass a ``MockEcoCashService`` as ``simulator`` to answer with its latency
+distribution, failure mix and rate limit instead of always succeeding,
+and ``tls=False`` to serve plain HTTP.
+"""
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAYMENT_PATH_PREFIX = '/api/ecocash_pay/api/v2/payment/instant/c2b/'
+STATUS_PATH_PREFIX = '/api/ecocash_pay/api/v1/transaction/c2b/status/'
+
+
+def generate_certificate(directory, days=1):
+    """
+    Write a self-signed certificate for localhost/127.0.0.1 into ``directory``;
+    returns (cert_file, key_file). The certificate doubles as its own CA bundle
+    """
+    cert_file = os.path.join(directory, 'localhost.pem')
+    key_file = os.path.join(directory, 'localhost-key.pem')
+    try:
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-sha256',
+             '-days', str(days), '-subj', '/CN=localhost',
+             '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1',
+             '-keyout', key_file, '-out', cert_file],
+            check=True, capture_output=True
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f'Could not generate a certificate for the fake EcoCash server: {e}')
+    return cert_file, key_file
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # A client that timed out hangs up before the reply; not worth a traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionError, ssl.SSLError)):
+            super().handle_error(request, client_address)
+
+
+class FakeEcoCashServer:
+    """
+    Args:
+        latency: seconds to wait before responding.
+        fail_first: number of initial payment requests answered with ``fail_status``.
+        fail_status: status code used for the injected failures.
+        payment_status: status reported for accepted payments (``SUCCESS`` or ``PENDING``).
+        simulator: optional ``MockEcoCashService`` that decides each payment's outcome.
+        tls: serve HTTPS.
+        cert_file, key_file: certificate to serve; generated when omitted.
+
+    A payment whose ``sourceReference`` was already accepted gets a 409,
+    as EcoCash does for duplicate requests.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fail_first=0, fail_status=503,
+                 payment_status='SUCCESS', simulator=None, tls=True, cert_file=None, key_file=None):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.payment_status = payment_status
+        self.simulator = simulator
+        self.tls = tls
+        self.requests = []
+        self.payments = {}
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._cert_dir = None
+        self.ca_file = None
+
+        self._httpd = _QuietHTTPServer((host, port), self._handler_class())
+        if tls:
+            if not cert_file:
+                self._cert_dir = tempfile.mkdtemp(prefix='fake-ecocash-')
+                cert_file, key_file = generate_certificate(self._cert_dir)
+            self.ca_file = cert_file
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert_file, key_file)
+            self._httpd.socket = context.wrap_socket(self._httpd.socket, server_side=True)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"{'https' if self.tls else 'http'}://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._cert_dir:
+            shutil.rmtree(self._cert_dir, ignore_errors=True)
+            self._cert_dir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def handle_payment(self, payload):
+        """Return (status_code, body) for a payment request"""
+        reference = payload.get('sourceReference')
+        with self._lock:
+            self.requests.append(payload)
+            if len(self.requests) <= self.fail_first:
+                return self.fail_status, {'message': 'Injected failure'}
+            if not reference or not payload.get('customerMsisdn'):
+                return 400, {'message': 'customerMsisdn and sourceReference are required'}
+            if self.simulator is None:
+                if reference in self.payments:
+                    return 409, {'message': 'Duplicate sourceReference'}
+                record = {
+                    'transactionId': f'FAKE{uuid.uuid4().hex[:12].upper()}',
+                    'sourceReference': reference,
+                    'amount': payload.get('amount'),
+                    'currency': payload.get('currency'),
+                    'status': self.payment_status,
+                }
+                self.payments[reference] = record
+                return 200, record
+
+        result = self.simulator.process_payment(
+            payload['customerMsisdn'], payload.get('amount') or 0, payload.get('reason', ''),
+            payload.get('currency', 'USD'), reference
+        )
+        body = result.get('data') or {}
+        if not result['success']:
+            body = dict(body, message=body.get('error', 'Payment failed'))
+        return result['status_code'], body
+
+    def handle_status(self, payload):
+        if self.simulator is not None:
+            result = self.simulator.get_transaction_status(payload.get('sourceReference'))
+            return result['status_code'], result.get('data') or {}
+        with self._lock:
+            record = self.payments.get(payload.get('sourceReference'))
+        if record is None:
+            return 404, {'message': 'Transaction not found'}
+        return 200, record
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                server._record_connection()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                if not self.headers.get('X-API-KEY'):
+                    return self._send_json(401, {'message': 'Missing API key'})
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    return self._send_json(400, {'message': 'Invalid JSON'})
+
+                if server.latency:
+                    time.sleep(server.latency)
+                if self.path.startswith(PAYMENT_PATH_PREFIX):
+                    return self._send_json(*server.handle_payment(payload))
+                if self.path.startswith(STATUS_PATH_PREFIX):
+                    return self._send_json(*server.handle_status(payload))
+                self._send_json(404, {'message': 'Not found'})
+
+            def _send_json(self, status_code, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status_code)
+                if status_code == 429 and body.get('retryAfter'):
+                    self.send_header('Retry-After', str(max(1, round(body['retryAfter']))))
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
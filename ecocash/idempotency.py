@@ -0,0 +1,171 @@
+"""
+``Idempotency-Key`` support for payment and transfer POST endpoints.
+
+A client that sends the header gets the first response for that key
+replayed on every retry, so a request repeated over a flaky network pays
+once. The stored response lives in the ``IdempotencyKey`` table until its
+TTL expires. Concurrent duplicates are serialized on the key's row: the
+first request holds the row lock while the view runs, and the duplicate
+waits for it, then replays the stored response.
+
+Reusing a key with a different body or endpoint is rejected with 422.
+5xx responses are not stored, so the client can retry them with the same
+key. Requests without the header behave as before. ``idempotent`` wraps
+the DRF views and ``async_idempotent`` the async views served under ASGI;
+both go through the same lock, replay and store steps.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request, data=None):
+    """Hash of the method, path and body a key was first used with"""
+    if data is None:
+        data = request.data.dict() if hasattr(request.data, 'dict') else request.data
+    payload = json.dumps(
+        {'method': request.method, 'path': request.path, 'data': data},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def replay(record):
+    return _drf_response(record.response_body, record.response_status, True)
+
+
+def purge_expired_keys(now=None):
+    """Delete stored responses past their TTL; returns the number removed"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
+
+
+def _run_idempotent(request, key, fingerprint, call_view, respond, response_body):
+    """
+    Lock the key's row, then replay its stored response or run ``call_view``
+    and store what it returns. ``respond(body, status, replayed)`` builds a
+    response and ``response_body(response)`` extracts the body to store
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        record, created = IdempotencyKey.objects.get_or_create(
+            user=request.user, key=key,
+            defaults={
+                'endpoint': request.path,
+                'request_hash': fingerprint,
+                'expires_at': now + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+            }
+        )
+        if not created:
+            # Waits here while another request with this key is running
+            record = IdempotencyKey.objects.select_for_update().get(pk=record.pk)
+            if record.expires_at <= now:
+                record.endpoint = request.path
+                record.request_hash = fingerprint
+                record.response_status = None
+                record.response_body = None
+            elif record.endpoint != request.path or record.request_hash != fingerprint:
+                return respond(
+                    {'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'},
+                    status.HTTP_422_UNPROCESSABLE_ENTITY, False
+                )
+            elif record.response_status is not None:
+                return respond(record.response_body, record.response_status, True)
+
+        response = call_view()
+        if response.status_code < 500:
+            record.response_status = response.status_code
+            record.response_body = response_body(response)
+            record.expires_at = timezone.now() + timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+            record.save()
+        return response
+
+
+def _key_error(key):
+    if len(key) > MAX_KEY_LENGTH:
+        return f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+    return None
+
+
+def _drf_response(body, status_code, replayed):
+    response = Response(body, status=status_code)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _json_response(body, status_code, replayed):
+    response = JsonResponse(body, status=status_code, safe=False)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_func):
+    """
+    Honour the ``Idempotency-Key`` header on a DRF function view (below ``@api_view``)
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+        if not key or request.method in SAFE_METHODS:
+            return view_func(request, *args, **kwargs)
+        error = _key_error(key)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        return _run_idempotent(
+            request, key, request_fingerprint(request),
+            lambda: view_func(request, *args, **kwargs),
+            _drf_response, lambda response: response.data
+        )
+
+    return wrapper
+
+
+def async_idempotent(view_func):
+    """
+    Honour the ``Idempotency-Key`` header on an async JSON view (below
+    ``@async_login_required``)
+
+    The key's row lock has to be held on one connection while the view
+    runs, so the whole exchange runs in a sync thread; the view's own
+    ``sync_to_async`` calls land back on that thread and share its
+    transaction, exactly as with ``idempotent``.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+        if not key or request.method in SAFE_METHODS:
+            return await view_func(request, *args, **kwargs)
+        error = _key_error(key)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = request.body.decode(errors='replace')
+        return await sync_to_async(_run_idempotent)(
+            request, key, request_fingerprint(request, data),
+            lambda: async_to_sync(view_func)(request, *args, **kwargs),
+            _json_response, lambda response: json.loads(response.content)
+        )
+
+    return wrapper
@@ -0,0 +1,112 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from ecocash.models import EcoCashPayment, AutomaticBillPayment
+from ecocash.reconciliation import candidate_querysets, keyset_page
+from ecocash.management.commands.poll_ecocash_payments import pending_to_resubmit, processing_to_poll
+
+
+def plan_nodes(plan):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def hot_queries():
+    """
+    (name, queryset, index it must use, whether an explicit sort is a regression)
+
+    The poll and reconcile entries are the querysets those jobs run, built
+    by the same functions, so the check follows them when they change.
+    """
+    now = timezone.now()
+    reconcile = candidate_querysets(now)
+    return [
+        ('payment history',
+         EcoCashPayment.objects.filter(user_id=1).order_by('-created_at')[:20],
+         'ecocash_pay_user_created_idx', True),
+        ('poll: processing payments',
+         processing_to_poll(now, 200),
+         'ecocash_pay_inflight_idx', True),
+        ('poll: pending payments to resubmit',
+         pending_to_resubmit(now, 200),
+         'ecocash_pay_status_created_idx', True),
+        # In-flight payments are few, so sorting them by id for the keyset is cheap
+        ('reconcile: stale pending/processing payments',
+         keyset_page(reconcile['stale']),
+         'ecocash_pay_inflight_idx', False),
+        ('reconcile: recently failed payments',
+         keyset_page(reconcile['recently_failed']),
+         'ecocash_pay_status_created_idx', False),
+        ('reconcile: completed payments without a transaction',
+         keyset_page(reconcile['unbooked']),
+         'ecocash_pay_unbooked_idx', True),
+        ('reconcile: failed payments with a booked transaction',
+         keyset_page(reconcile['orphaned']),
+         'ecocash_pay_linked_failed_idx', True),
+        ('due automatic payments',
+         AutomaticBillPayment.objects.filter(
+             is_active=True, next_payment_date__lte=now.date()
+         ).order_by('next_payment_date', 'id')[:100],
+         'ecocash_auto_due_idx', True),
+        ('automatic payment list',
+         AutomaticBillPayment.objects.filter(user_id=1).order_by('-created_at'),
+         'ecocash_auto_user_created_idx', True),
+    ]
+
+
+def plan_problems(queryset, index, sorted_by_index, real_costs=False):
+    """
+    EXPLAIN ``queryset`` and return (plan, problems): why it doesn't use
+    ``index`` as expected, or an empty list
+    """
+    with transaction.atomic():
+        if not real_costs:
+            # An empty or small table is cheaper to scan; ask whether the index is usable at all
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+
+    nodes = list(plan_nodes(plan))
+    used = sorted({node['Index Name'] for node in nodes if 'Index Name' in node})
+    problems = []
+    if index not in used:
+        problems.append(f"does not use {index} (uses {', '.join(used) or 'no index'})")
+    if sorted_by_index and any(node['Node Type'] == 'Sort' for node in nodes):
+        problems.append('sorts rows instead of reading them in index order')
+    return plan, problems
+
+
+class Command(BaseCommand):
+    help = 'Fail if the EcoCash payment and scheduling queries stop using their indexes (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--real-costs', action='store_true',
+                            help="Plan with the table's real statistics instead of disabling sequential scans")
+        parser.add_argument('--require-postgres', action='store_true',
+                            help='Error instead of skipping on other databases')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            message = f'Query plans are only checked on PostgreSQL, not {connection.vendor}'
+            if options['require_postgres']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(f'{message}; skipping'))
+            return
+
+        failures = []
+        for name, queryset, index, sorted_by_index in hot_queries():
+            plan, problems = plan_problems(queryset, index, sorted_by_index, options['real_costs'])
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: {'; '.join(problems)}"))
+            else:
+                self.stdout.write(f'ok   {name}: {index}')
+            if options['verbosity'] > 1:
+                self.stdout.write(json.dumps(plan, indent=2))
+
+        if failures:
+            raise CommandError(f"{len(failures)} query plan regression(s): {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All EcoCash query plans use their indexes'))
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ecocash.models import EcoCashPayment
+from ecocash.services import EcoCashService
+
+
+def processing_to_poll(cutoff, limit):
+    """Submitted payments still waiting for a final status, oldest update first"""
+    return EcoCashPayment.objects.filter(
+        status='processing', updated_at__lt=cutoff
+    ).order_by('updated_at')[:limit]
+
+
+def pending_to_resubmit(cutoff, limit):
+    """Ids of pending payments no worker picked up, oldest first"""
+    return EcoCashPayment.objects.filter(
+        status='pending', created_at__lt=cutoff
+    ).order_by('created_at').values_list('id', flat=True)[:limit]
+
+
+class Command(BaseCommand):
+    help = 'Finalize EcoCash payments still awaiting a callback and resubmit orphaned pending ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=60,
+                            help='Only payments not updated for this many seconds')
+        parser.add_argument('--limit', type=int, default=200)
+
+    def handle(self, *args, **options):
+        service = EcoCashService()
+        cutoff = timezone.now() - timedelta(seconds=options['older_than'])
+        counts = {'checked': 0, 'resubmitted': 0, 'completed': 0, 'failed': 0}
+
+        for payment in processing_to_poll(cutoff, options['limit']):
+            counts['checked'] += 1
+            result = service.check_payment_status(payment)
+            if not result['success']:
+                continue
+            data = result.get('data') or {}
+            payment = service.apply_status_update(payment, data.get('status'), data.get('transactionId'), data)
+            if payment.status in ('completed', 'failed'):
+                counts[payment.status] += 1
+
+        for payment_id in pending_to_resubmit(cutoff, options['limit']):
+            if service.run_payment(payment_id) is not None:
+                counts['resubmitted'] += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {counts['checked']} processing payments ({counts['completed']} completed, "
+            f"{counts['failed']} failed); resubmitted {counts['resubmitted']} pending payments"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from ecocash.callbacks import (
+    pending_references, process_callbacks, purge_processed_callbacks, retry_failed_callbacks,
+)
+
+
+class Command(BaseCommand):
+    help = 'Apply stored EcoCash callbacks that no worker picked up, and purge old processed ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Payments to process per run')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Requeue callbacks that exhausted their attempts first')
+        parser.add_argument('--purge-after', type=int, default=30,
+                            help='Delete processed callbacks older than this many days (0 keeps them)')
+
+    def handle(self, *args, **options):
+        requeued = retry_failed_callbacks() if options['retry_failed'] else 0
+
+        references = pending_references(options['limit'])
+        applied = 0
+        for source_reference in references:
+            applied += process_callbacks(source_reference)
+
+        purged = purge_processed_callbacks(options['purge_after']) if options['purge_after'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Applied {applied} callbacks for {len(references)} payments; "
+            f"requeued {requeued} failed; purged {purged} processed"
+        ))
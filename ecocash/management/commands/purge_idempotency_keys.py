@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from ecocash.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses past their TTL'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired idempotency keys'))
@@ -0,0 +1,50 @@
+import json
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from ecocash.reconciliation import (
+    Reconciler, RECONCILE_STALE_AFTER, RECONCILE_EXPIRE_AFTER, RECONCILE_LOOKBACK,
+    RECONCILE_BATCH_SIZE, RECONCILE_WORKERS,
+)
+
+
+class Command(BaseCommand):
+    help = 'Reconcile stale and recently failed EcoCash payments with the provider and report discrepancies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-after', type=int, default=RECONCILE_STALE_AFTER,
+                            help='Check pending/processing payments not updated for this many seconds')
+        parser.add_argument('--expire-after', type=int, default=RECONCILE_EXPIRE_AFTER,
+                            help='Fail payments EcoCash has no record of after this many seconds')
+        parser.add_argument('--lookback', type=int, default=RECONCILE_LOOKBACK,
+                            help='Re-check failed payments created within this many seconds')
+        parser.add_argument('--batch-size', type=int, default=RECONCILE_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=RECONCILE_WORKERS, help='Concurrent status lookups')
+        parser.add_argument('--dry-run', action='store_true', help='Report discrepancies without fixing them')
+        parser.add_argument('--report', help='Write the full discrepancy report to this JSON file')
+
+    def handle(self, *args, **options):
+        report = Reconciler(
+            stale_after=options['stale_after'],
+            expire_after=options['expire_after'],
+            lookback=options['lookback'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            dry_run=options['dry_run']
+        ).run()
+
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, cls=DjangoJSONEncoder, indent=2)
+
+        for finding in report['discrepancies']:
+            self.stdout.write(
+                f"{finding['kind']}: payment {finding['payment_id']} ({finding['source_reference']}) "
+                f"local={finding['local_status']} provider={finding['provider_status'] or '-'} "
+                f"action={finding['action']} {finding['detail']}".rstrip()
+            )
+
+        counts = ', '.join(f"{kind} {count}" for kind, count in sorted(report['counts'].items())) or 'none'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {report['checked']} payments; discrepancies: {counts}; "
+            f"fixed {report['fixed']}{' (dry run)' if report['dry_run'] else ''}"
+        ))
@@ -0,0 +1,38 @@
+import time
+from datetime import date
+from django.core.management.base import BaseCommand
+from ecocash.scheduler import run_due_payments, AUTO_PAYMENT_BATCH_SIZE, AUTO_PAYMENT_WORKERS
+
+
+class Command(BaseCommand):
+    help = 'Pay automatic bills that are due; safe to run on several nodes at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=AUTO_PAYMENT_BATCH_SIZE,
+                            help='Bills claimed per locking transaction')
+        parser.add_argument('--workers', type=int, default=AUTO_PAYMENT_WORKERS,
+                            help='Concurrent EcoCash calls')
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help='Treat this date (YYYY-MM-DD) as today')
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            summary = run_due_payments(
+                today=options['date'],
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                log=lambda message: self.stderr.write(message)
+            )
+            if summary['bills'] or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Paid {summary['bills']} bills in {summary['batches']} batches "
+                    f"({time.monotonic() - started:.1f}s): {summary['completed']} completed, "
+                    f"{summary['failed']} failed, {summary['pending']} awaiting confirmation, "
+                    f"{summary['errors']} errors"
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,79 @@
+import time
+from dataclasses import replace
+from django.core.management.base import BaseCommand, CommandError
+from ecocash.fake_server import FakeEcoCashServer
+from ecocash.mock_service import MockEcoCashService, PROFILES, parse_failure_mix, parse_latency
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake EcoCash API for development, load testing and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--plain-http', action='store_true', help='Serve HTTP instead of HTTPS')
+        parser.add_argument('--cert-file', help='Certificate to serve (a throwaway one is generated by default)')
+        parser.add_argument('--key-file', help='Private key for --cert-file')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each reply')
+        parser.add_argument('--fail-first', type=int, default=0, help='Fail this many initial payments')
+        parser.add_argument('--fail-status', type=int, default=503)
+        parser.add_argument('--payment-status', default='SUCCESS', help='Status reported for accepted payments')
+
+        simulation = parser.add_argument_group('simulation', 'Answer with the mock simulator instead of always succeeding')
+        simulation.add_argument('--profile', choices=sorted(PROFILES), help='Named simulator profile')
+        simulation.add_argument('--latency-dist', help='Latency distribution, e.g. "lognormal:0.8,0.5"')
+        simulation.add_argument('--failure-rate', type=float, help='Fraction of payments that fail (0-1)')
+        simulation.add_argument('--failure-mix', help='Relative weights of failure codes, e.g. "402:3,429:1,500:1"')
+        simulation.add_argument('--rate-limit', type=float, help='Requests per second before answering 429')
+        simulation.add_argument('--burst', type=int, help='Requests allowed in a burst above --rate-limit')
+        simulation.add_argument('--seed', type=int, help='Seed for a reproducible run')
+
+    def handle(self, *args, **options):
+        if bool(options['cert_file']) != bool(options['key_file']):
+            raise CommandError('--cert-file and --key-file must be given together')
+        server = FakeEcoCashServer(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            fail_first=options['fail_first'],
+            fail_status=options['fail_status'],
+            payment_status=options['payment_status'],
+            simulator=self.build_simulator(options),
+            tls=not options['plain_http'],
+            cert_file=options['cert_file'],
+            key_file=options['key_file']
+        ).start()
+
+        self.stdout.write(self.style.SUCCESS(f'Fake EcoCash listening on {server.url}'))
+        if server.simulator is not None:
+            self.stdout.write(f'Simulating {server.simulator.profile}')
+        ca_hint = '' if options['plain_http'] else f', ECOCASH_CA_BUNDLE={server.ca_file}'
+        self.stdout.write(
+            f'Set ECOCASH_BASE_URL={server.url}{ca_hint} and ECOCASH_USE_MOCK=False, then press Ctrl+C to stop.'
+        )
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            if server.simulator is not None:
+                self.stdout.write(f'Simulator stats: {server.simulator.stats()}')
+            server.stop()
+
+    def build_simulator(self, options):
+        overrides = {}
+        try:
+            if options['latency_dist']:
+                parse_latency(options['latency_dist'])
+                overrides['latency'] = options['latency_dist']
+            if options['failure_mix']:
+                overrides['failure_mix'] = parse_failure_mix(options['failure_mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        for name in ('failure_rate', 'rate_limit', 'burst', 'seed'):
+            if options[name] is not None:
+                overrides[name] = options[name]
+
+        if not options['profile'] and not overrides:
+            return None
+        profile = replace(PROFILES[options['profile'] or 'default'], **overrides)
+        return MockEcoCashService(profile=profile)
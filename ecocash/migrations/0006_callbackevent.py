@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecocash', '0005_payoutbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CallbackEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_key', models.CharField(help_text='Provider event id or hash of the body', max_length=128, unique=True)),
+                ('source_reference', models.UUIDField()),
+                ('reported_status', models.CharField(blank=True, max_length=50)),
+                ('transaction_id', models.CharField(blank=True, max_length=100)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'ecocash_callback_events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['source_reference', 'id'], name='ecocash_cb_reference_idx'), models.Index(condition=models.Q(('state', 'pending')), fields=['id'], name='ecocash_cb_pending_idx')],
+            },
+        ),
+    ]
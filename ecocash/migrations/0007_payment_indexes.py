@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:59
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY on PostgreSQL, so building the indexes doesn't
+    block payment writes on a large table; a plain CREATE INDEX elsewhere
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('ecocash', '0006_callbackevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='automaticbillpayment',
+            index=models.Index(fields=['user', '-created_at'], name='ecocash_auto_user_created_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='automaticbillpayment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['next_payment_date', 'id'], name='ecocash_auto_due_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='ecocashpayment',
+            index=models.Index(fields=['user', '-created_at'], name='ecocash_pay_user_created_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='ecocashpayment',
+            index=models.Index(fields=['status', 'created_at'], name='ecocash_pay_status_created_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='ecocashpayment',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'processing'])), fields=['updated_at', 'id'], name='ecocash_pay_inflight_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='ecocashpayment',
+            index=models.Index(condition=models.Q(('status', 'completed'), ('transaction__isnull', True)), fields=['id'], name='ecocash_pay_unbooked_idx'),
+        ),
+    ]
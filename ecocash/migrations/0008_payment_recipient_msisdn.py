@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecocash', '0007_payment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ecocashpayment',
+            name='recipient_msisdn',
+            field=models.CharField(blank=True, default='', help_text='Payout recipient; customer_msisdn is the wallet charged', max_length=15),
+        ),
+    ]
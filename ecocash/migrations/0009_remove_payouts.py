@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecocash', '0008_payment_recipient_msisdn'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='ecocashpayment',
+            name='batch',
+        ),
+        migrations.RemoveField(
+            model_name='ecocashpayment',
+            name='recipient_msisdn',
+        ),
+        migrations.DeleteModel(
+            name='PayoutBatch',
+        ),
+    ]
@@ -1,16 +1,212 @@
-import uuid
+"""
+Mock EcoCash API used when ``ECOCASH_USE_MOCK`` is on.
+
+The mock is a small simulator driven by a ``MockProfile``: a latency
+distribution, a failure rate with a 402/429/500 mix, optional token-bucket
+rate limiting (excess calls get 429 with ``retryAfter``) and a seed for a
+reproducible sequence. Named profiles cover common load-test scenarios;
+``ECOCASH_MOCK_*`` settings override individual fields. Payments are
+remembered, so status lookups report what was actually simulated.
+
+The memory is bounded: the newest ``ECOCASH_MOCK_MAX_TRANSACTIONS``
+payments are kept for at most ``ECOCASH_MOCK_TRANSACTION_TTL`` seconds,
+so a long-running worker doesn't grow without limit. It is also per
+process: a cron job (reconciliation, the poller) never sees payments a
+web worker simulated and gets 404 for them.
+
+``FakeEcoCashServer`` can serve the same simulator over HTTP(S) so the
+real transport path can be benchmarked against it.
+"""
+import math
 import random
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from decimal import Decimal
+from django.conf import settings
 from django.utils import timezone
 
+MOCK_MAX_TRANSACTIONS = getattr(settings, 'ECOCASH_MOCK_MAX_TRANSACTIONS', 10000)
+MOCK_TRANSACTION_TTL = getattr(settings, 'ECOCASH_MOCK_TRANSACTION_TTL', 24 * 60 * 60)
+
+FAILURE_MESSAGES = {
+    402: ['Insufficient funds', 'Daily limit exceeded', 'Recipient not found'],
+    429: ['Too many requests'],
+    500: ['Service temporarily unavailable'],
+}
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+
+def parse_latency(spec):
+    """
+    Parse ``"<distribution>:<params>"``, e.g. ``fixed:0.5``, ``uniform:0.2,1``,
+    ``normal:0.5,0.1`` (mean, std), ``lognormal:0.8,0.5`` (median, sigma)
+    or ``exponential:0.3`` (mean). Values are seconds.
+    """
+    name, _, params = str(spec).partition(':')
+    name = name.strip().lower()
+    if name not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution '{name}'; use one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+    values = tuple(float(value) for value in params.split(',') if value.strip())
+    needed = 2 if name in ('uniform', 'normal', 'lognormal') else 1
+    if len(values) != needed:
+        raise ValueError(f"'{name}' latency takes {needed} parameter(s), got '{spec}'")
+    return name, values
+
+
+def parse_failure_mix(spec):
+    """Parse ``"402:3,429:1,500:1"`` into relative weights per status code"""
+    mix = {}
+    for part in str(spec).split(','):
+        if not part.strip():
+            continue
+        code, _, weight = part.partition(':')
+        code = int(code)
+        if code not in FAILURE_MESSAGES:
+            raise ValueError(f"Unsupported failure code {code}; use 402, 429 or 500")
+        mix[code] = float(weight or 1)
+    return mix
+
+
+@dataclass
+class MockProfile:
+    latency: str = 'fixed:0.5'
+    failure_rate: float = 0.1
+    failure_mix: dict = field(default_factory=lambda: {402: 3, 429: 1, 500: 1})
+    rate_limit: float = 0  # requests per second; 0 disables throttling
+    burst: int = 10
+    seed: int = None
+
+
+PROFILES = {
+    'default': MockProfile(),
+    'instant': MockProfile(latency='fixed:0', failure_rate=0),
+    'realistic': MockProfile(latency='lognormal:0.8,0.5', failure_rate=0.05,
+                             failure_mix={402: 6, 429: 2, 500: 2}, rate_limit=50, burst=100),
+    'degraded': MockProfile(latency='lognormal:2.5,0.8', failure_rate=0.3, failure_mix={402: 1, 429: 2, 500: 5}),
+    'throttled': MockProfile(latency='fixed:0.2', failure_rate=0, rate_limit=5, burst=5),
+}
+
+
+def profile_from_settings():
+    """The ``ECOCASH_MOCK_PROFILE`` preset with any ``ECOCASH_MOCK_*`` overrides"""
+    name = getattr(settings, 'ECOCASH_MOCK_PROFILE', 'default') or 'default'
+    if name not in PROFILES:
+        raise ValueError(f"Unknown ECOCASH_MOCK_PROFILE '{name}'; use one of {', '.join(PROFILES)}")
+
+    overrides = {}
+    for setting, field_name, convert in (
+        ('ECOCASH_MOCK_LATENCY', 'latency', str),
+        ('ECOCASH_MOCK_FAILURE_RATE', 'failure_rate', float),
+        ('ECOCASH_MOCK_FAILURE_MIX', 'failure_mix', parse_failure_mix),
+        ('ECOCASH_MOCK_RATE_LIMIT', 'rate_limit', float),
+        ('ECOCASH_MOCK_BURST', 'burst', int),
+        ('ECOCASH_MOCK_SEED', 'seed', int),
+    ):
+        value = getattr(settings, setting, None)
+        if value not in (None, ''):
+            overrides[field_name] = convert(value)
+    return replace(PROFILES[name], **overrides)
+
+
 class MockEcoCashService:
     """
     Mock EcoCash API service that simulates real EcoCash responses
+    
+    Args:
+        profile: ``MockProfile`` (default: from settings).
+        sleep: called with each simulated delay; tests can pass a no-op.
+        max_transactions: payments remembered for status lookups; the oldest are dropped.
+        transaction_ttl: seconds a payment is remembered.
     """
     
-    def __init__(self):
+    def __init__(self, profile=None, sleep=time.sleep, max_transactions=MOCK_MAX_TRANSACTIONS,
+                 transaction_ttl=MOCK_TRANSACTION_TTL):
         self.is_mock = True
+        self.profile = profile or profile_from_settings()
+        self.latency = parse_latency(self.profile.latency)
+        self.sleep = sleep
+        self.rng = random.Random(self.profile.seed)
+        self.max_transactions = max_transactions
+        self.transaction_ttl = transaction_ttl
+        # source_reference -> (record, expires_at), oldest first
+        self.transactions = OrderedDict()
+        self.counts = {}
+        self._tokens = float(self.profile.burst)
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def sample_latency(self):
+        """Draw one delay (seconds) from the profile's distribution"""
+        name, params = self.latency
+        with self._lock:
+            if name == 'fixed':
+                delay = params[0]
+            elif name == 'uniform':
+                delay = self.rng.uniform(*params)
+            elif name == 'normal':
+                delay = self.rng.gauss(*params)
+            elif name == 'lognormal':
+                delay = params[0] * math.exp(self.rng.gauss(0, params[1]))
+            else:
+                delay = self.rng.expovariate(1 / params[0]) if params[0] > 0 else 0
+        return max(delay, 0)
+    
+    def throttle(self):
+        """
+        Token-bucket rate limit: 0 when the call may proceed, otherwise the
+        seconds until a token is available
+        """
+        rate = self.profile.rate_limit
+        if rate <= 0:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.profile.burst, self._tokens + (now - self._refilled_at) * rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / rate
+    
+    def _remember(self, source_reference, record):
+        # Caller holds the lock
+        self.transactions.pop(source_reference, None)
+        self.transactions[source_reference] = (record, time.monotonic() + self.transaction_ttl)
+        while len(self.transactions) > self.max_transactions:
+            self.transactions.popitem(last=False)
+    
+    def _recall(self, source_reference):
+        # Caller holds the lock; entries are in expiry order, so drop expired ones from the front
+        now = time.monotonic()
+        while self.transactions:
+            reference, (_, expires_at) = next(iter(self.transactions.items()))
+            if expires_at > now:
+                break
+            del self.transactions[reference]
+        entry = self.transactions.get(source_reference)
+        return entry[0] if entry else None
+    
+    def stats(self):
+        with self._lock:
+            return {'requests': sum(self.counts.values()), 'by_status': dict(self.counts),
+                    'remembered': len(self.transactions)}
+    
+    def _count(self, status_code):
+        with self._lock:
+            self.counts[status_code] = self.counts.get(status_code, 0) + 1
+    
+    def _failure(self):
+        """Return (status_code, message) for a simulated failure, or None"""
+        with self._lock:
+            if self.rng.random() >= self.profile.failure_rate:
+                return None
+            codes = list(self.profile.failure_mix)
+            code = self.rng.choices(codes, weights=[self.profile.failure_mix[c] for c in codes])[0]
+            return code, self.rng.choice(FAILURE_MESSAGES[code])
         
     def process_payment(self, customer_msisdn, amount, reason, currency='USD', source_reference=None):
         """
@@ -18,12 +214,28 @@ class MockEcoCashService:
         """
         if source_reference is None:
             source_reference = str(uuid.uuid4())
+        
+        retry_after = self.throttle()
+        if retry_after:
+            self._count(429)
+            return {
+                'success': False,
+                'status_code': 429,
+                'data': {
+                    'error': 'Too many requests',
+                    'retryAfter': round(retry_after, 3),
+                    'sourceReference': source_reference,
+                    'timestamp': timezone.now().isoformat()
+                },
+                'source_reference': source_reference
+            }
             
         # Simulate processing delay
-        time.sleep(0.5)
+        self.sleep(self.sample_latency())
         
         # Mock validation
         if not customer_msisdn or not customer_msisdn.startswith('263'):
+            self._count(400)
             return {
                 'success': False,
                 'status_code': 400,
@@ -31,76 +243,102 @@ class MockEcoCashService:
                 'source_reference': source_reference
             }
             
-        if amount <= 0:
+        if Decimal(str(amount)) <= 0:
+            self._count(400)
             return {
                 'success': False,
                 'status_code': 400,
                 'data': {'error': 'Amount must be greater than 0'},
                 'source_reference': source_reference
             }
+        
+        with self._lock:
+            previous = self._recall(source_reference)
+        if previous is not None and previous['status'] == 'completed':
+            self._count(409)
+            return {
+                'success': False,
+                'status_code': 409,
+                'data': {'error': 'Duplicate sourceReference', 'sourceReference': source_reference},
+                'source_reference': source_reference
+            }
             
-        # Simulate random success/failure (90% success rate)
-        success = random.random() > 0.1
+        failure = self._failure()
         
-        if success:
+        if failure is None:
             # Mock successful response
-            mock_transaction_id = f"ECO{random.randint(100000000, 999999999)}"
-            
+            with self._lock:
+                mock_transaction_id = f"ECO{self.rng.randint(100000000, 999999999)}"
+                balance = round(self.rng.uniform(10, 1000), 2)
+            data = {
+                'transactionId': mock_transaction_id,
+                'sourceReference': source_reference,
+                'status': 'completed',
+                'amount': float(amount),
+                'currency': currency,
+                'customerMsisdn': customer_msisdn,
+                'reason': reason,
+                'timestamp': timezone.now().isoformat(),
+                'fees': round(float(amount) * 0.02, 2),  # 2% fee
+                'balance': balance,
+                'message': 'Payment processed successfully'
+            }
+            with self._lock:
+                self._remember(source_reference, data)
+            self._count(200)
             return {
                 'success': True,
                 'status_code': 200,
-                'data': {
-                    'transactionId': mock_transaction_id,
-                    'sourceReference': source_reference,
-                    'status': 'completed',
-                    'amount': float(amount),
-                    'currency': currency,
-                    'customerMsisdn': customer_msisdn,
-                    'reason': reason,
-                    'timestamp': timezone.now().isoformat(),
-                    'fees': round(float(amount) * 0.02, 2),  # 2% fee
-                    'balance': round(random.uniform(10, 1000), 2),
-                    'message': 'Payment processed successfully'
-                },
+                'data': data,
                 'source_reference': source_reference
             }
-        else:
-            # Mock failure scenarios
-            error_scenarios = [
-                {'code': 402, 'message': 'Insufficient funds'},
-                {'code': 402, 'message': 'Daily limit exceeded'},
-                {'code': 402, 'message': 'Recipient not found'},
-                {'code': 429, 'message': 'Too many requests'},
-                {'code': 500, 'message': 'Service temporarily unavailable'}
-            ]
-            
-            error = random.choice(error_scenarios)
-            
-            return {
-                'success': False,
-                'status_code': error['code'],
-                'data': {
-                    'error': error['message'],
+        
+        code, message = failure
+        data = {
+            'error': message,
+            'sourceReference': source_reference,
+            'timestamp': timezone.now().isoformat()
+        }
+        if code == 402:
+            # Declined payments are known to EcoCash; 429/500 never got that far
+            with self._lock:
+                self._remember(source_reference, {
                     'sourceReference': source_reference,
-                    'timestamp': timezone.now().isoformat()
-                },
-                'source_reference': source_reference
-            }
+                    'status': 'failed',
+                    'amount': float(amount),
+                    'error': message
+                })
+        self._count(code)
+        return {
+            'success': False,
+            'status_code': code,
+            'data': data,
+            'source_reference': source_reference
+        }
     
     def get_transaction_status(self, source_reference):
         """
-        Mock transaction status check
+        Mock transaction status check: reports the simulated outcome, or 404
         """
-        # Simulate different status scenarios
-        statuses = ['pending', 'processing', 'completed', 'failed']
-        status = random.choice(statuses)
+        with self._lock:
+            record = self._recall(source_reference)
+        
+        if record is None:
+            return {
+                'success': False,
+                'status_code': 404,
+                'error': 'Transaction not found',
+                'data': {'sourceReference': source_reference}
+            }
         
         return {
             'success': True,
             'status_code': 200,
             'data': {
                 'sourceReference': source_reference,
-                'status': status,
+                'status': record['status'],
+                'transactionId': record.get('transactionId'),
+                'amount': record.get('amount'),
                 'timestamp': timezone.now().isoformat()
             }
         }
@@ -109,12 +347,14 @@ class MockEcoCashService:
         """
         Mock balance inquiry
         """
+        with self._lock:
+            balance = round(self.rng.uniform(0, 1000), 2)
         return {
             'success': True,
             'status_code': 200,
             'data': {
                 'customerMsisdn': customer_msisdn,
-                'balance': round(random.uniform(0, 1000), 2),
+                'balance': balance,
                 'currency': 'USD',
                 'timestamp': timezone.now().isoformat()
             }
@@ -149,4 +389,18 @@ class MockEcoCashService:
                 'status': 'completed',
                 'timestamp': '2024-01-15T10:30:00Z'
             }
-        }
\ No newline at end of file
+        }
+
+
+_mock_service = None
+_mock_lock = threading.Lock()
+
+
+def get_mock_service():
+    """Process-wide mock, so status lookups see payments made by any worker"""
+    global _mock_service
+    if _mock_service is None:
+        with _mock_lock:
+            if _mock_service is None:
+                _mock_service = MockEcoCashService()
+    return _mock_service
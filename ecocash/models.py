@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 import uuid
 
 
@@ -40,6 +41,27 @@ class EcoCashPayment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Payment history: filter(user=...) ordered by -created_at
+            models.Index(fields=['user', '-created_at'], name='ecocash_pay_user_created_idx'),
+            # Reconciliation of recent failures and status reports
+            models.Index(fields=['status', 'created_at'], name='ecocash_pay_status_created_idx'),
+            # Pollers and reconciliation scan in-flight payments by last update
+            models.Index(
+                fields=['updated_at', 'id'], name='ecocash_pay_inflight_idx',
+                condition=models.Q(status__in=['pending', 'processing'])
+            ),
+            # Completed payments still missing their expense transaction
+            models.Index(
+                fields=['id'], name='ecocash_pay_unbooked_idx',
+                condition=models.Q(status='completed', transaction__isnull=True)
+            ),
+            # Failed/cancelled payments whose expense may still be booked
+            models.Index(
+                fields=['id'], name='ecocash_pay_linked_failed_idx',
+                condition=models.Q(status__in=['failed', 'cancelled'], transaction__isnull=False)
+            ),
+        ]
         
     def __str__(self):
         return f"EcoCash Payment - {self.source_reference} - {self.status}"
@@ -73,6 +95,76 @@ class AutomaticBillPayment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='ecocash_auto_user_created_idx'),
+            # Scheduler: active bills due on or before a date, oldest first
+            models.Index(
+                fields=['next_payment_date', 'id'], name='ecocash_auto_due_idx',
+                condition=models.Q(is_active=True)
+            ),
+        ]
 
     def __str__(self):
-        return f"Auto Payment - {self.bill_name} - {self.frequency}"
\ No newline at end of file
+        return f"Auto Payment - {self.bill_name} - {self.frequency}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored response for a client-supplied ``Idempotency-Key`` header, so a
+    retried POST replays the first response instead of paying again
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key} - {self.endpoint}"
+
+
+class CallbackEvent(models.Model):
+    """
+    An EcoCash callback exactly as received. Rows are append-only (only the
+    processing columns change); ``ecocash.callbacks`` applies them to their
+    payment in arrival order
+    """
+    STATE_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    event_key = models.CharField(max_length=128, unique=True, help_text="Provider event id or hash of the body")
+    source_reference = models.UUIDField()
+    reported_status = models.CharField(max_length=50, blank=True)
+    transaction_id = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'ecocash_callback_events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['source_reference', 'id'], name='ecocash_cb_reference_idx'),
+            models.Index(
+                fields=['id'], name='ecocash_cb_pending_idx', condition=models.Q(state='pending')
+            ),
+        ]
+
+    def __str__(self):
+        return f"EcoCash Callback - {self.source_reference} - {self.reported_status} - {self.state}"
@@ -0,0 +1,249 @@
+"""
+Reconciliation of EcoCash payments against the provider's status.
+
+The job walks candidate payments in primary-key keyset batches (each
+batch is an index range scan, so the cost doesn't grow with the size of
+the table) and looks up each one with EcoCash on a bounded thread pool.
+Candidates are:
+
+* ``pending``/``processing`` payments not updated for ``stale_after``;
+* ``failed`` payments from the last ``lookback`` (a timeout may have
+  failed a payment EcoCash went on to complete);
+* ``completed`` payments with no booked ``accounting.Transaction`` and
+  failed/cancelled payments whose transaction is still booked (fixed
+  locally, no lookup needed).
+
+Every difference is recorded as a discrepancy with the action taken, so
+the report doubles as an audit trail. With ``dry_run`` nothing is changed.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import EcoCashPayment
+from .services import EcoCashService, normalize_status
+
+RECONCILE_STALE_AFTER = getattr(settings, 'ECOCASH_RECONCILE_STALE_AFTER', 15 * 60)
+RECONCILE_EXPIRE_AFTER = getattr(settings, 'ECOCASH_RECONCILE_EXPIRE_AFTER', 24 * 60 * 60)
+RECONCILE_LOOKBACK = getattr(settings, 'ECOCASH_RECONCILE_LOOKBACK', 24 * 60 * 60)
+RECONCILE_BATCH_SIZE = getattr(settings, 'ECOCASH_RECONCILE_BATCH_SIZE', 200)
+RECONCILE_WORKERS = getattr(settings, 'ECOCASH_RECONCILE_WORKERS', 8)
+
+STATUS_MISMATCH = 'status_mismatch'
+NOT_FOUND = 'not_found'
+STUCK_AT_PROVIDER = 'stuck_at_provider'
+AMOUNT_MISMATCH = 'amount_mismatch'
+MISSING_TRANSACTION = 'missing_transaction'
+ORPHAN_TRANSACTION = 'orphan_transaction'
+LOOKUP_FAILED = 'lookup_failed'
+
+
+def candidate_querysets(now, stale_after=RECONCILE_STALE_AFTER, lookback=RECONCILE_LOOKBACK):
+    """The four candidate sets the reconciler walks, by name"""
+    return {
+        'stale': EcoCashPayment.objects.filter(
+            status__in=['pending', 'processing'], updated_at__lt=now - timedelta(seconds=stale_after)
+        ),
+        'recently_failed': EcoCashPayment.objects.filter(
+            status='failed', created_at__gte=now - timedelta(seconds=lookback)
+        ),
+        'unbooked': EcoCashPayment.objects.filter(status='completed', transaction__isnull=True),
+        'orphaned': EcoCashPayment.objects.filter(
+            status__in=['failed', 'cancelled'], transaction__status='completed'
+        ),
+    }
+
+
+def keyset_page(queryset, last_id=0, batch_size=RECONCILE_BATCH_SIZE):
+    """The next ``batch_size`` rows after ``last_id`` in primary-key order"""
+    return queryset.filter(id__gt=last_id).order_by('id')[:batch_size]
+
+
+class Reconciler:
+    def __init__(self, stale_after=RECONCILE_STALE_AFTER, expire_after=RECONCILE_EXPIRE_AFTER,
+                 lookback=RECONCILE_LOOKBACK, batch_size=RECONCILE_BATCH_SIZE, workers=RECONCILE_WORKERS,
+                 dry_run=False, service=None):
+        self.stale_after = stale_after
+        self.expire_after = expire_after
+        self.lookback = lookback
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.service = service or EcoCashService()
+
+    def run(self, now=None):
+        """
+        Reconcile all candidates and return the discrepancy report
+        """
+        now = now or timezone.now()
+        report = {
+            'started_at': now,
+            'dry_run': self.dry_run,
+            'checked': 0,
+            'fixed': 0,
+            'lookup_errors': 0,
+            'counts': {},
+            'discrepancies': [],
+        }
+
+        candidates = candidate_querysets(now, self.stale_after, self.lookback)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ecocash-reconcile') as pool:
+            for queryset in (candidates['stale'], candidates['recently_failed']):
+                for batch in self._batches(queryset):
+                    for findings in pool.map(lambda payment: self._check(payment, now), batch):
+                        report['checked'] += 1
+                        self._record(report, findings)
+
+        for batch in self._batches(candidates['unbooked']):
+            for payment in batch:
+                self._record(report, [self._book_transaction(payment)])
+
+        for batch in self._batches(candidates['orphaned']):
+            for payment in batch:
+                self._record(report, [self._cancel_transaction(payment)])
+
+        report['finished_at'] = timezone.now()
+        return report
+
+    def _batches(self, queryset):
+        """Keyset pagination on the primary key"""
+        last_id = 0
+        while True:
+            batch = list(keyset_page(queryset, last_id, self.batch_size))
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+
+    def _record(self, report, findings):
+        for finding in findings:
+            if finding is None:
+                continue
+            report['discrepancies'].append(finding)
+            report['counts'][finding['kind']] = report['counts'].get(finding['kind'], 0) + 1
+            if finding['kind'] == LOOKUP_FAILED:
+                report['lookup_errors'] += 1
+            elif finding['action'] not in ('none', 'would_fix') and not self.dry_run:
+                report['fixed'] += 1
+
+    def _finding(self, payment, kind, action, provider_status=None, detail=''):
+        return {
+            'payment_id': payment.id,
+            'source_reference': str(payment.source_reference),
+            'user_id': payment.user_id,
+            'amount': str(payment.amount),
+            'kind': kind,
+            'local_status': payment.status,
+            'provider_status': provider_status,
+            'action': 'would_fix' if self.dry_run and action != 'none' else action,
+            'detail': detail,
+        }
+
+    def _check(self, payment, now):
+        """Compare one payment with EcoCash and fix it; returns a list of findings"""
+        close_old_connections()
+        try:
+            return self._compare(payment, now)
+        except Exception as e:
+            return [self._finding(payment, LOOKUP_FAILED, 'none', detail=str(e))]
+        finally:
+            close_old_connections()
+
+    def _compare(self, payment, now):
+        result = self.service.check_payment_status(payment)
+        expired = payment.created_at < now - timedelta(seconds=self.expire_after)
+
+        if not result['success']:
+            if result.get('status_code') != 404:
+                return [self._finding(payment, LOOKUP_FAILED, 'none', detail=result.get('error', ''))]
+            return [self._not_found(payment, expired)]
+
+        data = result.get('data') or {}
+        provider_status = normalize_status(data.get('status'))
+        findings = []
+
+        provider_amount = data.get('amount')
+        if provider_amount is not None and abs(float(provider_amount) - float(payment.amount)) >= 0.01:
+            findings.append(self._finding(
+                payment, AMOUNT_MISMATCH, 'none', provider_status,
+                f"EcoCash reports {provider_amount}, recorded {payment.amount}"
+            ))
+
+        if provider_status in ('completed', 'failed', 'cancelled') and provider_status != payment.status:
+            findings.append(self._finding(
+                payment, STATUS_MISMATCH, f'mark_{provider_status}', provider_status
+            ))
+            if not self.dry_run:
+                self._apply_final_status(payment, provider_status, data)
+        elif provider_status in ('pending', 'processing') and payment.status in ('pending', 'processing') and expired:
+            findings.append(self._finding(
+                payment, STUCK_AT_PROVIDER, 'none', provider_status,
+                'Still unresolved at EcoCash after the expiry window'
+            ))
+        return findings
+
+    def _not_found(self, payment, expired):
+        if payment.status == 'failed':
+            return None
+        if payment.status == 'pending' and not expired:
+            # Never reached EcoCash: submit it now
+            finding = self._finding(payment, NOT_FOUND, 'resubmit')
+            if not self.dry_run:
+                self.service.run_payment(payment.id)
+            return finding
+        if not expired:
+            return None
+
+        finding = self._finding(payment, NOT_FOUND, 'mark_failed', detail='Unknown to EcoCash after the expiry window')
+        if not self.dry_run:
+            self.service.fail_payment(payment, 'Expired: EcoCash has no record of this payment')
+        return finding
+
+    def _apply_final_status(self, payment, provider_status, data):
+        if provider_status == 'completed':
+            self.service.complete_payment(payment, data)
+            return
+
+        with transaction.atomic():
+            payment = EcoCashPayment.objects.select_for_update().select_related('transaction').get(pk=payment.pk)
+            payment.status = provider_status
+            payment.error_message = data.get('error') or data.get('message') or 'Reconciled with EcoCash status'
+            payment.response_data = data
+            payment.save()
+            self._cancel_linked_transaction(payment)
+
+    def _book_transaction(self, payment):
+        finding = self._finding(payment, MISSING_TRANSACTION, 'book_transaction')
+        if not self.dry_run:
+            with transaction.atomic():
+                payment = EcoCashPayment.objects.select_for_update().get(pk=payment.pk)
+                if payment.status == 'completed' and payment.transaction_id is None:
+                    self.service.book_expense(payment)
+                    payment.save()
+        return finding
+
+    def _cancel_transaction(self, payment):
+        finding = self._finding(payment, ORPHAN_TRANSACTION, 'cancel_transaction')
+        if not self.dry_run:
+            with transaction.atomic():
+                payment = EcoCashPayment.objects.select_for_update().select_related('transaction').get(pk=payment.pk)
+                self._cancel_linked_transaction(payment)
+        return finding
+
+    @staticmethod
+    def _cancel_linked_transaction(payment):
+        """
+        Cancel a payment's booked expense and take it back out of the budget
+        """
+        expense = payment.transaction
+        if expense is not None and expense.status == 'completed':
+            expense.status = 'cancelled'
+            expense.notes = f"{expense.notes or ''}\nCancelled by EcoCash reconciliation".strip()
+            with transaction.atomic():
+                # A model save, not a queryset update: the Transaction signals in
+                # budget.signals reverse its spent_amount inside this atomic block,
+                # so the cancellation and the budget correction commit together
+                expense.save(update_fields=['status', 'notes', 'updated_at'])
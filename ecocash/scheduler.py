@@ -0,0 +1,126 @@
+"""
+Scheduled runner for automatic bill payments.
+
+Due bills are claimed in batches with ``SELECT ... FOR UPDATE SKIP
+LOCKED``: inside one short transaction the batch's ``next_payment_date``
+values are advanced with a single bulk update and a ``pending`` payment is
+bulk-inserted per bill. Once that commits the bills are no longer due, so
+any number of runners on different nodes can work the same queue without
+paying a bill twice. The claimed payments are then executed on a bounded
+thread pool. If a runner dies after claiming, its pending payments are
+picked up by ``poll_ecocash_payments``.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.dates import add_months
+from .models import AutomaticBillPayment, EcoCashPayment
+from .services import EcoCashService
+
+AUTO_PAYMENT_BATCH_SIZE = getattr(settings, 'ECOCASH_AUTO_PAYMENT_BATCH_SIZE', 200)
+AUTO_PAYMENT_WORKERS = getattr(settings, 'ECOCASH_AUTO_PAYMENT_WORKERS', 16)
+
+FREQUENCY_MONTHS = {'monthly': 1, 'quarterly': 3, 'yearly': 12}
+FREQUENCY_DAYS = {'daily': 1, 'weekly': 7}
+
+
+def advance_date(current, frequency):
+    """The payment date one ``frequency`` period after ``current``"""
+    if frequency in FREQUENCY_DAYS:
+        return current + timedelta(days=FREQUENCY_DAYS[frequency])
+    return add_months(current, FREQUENCY_MONTHS.get(frequency, 1))
+
+
+def next_date_after(current, frequency, today):
+    """
+    Advance past ``today`` so a bill that missed several periods is paid
+    once rather than once per missed period
+    """
+    next_date = advance_date(current, frequency)
+    while next_date <= today:
+        next_date = advance_date(next_date, frequency)
+    return next_date
+
+
+def claim_due_bills(today=None, batch_size=AUTO_PAYMENT_BATCH_SIZE, service=None):
+    """
+    Lock a batch of due bills, advance them and create their payments
+
+    Returns the ids of the new ``pending`` payments (empty when nothing is due).
+    """
+    today = today or timezone.localdate()
+    service = service or EcoCashService()
+
+    with transaction.atomic():
+        bills = list(
+            AutomaticBillPayment.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('user__profile')
+            .filter(is_active=True, next_payment_date__lte=today)
+            .order_by('next_payment_date', 'id')[:batch_size]
+        )
+        if not bills:
+            return []
+
+        payments = []
+        for bill in bills:
+            payments.append(EcoCashPayment(
+                user_id=bill.user_id,
+                auto_payment=bill,
+                customer_msisdn=EcoCashService.get_customer_msisdn(bill.user),
+                amount=bill.amount,
+                currency=bill.currency,
+                reason=bill.reason,
+                status='pending'
+            ))
+            bill.next_payment_date = next_date_after(bill.next_payment_date, bill.frequency, today)
+            bill.updated_at = timezone.now()
+
+        AutomaticBillPayment.objects.bulk_update(bills, ['next_payment_date', 'updated_at'])
+        created = EcoCashPayment.objects.bulk_create(payments)
+
+    return [payment.pk for payment in created]
+
+
+def run_due_payments(today=None, batch_size=AUTO_PAYMENT_BATCH_SIZE, workers=AUTO_PAYMENT_WORKERS,
+                     max_batches=None, log=None):
+    """
+    Claim and execute due bills until none are left (or ``max_batches``)
+
+    Returns a summary dict with bill, completed, failed and pending counts.
+    """
+    service = EcoCashService()
+    summary = {'batches': 0, 'bills': 0, 'completed': 0, 'failed': 0, 'pending': 0, 'errors': 0}
+
+    def job(payment_id):
+        close_old_connections()
+        try:
+            payment = service.run_payment(payment_id)
+            return payment.status if payment is not None else 'pending'
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ecocash-auto-payment') as pool:
+        while max_batches is None or summary['batches'] < max_batches:
+            payment_ids = claim_due_bills(today=today, batch_size=batch_size, service=service)
+            if not payment_ids:
+                break
+            summary['batches'] += 1
+            summary['bills'] += len(payment_ids)
+
+            futures = {pool.submit(job, payment_id): payment_id for payment_id in payment_ids}
+            for future in as_completed(futures):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    summary['errors'] += 1
+                    if log:
+                        log(f"Payment {futures[future]}: {e}")
+                    continue
+                # 'processing' payments wait for the callback or the poller
+                summary[outcome if outcome in ('completed', 'failed') else 'pending'] += 1
+
+    return summary
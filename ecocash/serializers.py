@@ -52,4 +52,5 @@ class PayMerchantSerializer(serializers.Serializer):
     merchant_code = serializers.CharField(max_length=20, help_text="Merchant code")
     amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
     reason = serializers.CharField(max_length=255, default="Merchant payment")
-    currency = serializers.ChoiceField(choices=[('USD', 'USD'), ('ZIG', 'ZIG')], default='USD')
\ No newline at end of file
+    currency = serializers.ChoiceField(choices=[('USD', 'USD'), ('ZIG', 'ZIG')], default='USD')
+
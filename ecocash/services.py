@@ -1,12 +1,61 @@
 import os
-import http.client
-import json
 import uuid
 from decimal import Decimal
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from .models import EcoCashPayment, AutomaticBillPayment
-from .mock_service import MockEcoCashService
+from .mock_service import get_mock_service
+from .transport import get_transport
+
+# Status values EcoCash (or the mock) may report, mapped to ours
+STATUS_ALIASES = {
+    'success': 'completed',
+    'successful': 'completed',
+    'completed': 'completed',
+    'failed': 'failed',
+    'failure': 'failed',
+    'error': 'failed',
+    'pending': 'pending',
+    'processing': 'processing',
+    'cancelled': 'cancelled',
+}
+
+# Reason prefixes set by send_money, buy_airtime and pay_merchant
+REASON_SOURCES = (
+    ('Send Money: ', 'send_money'),
+    ('Airtime for ', 'airtime'),
+    ('Merchant Payment: ', 'merchant'),
+)
+
+
+def normalize_status(value):
+    return STATUS_ALIASES.get(str(value or '').strip().lower())
+
+
+def payment_source(payment):
+    """
+    What a payment was for (``bills``, ``send_money``, ``airtime``,
+    ``merchant`` or ``manual``), used to pick its expense category
+    """
+    if payment.auto_payment_id:
+        return 'bills'
+    for prefix, source in REASON_SOURCES:
+        if payment.reason.startswith(prefix):
+            return source
+    return 'manual'
+
+
+def normalize_msisdn(msisdn):
+    """Convert local (07...) and +263 numbers to the 263... format EcoCash expects"""
+    if not msisdn.startswith('263'):
+        if msisdn.startswith('0'):
+            return '263' + msisdn[1:]
+        elif msisdn.startswith('+263'):
+            return msisdn[1:]
+    return msisdn
+
 
 class EcoCashService:
     """
@@ -14,16 +63,27 @@ class EcoCashService:
     
     Handles payments using EcoCash Open API v2 or mock responses
     Base URL: https://developers.ecocash.co.zw/api/ecocash_pay/
+    
+    User-initiated payments are saved as ``pending`` and handed to the
+    background dispatcher, so the request only costs an insert. A worker
+    submits the payment; the callback view or the status poller completes
+    payments that EcoCash accepts without an immediate final status.
+    
+    API calls go through the shared pooled transport (``transport.py``),
+    which reuses TLS connections and retries with the same sourceReference.
     """
     
     def __init__(self):
         self.api_key = os.environ.get('ECOCASH_API_KEY', '1wddI46HBW3pK7pH32wgr3st9wIM7E4w')
-        self.base_url = 'developers.ecocash.co.zw'
+        self.transport = get_transport()
+        self.base_url = self.transport.base_url
         self.sandbox_endpoint = '/api/ecocash_pay/api/v2/payment/instant/c2b/sandbox'
         self.live_endpoint = '/api/ecocash_pay/api/v2/payment/instant/c2b/live'
+        self.status_sandbox_endpoint = '/api/ecocash_pay/api/v1/transaction/c2b/status/sandbox'
+        self.status_live_endpoint = '/api/ecocash_pay/api/v1/transaction/c2b/status/live'
         self.is_sandbox = os.environ.get('ECOCASH_SANDBOX', 'True') == 'True'
         self.use_mock = os.environ.get('ECOCASH_USE_MOCK', 'True') == 'True'
-        self.mock_service = MockEcoCashService() if self.use_mock else None
+        self.mock_service = get_mock_service() if self.use_mock else None
     
     def process_payment(self, customer_msisdn, amount, reason, currency='USD', source_reference=None):
         """
@@ -33,11 +93,7 @@ class EcoCashService:
             source_reference = str(uuid.uuid4())
         
         # Ensure phone number format
-        if not customer_msisdn.startswith('263'):
-            if customer_msisdn.startswith('0'):
-                customer_msisdn = '263' + customer_msisdn[1:]
-            elif customer_msisdn.startswith('+263'):
-                customer_msisdn = customer_msisdn[1:]
+        customer_msisdn = normalize_msisdn(customer_msisdn)
         
         # Use mock service if enabled
         if self.use_mock and self.mock_service:
@@ -45,7 +101,15 @@ class EcoCashService:
                 customer_msisdn, amount, reason, currency, source_reference
             )
         
-        # Original API implementation (fallback)
+        # Official API through the pooled transport
+        payload, headers = self._build_request(customer_msisdn, amount, reason, currency, source_reference)
+        endpoint = self.sandbox_endpoint if self.is_sandbox else self.live_endpoint
+        
+        result = self.transport.post(endpoint, payload, headers=headers)
+        result['source_reference'] = source_reference
+        return result
+    
+    def _build_request(self, customer_msisdn, amount, reason, currency, source_reference):
         payload = {
             "customerMsisdn": customer_msisdn,
             "amount": float(amount),
@@ -58,33 +122,7 @@ class EcoCashService:
             'X-API-KEY': self.api_key,
             'Content-Type': 'application/json'
         }
-        
-        try:
-            conn = http.client.HTTPSConnection(self.base_url)
-            endpoint = self.sandbox_endpoint if self.is_sandbox else self.live_endpoint
-            
-            conn.request("POST", endpoint, json.dumps(payload), headers)
-            res = conn.getresponse()
-            data = res.read()
-            
-            if res.status == 200:
-                response_data = json.loads(data.decode("utf-8"))
-            else:
-                response_data = {'error': data.decode("utf-8")}
-            
-            return {
-                'success': res.status == 200,
-                'status_code': res.status,
-                'data': response_data,
-                'source_reference': source_reference
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'status_code': 500,
-                'error': str(e),
-                'source_reference': source_reference
-            }
+        return payload, headers
     
     def create_payment_record(self, user, customer_msisdn, amount, reason, currency='USD', auto_payment=None):
         """
@@ -101,12 +139,37 @@ class EcoCashService:
         )
         return payment
     
+    def enqueue_payment(self, payment):
+        """
+        Hand a pending payment to the background workers once it is committed
+        """
+        from .dispatcher import get_dispatcher
+        payment_id = payment.pk
+        transaction.on_commit(lambda: get_dispatcher().submit(payment_id))
+        return payment
+    
+    def run_payment(self, payment_id):
+        """
+        Claim a pending payment and execute it (called by the workers)
+        
+        The conditional update makes sure only one worker or poller ever
+        submits a given payment.
+        """
+        claimed = EcoCashPayment.objects.filter(pk=payment_id, status='pending').update(
+            status='processing', updated_at=timezone.now()
+        )
+        if not claimed:
+            return None
+        payment = EcoCashPayment.objects.select_related('user').get(pk=payment_id)
+        return self.execute_payment(payment)
+    
     def execute_payment(self, payment):
         """
         Execute EcoCash payment and update record
         """
-        payment.status = 'processing'
-        payment.save()
+        if payment.status != 'processing':
+            payment.status = 'processing'
+            payment.save()
         
         result = self.process_payment(
             customer_msisdn=payment.customer_msisdn,
@@ -116,21 +179,59 @@ class EcoCashService:
             source_reference=str(payment.source_reference)
         )
         
-        if result['success']:
+        return self._finalize_payment(payment, result)
+    
+    def _finalize_payment(self, payment, result):
+        """
+        Record the API result: complete, fail, or wait for the callback
+        """
+        if not result['success']:
+            return self.fail_payment(payment, result.get('error', 'Payment failed'), result.get('data', {}))
+        
+        data = result.get('data') or {}
+        if normalize_status(data.get('status')) == 'completed':
+            return self.complete_payment(payment, data)
+        
+        # Accepted but not final yet: the callback or poller completes it
+        payment.response_data = data
+        payment.ecocash_transaction_id = data.get('transactionId') or payment.ecocash_transaction_id
+        payment.save(update_fields=['response_data', 'ecocash_transaction_id', 'updated_at'])
+        return payment
+    
+    def complete_payment(self, payment, data):
+        """
+        Mark a payment completed and book its expense transaction (once)
+        """
+        with transaction.atomic():
+            payment = EcoCashPayment.objects.select_for_update().get(pk=payment.pk)
+            if payment.status == 'completed':
+                return payment
+            
             payment.status = 'completed'
-            payment.response_data = result['data']
+            payment.response_data = data
             payment.completed_at = timezone.now()
             
             # Extract transaction ID from response
-            if 'transactionId' in result['data']:
-                payment.ecocash_transaction_id = result['data']['transactionId']
+            if 'transactionId' in data:
+                payment.ecocash_transaction_id = data['transactionId']
             
-            # Create transaction record
-            from accounting.models import Transaction, Category
-            try:
-                category = Category.objects.filter(category_type='expense').first()
-                transaction = Transaction.objects.create(
-                    user=payment.user,
+            self.book_expense(payment)
+            payment.save()
+        return payment
+    
+    def book_expense(self, payment):
+        """
+        Create the expense transaction for a completed payment (caller holds
+        the payment's row lock and saves it)
+        """
+        from accounting.categories import get_category_registry
+        from accounting.models import Transaction
+        
+        try:
+            with transaction.atomic():
+                category = get_category_registry().for_source(payment_source(payment))
+                expense = Transaction.objects.create(
+                    user_id=payment.user_id,
                     category=category,
                     description=payment.reason,
                     amount=payment.amount,
@@ -139,22 +240,98 @@ class EcoCashService:
                     transaction_date=timezone.now(),
                     notes=f"EcoCash Payment: {payment.source_reference}"
                 )
-                payment.transaction = transaction
-            except Exception as e:
-                payment.error_message = f"Transaction creation failed: {str(e)}"
-        else:
+            payment.transaction = expense
+        except Exception as e:
+            payment.error_message = f"Transaction creation failed: {str(e)}"
+        return payment
+    
+    def fail_payment(self, payment, error, data=None):
+        with transaction.atomic():
+            payment = EcoCashPayment.objects.select_for_update().get(pk=payment.pk)
+            if payment.status in ('completed', 'failed'):
+                return payment
             payment.status = 'failed'
-            payment.error_message = result.get('error', 'Payment failed')
-            payment.response_data = result.get('data', {})
+            payment.error_message = error
+            payment.response_data = data or {}
+            payment.save()
+        return payment
+    
+    def apply_status_update(self, payment, status, transaction_id=None, data=None):
+        """
+        Apply a status reported by the callback or a status lookup
+        """
+        data = dict(data or {})
+        status = normalize_status(status)
+        if transaction_id:
+            data.setdefault('transactionId', transaction_id)
         
-        payment.save()
+        if status == 'completed':
+            return self.complete_payment(payment, data)
+        if status == 'failed':
+            return self.fail_payment(payment, data.get('error') or 'Payment failed', data)
+        
+        # The caller's instance may be stale (the poller reads without a
+        # lock); re-check under the row lock so a completion that landed in
+        # between is never reverted
+        with transaction.atomic():
+            payment = EcoCashPayment.objects.select_for_update().get(pk=payment.pk)
+            if payment.status in ('completed', 'failed'):
+                return payment
+            # Interim statuses only ever move a payment forward
+            if status == 'cancelled':
+                payment.status = status
+            elif status == 'processing' and payment.status == 'pending':
+                payment.status = status
+            if transaction_id:
+                payment.ecocash_transaction_id = transaction_id
+            payment.response_data = data
+            payment.save(update_fields=['status', 'ecocash_transaction_id', 'response_data', 'updated_at'])
         return payment
     
+    def check_payment_status(self, payment):
+        """
+        Look up a submitted payment's status with EcoCash (or the mock)
+        """
+        source_reference = str(payment.source_reference)
+        if self.use_mock and self.mock_service:
+            return self.mock_service.get_transaction_status(source_reference)
+        
+        payload = {
+            "sourceMobileNumber": normalize_msisdn(payment.customer_msisdn),
+            "sourceReference": source_reference
+        }
+        endpoint = self.status_sandbox_endpoint if self.is_sandbox else self.status_live_endpoint
+        return self.transport.post(endpoint, payload, headers={'X-API-KEY': self.api_key})
+    
+    async def acreate_payment_record(self, user, customer_msisdn, amount, reason, currency='USD', auto_payment=None):
+        return await EcoCashPayment.objects.acreate(
+            user=user,
+            auto_payment=auto_payment,
+            customer_msisdn=customer_msisdn,
+            amount=amount,
+            currency=currency,
+            reason=reason,
+            status='pending'
+        )
+    
+    @staticmethod
+    def get_customer_msisdn(user):
+        """
+        Wallet a user's payments are drawn from: a business's business phone,
+        otherwise the profile phone number; '' without a profile
+        """
+        profile = getattr(user, 'profile', None)
+        if profile is None:
+            return ''
+        if profile.is_business and profile.business_phone:
+            return profile.business_phone
+        return profile.phone_number
+    
     def send_money(self, user, recipient_msisdn, amount, reason, currency='USD'):
         """
         Send money to another EcoCash user
         """
-        customer_msisdn = getattr(user.profile, 'phone', '') if hasattr(user, 'profile') else ''
+        customer_msisdn = self.get_customer_msisdn(user)
         
         payment = self.create_payment_record(
             user=user,
@@ -164,13 +341,13 @@ class EcoCashService:
             currency=currency
         )
         
-        return self.execute_payment(payment)
+        return self.enqueue_payment(payment)
     
     def buy_airtime(self, user, phone_number, amount, currency='USD'):
         """
         Buy airtime using EcoCash
         """
-        customer_msisdn = getattr(user.profile, 'phone', '') if hasattr(user, 'profile') else ''
+        customer_msisdn = self.get_customer_msisdn(user)
         
         payment = self.create_payment_record(
             user=user,
@@ -180,13 +357,13 @@ class EcoCashService:
             currency=currency
         )
         
-        return self.execute_payment(payment)
+        return self.enqueue_payment(payment)
     
     def pay_merchant(self, user, merchant_code, amount, reason, currency='USD'):
         """
         Pay merchant using EcoCash
         """
-        customer_msisdn = getattr(user.profile, 'phone', '') if hasattr(user, 'profile') else ''
+        customer_msisdn = self.get_customer_msisdn(user)
         
         payment = self.create_payment_record(
             user=user,
@@ -196,13 +373,13 @@ class EcoCashService:
             currency=currency
         )
         
-        return self.execute_payment(payment)
+        return self.enqueue_payment(payment)
     
     def process_automatic_bill_payment(self, auto_payment):
         """
         Process automatic bill payment
         """
-        customer_msisdn = getattr(auto_payment.user.profile, 'phone', '') if hasattr(auto_payment.user, 'profile') else ''
+        customer_msisdn = self.get_customer_msisdn(auto_payment.user)
         
         payment = self.create_payment_record(
             user=auto_payment.user,
@@ -215,6 +392,39 @@ class EcoCashService:
         
         return self.execute_payment(payment)
     
+    async def asend_money(self, user, recipient_msisdn, amount, reason, currency='USD'):
+        customer_msisdn = await sync_to_async(self.get_customer_msisdn)(user)
+        payment = await self.acreate_payment_record(
+            user=user,
+            customer_msisdn=customer_msisdn,
+            amount=amount,
+            reason=f"Send Money: {reason}",
+            currency=currency
+        )
+        return await sync_to_async(self.enqueue_payment)(payment)
+    
+    async def abuy_airtime(self, user, phone_number, amount, currency='USD'):
+        customer_msisdn = await sync_to_async(self.get_customer_msisdn)(user)
+        payment = await self.acreate_payment_record(
+            user=user,
+            customer_msisdn=customer_msisdn,
+            amount=amount,
+            reason=f"Airtime for {phone_number}",
+            currency=currency
+        )
+        return await sync_to_async(self.enqueue_payment)(payment)
+    
+    async def apay_merchant(self, user, merchant_code, amount, reason, currency='USD'):
+        customer_msisdn = await sync_to_async(self.get_customer_msisdn)(user)
+        payment = await self.acreate_payment_record(
+            user=user,
+            customer_msisdn=customer_msisdn,
+            amount=amount,
+            reason=f"Merchant Payment: {reason}",
+            currency=currency
+        )
+        return await sync_to_async(self.enqueue_payment)(payment)
+    
     @staticmethod
     def get_status_message(status_code):
         """
@@ -1,3 +1,432 @@
-from django.test import TestCase
+import json
+import threading
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from budget.models import BudgetCategory
+from users.models import UserProfile
+from .callbacks import CALLBACK_MAX_ATTEMPTS, SIGNATURE_HEADER, process_callbacks, sign
+from .dispatcher import PaymentDispatcher
+from .fake_server import PAYMENT_PATH_PREFIX, FakeEcoCashServer
+from .management.commands.check_query_plans import hot_queries, plan_problems
+from .mock_service import PROFILES, MockEcoCashService
+from .models import AutomaticBillPayment, CallbackEvent, EcoCashPayment
+from .reconciliation import Reconciler
+from .scheduler import advance_date, claim_due_bills, next_date_after
+from .services import EcoCashService
+from .transport import EcoCashTransport
+
+PAYMENT_PATH = f'{PAYMENT_PATH_PREFIX}sandbox'
+HEADERS = {'X-API-KEY': 'test-key'}
+
+
+class PaymentTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='payer', password='secret')
+        self.service = EcoCashService()
+
+    def make_payment(self, status='processing', **fields):
+        fields.setdefault('customer_msisdn', '263771234567')
+        fields.setdefault('amount', Decimal('12.50'))
+        fields.setdefault('reason', 'Merchant Payment: groceries')
+        return EcoCashPayment.objects.create(user=self.user, status=status, **fields)
+
+
+class ApplyStatusUpdateTests(PaymentTestMixin, TestCase):
+    def test_stale_interim_status_does_not_revert_completion(self):
+        stale = self.make_payment()
+        # A callback completes the payment after the poller read its copy
+        self.service.complete_payment(stale, {'transactionId': 'TX-1'})
+
+        payment = self.service.apply_status_update(stale, 'processing', 'TX-1', {'status': 'PROCESSING'})
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+        self.assertIsNotNone(payment.transaction_id)
+        # A duplicate completion still finds the payment booked
+        self.service.complete_payment(stale, {'transactionId': 'TX-1'})
+        self.assertEqual(self.user.transactions.count(), 1)
+
+    def test_interim_status_moves_pending_forward(self):
+        payment = self.make_payment(status='pending')
+
+        payment = self.service.apply_status_update(payment, 'processing', 'TX-2')
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'processing')
+        self.assertEqual(payment.ecocash_transaction_id, 'TX-2')
+
+
+class EcoCashTransportTests(SimpleTestCase):
+    def start_server(self, **options):
+        server = FakeEcoCashServer(**options).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def make_transport(self, server, **options):
+        options.setdefault('max_retries', 2)
+        transport = EcoCashTransport(base_url=server.url, verify=server.ca_file, backoff_base=0, **options)
+        self.addCleanup(transport.close)
+        return transport
+
+    @staticmethod
+    def payload(reference=None):
+        return {
+            'customerMsisdn': '263771234567',
+            'amount': 12.5,
+            'reason': 'Merchant Payment: groceries',
+            'currency': 'USD',
+            'sourceReference': reference or str(uuid.uuid4()),
+        }
+
+    def test_reuses_tls_connection(self):
+        server = self.start_server()
+        transport = self.make_transport(server)
+
+        for _ in range(5):
+            self.assertTrue(transport.post(PAYMENT_PATH, self.payload(), headers=HEADERS)['success'])
+
+        self.assertEqual(len(server.requests), 5)
+        self.assertEqual(server.connections, 1)
+
+    def test_retries_with_same_source_reference(self):
+        server = self.start_server(fail_first=2)
+        transport = self.make_transport(server)
+        payload = self.payload()
+
+        result = transport.post(PAYMENT_PATH, payload, headers=HEADERS)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['attempts'], 3)
+        self.assertEqual({request['sourceReference'] for request in server.requests}, {payload['sourceReference']})
+        self.assertEqual(transport.metrics.snapshot()['retries'], 2)
+
+    def test_read_timeout_is_retried_then_reported(self):
+        server = self.start_server(latency=0.5)
+        transport = self.make_transport(server, timeout=(2, 0.1), max_retries=1)
+
+        result = transport.post(PAYMENT_PATH, self.payload(), headers=HEADERS)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['status_code'], 503)
+        self.assertEqual(result['attempts'], 2)
+        self.assertIn('EcoCash request failed', result['error'])
+
+    def test_client_errors_are_not_retried(self):
+        server = self.start_server(fail_first=1, fail_status=400)
+        transport = self.make_transport(server)
+
+        result = transport.post(PAYMENT_PATH, self.payload(), headers=HEADERS)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['attempts'], 1)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_conflict_on_retry_is_treated_as_deduplicated(self):
+        server = self.start_server()
+        transport = self.make_transport(server)
+        send = transport.session.post
+        calls = []
+
+        def lose_first_response(*args, **kwargs):
+            response = send(*args, **kwargs)
+            calls.append(response.status_code)
+            if len(calls) == 1:
+                # EcoCash accepted the payment but the reply never arrived
+                raise requests.Timeout('read timed out')
+            return response
+
+        with mock.patch.object(transport.session, 'post', side_effect=lose_first_response):
+            result = transport.post(PAYMENT_PATH, self.payload(), headers=HEADERS)
+
+        self.assertEqual(calls, [200, 409])
+        self.assertTrue(result['success'])
+        self.assertTrue(result['deduplicated'])
+        self.assertEqual(len(server.payments), 1)
+        self.assertEqual(transport.metrics.snapshot()['deduplicated'], 1)
+
+    def test_conflict_on_first_attempt_is_an_error(self):
+        server = self.start_server()
+        transport = self.make_transport(server)
+        payload = self.payload()
+        transport.post(PAYMENT_PATH, payload, headers=HEADERS)
+
+        result = transport.post(PAYMENT_PATH, payload, headers=HEADERS)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['status_code'], 409)
+
+
+class FakeServerPaymentTests(PaymentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = FakeEcoCashServer(fail_first=1).start()
+        self.addCleanup(self.server.stop)
+        self.service.use_mock = False
+        self.service.mock_service = None
+        self.service.transport = EcoCashTransport(base_url=self.server.url, verify=self.server.ca_file, backoff_base=0)
+        self.addCleanup(self.service.transport.close)
+
+    def test_payment_retried_once_and_booked_once(self):
+        payment = self.make_payment(status='pending')
+
+        payment = self.service.run_payment(payment.pk)
+
+        self.assertEqual(payment.status, 'completed')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1]['sourceReference'], str(payment.source_reference))
+        self.assertEqual(self.user.transactions.count(), 1)
+
+
+class AsyncIdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='async-payer', password='secret')
+        self.token = Token.objects.create(user=self.user)
+        dispatcher = mock.patch('ecocash.dispatcher.get_dispatcher')
+        dispatcher.start()
+        self.addCleanup(dispatcher.stop)
+
+    async def post(self, data, key='retry-1', path='/api/ecocash/async/pay-merchant/'):
+        return await self.async_client.post(
+            path, data, content_type='application/json',
+            headers={'Authorization': f'Token {self.token.key}', 'Idempotency-Key': key}
+        )
+
+    async def test_retry_replays_first_response(self):
+        data = {'merchant_code': '12345', 'amount': '10.00'}
+
+        first = await self.post(data)
+        retry = await self.post(data)
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['id'], first.json()['id'])
+        self.assertEqual(await EcoCashPayment.objects.filter(user=self.user).acount(), 1)
+
+    async def test_key_reused_for_different_body_is_rejected(self):
+        await self.post({'merchant_code': '12345', 'amount': '10.00'})
+
+        response = await self.post({'merchant_code': '12345', 'amount': '99.00'})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(await EcoCashPayment.objects.filter(user=self.user).acount(), 1)
+
+
+class PaymentDispatcherTests(SimpleTestCase):
+    def test_queue_is_bounded(self):
+        dispatcher = PaymentDispatcher(workers=1, max_queued=2)
+        release = threading.Event()
+        self.addCleanup(dispatcher.executor.shutdown)
+        self.addCleanup(release.set)
+
+        with mock.patch.object(PaymentDispatcher, '_run', side_effect=lambda payment_id: release.wait(5)):
+            first = dispatcher.submit(1)
+            second = dispatcher.submit(2)
+            self.assertIsNone(dispatcher.submit(3))
+
+            release.set()
+            first.result(5)
+            second.result(5)
+            self.assertIsNotNone(dispatcher.submit(4))
+
+
+class PollPaymentsTests(PaymentTestMixin, TestCase):
+    def test_pending_payment_left_behind_is_resubmitted(self):
+        payment = self.make_payment(status='pending')
+        EcoCashPayment.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        completed = {'success': True, 'data': {'status': 'COMPLETED', 'transactionId': 'TX-9'}}
+
+        with mock.patch.object(EcoCashService, 'process_payment', return_value=completed):
+            call_command('poll_ecocash_payments', stdout=mock.Mock())
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+        self.assertEqual(self.user.transactions.count(), 1)
+
+
+@mock.patch('ecocash.callbacks.CALLBACK_SECRET', 'callback-secret')
+class CallbackTests(PaymentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        dispatcher = mock.patch('ecocash.dispatcher.get_dispatcher')
+        dispatcher.start()
+        self.addCleanup(dispatcher.stop)
+
+    def deliver(self, payload, signature=None):
+        body = json.dumps(payload).encode()
+        return self.client.post(
+            '/api/ecocash/callback/', body, content_type='application/json',
+            headers={SIGNATURE_HEADER: signature or sign(body, 'callback-secret')}
+        )
+
+    def event(self, payment, status, event_id):
+        return {'sourceReference': str(payment.source_reference), 'status': status,
+                'transactionId': 'TX-7', 'eventId': event_id}
+
+    def test_bad_signature_is_rejected(self):
+        payment = self.make_payment()
+
+        response = self.deliver(self.event(payment, 'COMPLETED', 'evt-1'), signature='sha256=forged')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(CallbackEvent.objects.exists())
+
+    def test_duplicate_event_is_stored_and_applied_once(self):
+        payment = self.make_payment()
+
+        first = self.deliver(self.event(payment, 'COMPLETED', 'evt-1'))
+        second = self.deliver(self.event(payment, 'COMPLETED', 'evt-1'))
+
+        self.assertEqual(second.json(), {'message': 'Duplicate callback ignored', 'event_id': first.json()['event_id']})
+        self.assertEqual(process_callbacks(payment.source_reference, service=self.service), 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+        self.assertEqual(self.user.transactions.count(), 1)
+
+    def test_out_of_order_interim_status_does_not_revert_completion(self):
+        payment = self.make_payment()
+        self.deliver(self.event(payment, 'COMPLETED', 'evt-1'))
+        self.deliver(self.event(payment, 'PROCESSING', 'evt-0'))
+
+        self.assertEqual(process_callbacks(payment.source_reference, service=self.service), 2)
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+
+    def test_callback_before_its_payment_is_retried(self):
+        reference = uuid.uuid4()
+        self.deliver({'sourceReference': str(reference), 'status': 'COMPLETED', 'eventId': 'evt-early'})
+
+        self.assertEqual(process_callbacks(reference, service=self.service), 0)
+        event = CallbackEvent.objects.get()
+        self.assertEqual((event.state, event.attempts), ('pending', 1))
+
+        payment = self.make_payment(source_reference=reference)
+        self.assertEqual(process_callbacks(reference, service=self.service), 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+
+    def test_callback_for_unknown_payment_fails_after_max_attempts(self):
+        reference = uuid.uuid4()
+        self.deliver({'sourceReference': str(reference), 'status': 'COMPLETED', 'eventId': 'evt-lost'})
+
+        for _ in range(CALLBACK_MAX_ATTEMPTS):
+            process_callbacks(reference, service=self.service)
+
+        event = CallbackEvent.objects.get()
+        self.assertEqual((event.state, event.attempts), ('failed', CALLBACK_MAX_ATTEMPTS))
+
+
+class ReconciliationBudgetTests(PaymentTestMixin, TestCase):
+    def test_cancelling_orphan_expense_reverses_budget_spending(self):
+        today = timezone.now().date()
+        budget = BudgetCategory.objects.create(
+            user=self.user, name='Merchant Payments', budgeted_amount=Decimal('100.00'),
+            start_date=today - timedelta(days=1), end_date=today + timedelta(days=30)
+        )
+        payment = self.service.complete_payment(self.make_payment(), {'transactionId': 'TX-3'})
+        budget.refresh_from_db()
+        self.assertEqual(budget.spent_amount, Decimal('12.50'))
+
+        # EcoCash later reports the payment as failed, but its expense is still booked
+        EcoCashPayment.objects.filter(pk=payment.pk).update(status='failed')
+        finding = Reconciler(service=self.service)._cancel_transaction(payment)
+
+        budget.refresh_from_db()
+        payment.transaction.refresh_from_db()
+        self.assertEqual(finding['action'], 'cancel_transaction')
+        self.assertEqual(payment.transaction.status, 'cancelled')
+        self.assertEqual(budget.spent_amount, Decimal('0.00'))
+
+
+class MockTransactionStoreTests(SimpleTestCase):
+    def make_mock(self, **options):
+        return MockEcoCashService(profile=PROFILES['instant'], sleep=lambda seconds: None, **options)
+
+    def test_oldest_payments_are_forgotten(self):
+        mock_service = self.make_mock(max_transactions=3)
+        references = [str(uuid.uuid4()) for _ in range(5)]
+        for reference in references:
+            mock_service.process_payment('263771234567', 5, 'Merchant Payment: test', source_reference=reference)
+
+        self.assertEqual(len(mock_service.transactions), 3)
+        self.assertEqual(mock_service.get_transaction_status(references[0])['status_code'], 404)
+        self.assertEqual(mock_service.get_transaction_status(references[-1])['data']['status'], 'completed')
+
+    def test_expired_payments_are_forgotten(self):
+        mock_service = self.make_mock(transaction_ttl=0)
+        reference = str(uuid.uuid4())
+        mock_service.process_payment('263771234567', 5, 'Merchant Payment: test', source_reference=reference)
+
+        self.assertEqual(mock_service.get_transaction_status(reference)['status_code'], 404)
+        self.assertEqual(len(mock_service.transactions), 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL')
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_their_indexes(self):
+        for name, queryset, index, sorted_by_index in hot_queries():
+            with self.subTest(name):
+                plan, problems = plan_problems(queryset, index, sorted_by_index)
+                self.assertEqual(problems, [], plan)
+
+
+class AutomaticPaymentSchedulerTests(PaymentTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        UserProfile.objects.create(user=self.user, phone_number='263771112222')
+        self.today = date(2026, 1, 31)
+
+    def make_bill(self, frequency='monthly', next_payment_date=None, **fields):
+        return AutomaticBillPayment.objects.create(
+            user=self.user, bill_name='Internet', amount=Decimal('30.00'), frequency=frequency,
+            next_payment_date=next_payment_date or self.today, **fields
+        )
+
+    def test_claim_creates_payment_from_payer_wallet_and_advances_bill(self):
+        bill = self.make_bill()
+
+        payment_ids = claim_due_bills(today=self.today, service=self.service)
+
+        payment = EcoCashPayment.objects.get(pk__in=payment_ids)
+        self.assertEqual(payment.status, 'pending')
+        self.assertEqual(payment.auto_payment_id, bill.pk)
+        self.assertEqual(payment.customer_msisdn, '263771112222')
+        bill.refresh_from_db()
+        # Clamped to the end of February
+        self.assertEqual(bill.next_payment_date, date(2026, 2, 28))
+
+    def test_claimed_bills_are_not_claimed_again(self):
+        self.make_bill()
+        self.make_bill(is_active=False)
+        self.make_bill(next_payment_date=self.today + timedelta(days=1))
+
+        self.assertEqual(len(claim_due_bills(today=self.today, service=self.service)), 1)
+        self.assertEqual(claim_due_bills(today=self.today, service=self.service), [])
+
+    def test_claims_in_batches(self):
+        for _ in range(5):
+            self.make_bill()
+
+        first = claim_due_bills(today=self.today, batch_size=3, service=self.service)
+        second = claim_due_bills(today=self.today, batch_size=3, service=self.service)
+
+        self.assertEqual((len(first), len(second)), (3, 2))
+        self.assertEqual(EcoCashPayment.objects.count(), 5)
+
+    def test_missed_periods_are_paid_once(self):
+        self.assertEqual(next_date_after(date(2026, 1, 1), 'weekly', self.today), date(2026, 2, 5))
+        self.assertEqual(next_date_after(date(2025, 10, 31), 'monthly', self.today), date(2026, 2, 28))
+        self.assertEqual(advance_date(date(2026, 1, 31), 'quarterly'), date(2026, 4, 30))
@@ -0,0 +1,215 @@
+"""
+Pooled HTTPS transport for the EcoCash API.
+
+A single process-wide ``requests.Session`` keeps TLS connections to
+EcoCash alive between payments instead of paying a handshake (and leaking
+a socket) per call. The pool is bounded: once ``ECOCASH_POOL_SIZE``
+connections are busy, further callers wait for a free one.
+
+Connection errors, timeouts and 429/5xx responses are retried with
+jittered backoff. Payment requests are resent with the same payload, so
+EcoCash sees the same ``sourceReference`` and can deduplicate; a 409 on a
+retry means an earlier attempt was accepted, and the payment is left for
+the callback or status poller to finish.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+ECOCASH_BASE_URL = getattr(settings, 'ECOCASH_BASE_URL', 'https://developers.ecocash.co.zw')
+ECOCASH_CONNECT_TIMEOUT = getattr(settings, 'ECOCASH_CONNECT_TIMEOUT', 5)
+ECOCASH_READ_TIMEOUT = getattr(settings, 'ECOCASH_READ_TIMEOUT', 30)
+ECOCASH_MAX_RETRIES = getattr(settings, 'ECOCASH_MAX_RETRIES', 2)
+ECOCASH_POOL_SIZE = getattr(settings, 'ECOCASH_POOL_SIZE', 10)
+ECOCASH_CA_BUNDLE = getattr(settings, 'ECOCASH_CA_BUNDLE', '')
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TransportMetrics:
+    """Thread-safe counters and latency for EcoCash calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.successes = 0
+            self.failures = 0
+            self.retries = 0
+            self.deduplicated = 0
+            self.total_latency_ms = 0.0
+            self.max_latency_ms = 0.0
+            self.status_codes = {}
+
+    def record_call(self, latency_ms, status_code=None):
+        with self._lock:
+            self.requests += 1
+            self.total_latency_ms += latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            key = str(status_code) if status_code else 'error'
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+    def record_result(self, success):
+        with self._lock:
+            if success:
+                self.successes += 1
+            else:
+                self.failures += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_deduplicated(self):
+        with self._lock:
+            self.deduplicated += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'successes': self.successes,
+                'failures': self.failures,
+                'retries': self.retries,
+                'deduplicated': self.deduplicated,
+                'avg_latency_ms': round(self.total_latency_ms / self.requests, 1) if self.requests else 0,
+                'max_latency_ms': round(self.max_latency_ms, 1),
+                'status_codes': dict(self.status_codes),
+            }
+
+
+class EcoCashTransport:
+    """
+    Args:
+        base_url: scheme and host of the EcoCash API.
+        timeout: (connect, read) timeout in seconds.
+        max_retries: extra attempts after the first for retryable failures.
+        pool_size: maximum open connections; callers block when all are busy.
+        verify: CA bundle path, or True to use the system store.
+    """
+
+    def __init__(self, base_url=None, timeout=None, max_retries=None, pool_size=None, verify=None,
+                 backoff_base=0.25, backoff_max=4.0):
+        self.base_url = (base_url or ECOCASH_BASE_URL).rstrip('/')
+        self.timeout = timeout or (ECOCASH_CONNECT_TIMEOUT, ECOCASH_READ_TIMEOUT)
+        self.max_retries = ECOCASH_MAX_RETRIES if max_retries is None else max_retries
+        self.pool_size = pool_size or ECOCASH_POOL_SIZE
+        self.verify = verify if verify is not None else (ECOCASH_CA_BUNDLE or True)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = TransportMetrics()
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1, pool_maxsize=self.pool_size, pool_block=True, max_retries=0
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers.update({'Content-Type': 'application/json'})
+                    self._session = session
+        return self._session
+
+    def post(self, path, payload, headers=None):
+        """
+        POST ``payload`` as JSON, retrying transient failures with the same body
+
+        Returns a result dict: ``success``, ``status_code``, ``attempts`` and
+        either ``data`` (parsed JSON) or ``error``. ``deduplicated`` is set
+        when a retry was rejected as a duplicate of an accepted attempt.
+        """
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            retry_after = None
+            try:
+                response = self.session.post(
+                    url, json=payload, headers=headers, timeout=self.timeout, verify=self.verify
+                )
+            except requests.exceptions.SSLError as e:
+                # A certificate problem won't fix itself on retry
+                self.metrics.record_call(self._elapsed_ms(started))
+                return self._finish({'success': False, 'status_code': 503, 'error': f"EcoCash TLS error: {e}"}, attempt)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.record_call(self._elapsed_ms(started))
+                result = {'success': False, 'status_code': 503, 'error': f"EcoCash request failed: {e}"}
+            else:
+                self.metrics.record_call(self._elapsed_ms(started), response.status_code)
+                if response.status_code == 200:
+                    return self._finish({'success': True, 'status_code': 200, 'data': self._json(response)}, attempt)
+                if response.status_code == 409 and attempt > 0:
+                    # An earlier attempt with this sourceReference got through
+                    self.metrics.record_deduplicated()
+                    return self._finish(
+                        {'success': True, 'status_code': 409, 'data': {}, 'deduplicated': True}, attempt
+                    )
+
+                retry_after = response.headers.get('Retry-After')
+                result = {'success': False, 'status_code': response.status_code, 'error': response.text[:500]}
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return self._finish(result, attempt)
+
+            if attempt >= self.max_retries:
+                return self._finish(result, attempt)
+            attempt += 1
+            self.metrics.record_retry()
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _finish(self, result, attempt):
+        result['attempts'] = attempt + 1
+        self.metrics.record_result(result['success'])
+        return result
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After when given"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _json(response):
+        try:
+            return response.json()
+        except ValueError:
+            return {'raw': response.text[:500]}
+
+    @staticmethod
+    def _elapsed_ms(started):
+        return (time.monotonic() - started) * 1000
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Process-wide shared transport"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = EcoCashTransport()
+    return _transport
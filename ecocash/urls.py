@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import views, async_views
 
 router = DefaultRouter()
 router.register(r'auto-payments', views.AutomaticBillPaymentViewSet, basename='auto-payment')
@@ -13,6 +13,11 @@ urlpatterns = [
     path('buy-airtime/', views.buy_airtime, name='buy-airtime'),
     path('pay-merchant/', views.pay_merchant, name='pay-merchant'),
     path('manual-payment/', views.manual_payment, name='manual-payment'),
+    path('async/send-money/', async_views.send_money, name='send-money-async'),
+    path('async/buy-airtime/', async_views.buy_airtime, name='buy-airtime-async'),
+    path('async/pay-merchant/', async_views.pay_merchant, name='pay-merchant-async'),
+    path('async/manual-payment/', async_views.manual_payment, name='manual-payment-async'),
     path('callback/', views.callback, name='ecocash-callback'),
     path('payment-status/<uuid:source_reference>/', views.payment_status, name='payment-status'),
+    path('metrics/', views.transport_metrics, name='ecocash-metrics'),
 ]
\ No newline at end of file
@@ -1,10 +1,13 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from .models import EcoCashPayment, AutomaticBillPayment
 from .serializers import EcoCashPaymentSerializer, AutomaticBillPaymentSerializer
 from .services import EcoCashService
+from .callbacks import SIGNATURE_HEADER, record_callback, verify_signature
+from .idempotency import idempotent
+from .transport import get_transport
 
 
 class EcoCashPaymentViewSet(viewsets.ModelViewSet):
@@ -42,8 +45,9 @@ def test_connection(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def send_money(request):
-    """Send money to another EcoCash user"""
+    """Send money to another EcoCash user (queued; poll payment-status for the outcome)"""
     service = EcoCashService()
     
     recipient_msisdn = request.data.get('recipient_msisdn')
@@ -67,7 +71,7 @@ def send_money(request):
         )
         
         serializer = EcoCashPaymentSerializer(payment)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response(
@@ -78,8 +82,9 @@ def send_money(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def buy_airtime(request):
-    """Buy airtime using EcoCash"""
+    """Buy airtime using EcoCash (queued; poll payment-status for the outcome)"""
     service = EcoCashService()
     
     phone_number = request.data.get('phone_number')
@@ -101,7 +106,7 @@ def buy_airtime(request):
         )
         
         serializer = EcoCashPaymentSerializer(payment)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response(
@@ -112,8 +117,9 @@ def buy_airtime(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def pay_merchant(request):
-    """Pay merchant using EcoCash"""
+    """Pay merchant using EcoCash (queued; poll payment-status for the outcome)"""
     service = EcoCashService()
     
     merchant_code = request.data.get('merchant_code')
@@ -137,7 +143,7 @@ def pay_merchant(request):
         )
         
         serializer = EcoCashPaymentSerializer(payment)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response(
@@ -148,8 +154,9 @@ def pay_merchant(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def manual_payment(request):
-    """Handle manual EcoCash payment"""
+    """Handle manual EcoCash payment (queued; poll payment-status for the outcome)"""
     service = EcoCashService()
     
     customer_msisdn = request.data.get('customer_msisdn')
@@ -172,9 +179,9 @@ def manual_payment(request):
             currency=currency
         )
         
-        payment = service.execute_payment(payment)
+        payment = service.enqueue_payment(payment)
         serializer = EcoCashPaymentSerializer(payment)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response(
@@ -184,37 +191,32 @@ def manual_payment(request):
 
 
 @api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
 def callback(request):
-    """Handle EcoCash payment callback"""
-    source_reference = request.data.get('sourceReference')
-    payment_status = request.data.get('status')
-    transaction_id = request.data.get('transactionId')
-    
-    if not source_reference:
+    """
+    Receive an EcoCash payment callback: verify its signature, store it in the
+    inbox and acknowledge; the payment is updated in the background
+    """
+    body = request.body
+    if not verify_signature(body, request.headers.get(SIGNATURE_HEADER)):
         return Response(
-            {'error': 'sourceReference is required'}, 
-            status=status.HTTP_400_BAD_REQUEST
+            {'error': 'Invalid signature'},
+            status=status.HTTP_401_UNAUTHORIZED
         )
     
     try:
-        payment = EcoCashPayment.objects.get(source_reference=source_reference)
-        
-        if payment_status:
-            payment.status = payment_status
-        
-        if transaction_id:
-            payment.ecocash_transaction_id = transaction_id
-        
-        payment.response_data = request.data
-        payment.save()
-        
-        return Response({'message': 'Callback processed successfully'})
-        
-    except EcoCashPayment.DoesNotExist:
+        event, created = record_callback(body, request.headers)
+    except ValueError as e:
         return Response(
-            {'error': 'Payment not found'}, 
-            status=status.HTTP_404_NOT_FOUND
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
         )
+    
+    return Response({
+        'message': 'Callback received' if created else 'Duplicate callback ignored',
+        'event_id': event.id
+    })
 
 
 @api_view(['GET'])
@@ -234,4 +236,18 @@ def payment_status(request, source_reference):
         return Response(
             {'error': 'Payment not found'}, 
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def transport_metrics(request):
+    """Call, retry and latency metrics for the shared EcoCash transport"""
+    transport = get_transport()
+    return Response({
+        'base_url': transport.base_url,
+        'pool_size': transport.pool_size,
+        'timeout': {'connect': transport.timeout[0], 'read': transport.timeout[1]},
+        'max_retries': transport.max_retries,
+        'metrics': transport.metrics.snapshot()
+    })
@@ -2,7 +2,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.http import HttpResponse
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, F
 from django.utils import timezone
 from datetime import datetime, timedelta
 import csv
@@ -13,7 +13,8 @@ from reportlab.lib.pagesizes import letter
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill
 from accounting.models import Transaction, Category
-from budget.models import BudgetCategory, Goal, GoalContribution
+from budget.models import BudgetCategory, BudgetAlert, Goal, GoalContribution
+from budget.forecasting import get_goal_forecasts, ON_TRACK
 from .serializers import ReportRequestSerializer
 
 # Dashboard Data Endpoints
@@ -35,11 +36,13 @@ def dashboard_overview(request):
     
     # Budget Performance
     budget_categories = BudgetCategory.objects.filter(user=user, is_active=True)
-    over_budget_count = sum(1 for cat in budget_categories if cat.percentage_used > 100)
+    over_budget_count = budget_categories.filter(spent_amount__gt=F('budgeted_amount')).count()
+    unread_alerts = BudgetAlert.objects.filter(user=user, is_read=False).count()
     
     # Goals Progress
     active_goals = Goal.objects.filter(user=user, status='active')
-    goals_on_track = sum(1 for goal in active_goals if goal.days_remaining > 0)
+    goal_forecasts = get_goal_forecasts(user.id)
+    goals_on_track = sum(1 for forecast in goal_forecasts.values() if forecast['status'] == ON_TRACK)
     
     # Recent Activity
     recent_transactions = Transaction.objects.filter(
@@ -56,6 +59,7 @@ def dashboard_overview(request):
         'budget_performance': {
             'total_categories': budget_categories.count(),
             'over_budget': over_budget_count,
+            'unread_alerts': unread_alerts,
             'categories': [{
                 'name': cat.name,
                 'percentage_used': cat.percentage_used,
@@ -68,7 +72,8 @@ def dashboard_overview(request):
             'goals': [{
                 'name': goal.name,
                 'progress': goal.progress_percentage,
-                'days_remaining': goal.days_remaining
+                'days_remaining': goal.days_remaining,
+                'forecast': goal_forecasts.get(goal.id, {}).get('status')
             } for goal in active_goals[:3]]
         },
         'recent_activity': [{
@@ -4,7 +4,8 @@ from decimal import Decimal
 from django.utils import timezone
 from django.contrib.auth.models import User
 from .models import Transfer
-from accounting.models import Transaction, Category
+from accounting.categories import get_category_registry
+from accounting.models import Transaction
 
 class TransferService:
     def __init__(self):
@@ -88,7 +89,7 @@ class TransferService:
             transfer.response_data = {"status": "SUCCESS", "reference": str(transfer.reference), "timestamp": timezone.now().isoformat()}
             
             try:
-                category, _ = Category.objects.get_or_create(name="Transfer", defaults={"category_type": "expense", "icon": "ArrowRightLeft", "color": "#2D358B"})
+                category = get_category_registry().for_source("transfer")
                 transaction = Transaction.objects.create(
                     user=transfer.sender,
                     category=category,
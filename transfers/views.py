@@ -7,6 +7,7 @@ from django.utils import timezone
 from .models import Transfer
 from .serializers import TransferSerializer, TransferCreateSerializer
 from .services import TransferService
+from ecocash.idempotency import idempotent
 
 class TransferViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TransferSerializer
@@ -16,6 +17,7 @@ class TransferViewSet(viewsets.ReadOnlyModelViewSet):
         return Transfer.objects.filter(sender=self.request.user)
 
 @api_view(['POST'])
+@idempotent
 def send_to_registered_user(request):
     """Send money to registered user"""
     serializer = TransferCreateSerializer(data=request.data)
@@ -37,6 +39,7 @@ def send_to_registered_user(request):
     return Response(response_serializer.data)
 
 @api_view(['POST'])
+@idempotent
 def send_to_unregistered_user(request):
     """Send money to unregistered user via phone"""
     serializer = TransferCreateSerializer(data=request.data)
@@ -59,6 +62,7 @@ def send_to_unregistered_user(request):
     return Response(response_serializer.data)
 
 @api_view(['POST'])
+@idempotent
 def send_to_account(request):
     """Send money to bank account"""
     serializer = TransferCreateSerializer(data=request.data)
@@ -81,6 +85,7 @@ def send_to_account(request):
     return Response(response_serializer.data)
 
 @api_view(['POST'])
+@idempotent
 def currency_exchange(request):
     """Exchange USD to ZIG"""
     serializer = TransferCreateSerializer(data=request.data)
@@ -0,0 +1,45 @@
+"""
+Authentication helpers for async (ASGI) views.
+
+DRF's ``api_view`` runs synchronously, so the async handlers authenticate
+the ``Authorization: Token <key>`` header themselves using the async ORM.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authtoken.models import Token
+
+
+async def aget_request_user(request):
+    """
+    Resolve the active user for a token-authenticated request, or None
+    """
+    header = request.headers.get('Authorization', '')
+    keyword, _, key = header.partition(' ')
+    if keyword != 'Token' or not key.strip():
+        return None
+
+    token = await Token.objects.select_related('user').filter(key=key.strip()).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def async_login_required(view_func):
+    """
+    Token-authenticate an async view and expose the user as ``request.user``
+    """
+    @csrf_exempt
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_request_user(request)
+        if user is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=401
+            )
+        request.user = user
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper